@@ -4,13 +4,18 @@ from pydantic import BaseModel, ValidationError
 from typing import Optional, List
 from feature_extraction import ConfigSchema
 from services.weaviate_service import WeaviateService
+from services.openai_service import OpenAIService
+from services.anthropic_service import AnthropicService
 from fastapi import APIRouter, Depends, HTTPException, Query
 from weaviate_interface.models.product import NewProduct, Product, attribute_descriptions
 from services.feature_extraction_service import BatchFeatureExtractionService, FeatureExtractionService
+from services.utils.tracing import tracer
 from dependencies import (
     get_weaviate_service,
     get_feature_extraction_service,
     get_batch_feature_extraction_service,
+    get_openai_service,
+    get_anthropic_service,
 )
 
 
@@ -24,6 +29,8 @@ class FilterParams(BaseModel):
     page: int = Query(1, ge=1)
     page_size: int = Query(20, ge=1, le=100)
     filter: Optional[str] = None
+    # Cursor pagination instead of pages: pass an empty cursor for the first page, then each next_cursor
+    cursor: Optional[str] = None
 
 
 class RawProductInput(BaseModel):
@@ -60,10 +67,26 @@ async def get_products(
     weaviate_service: WeaviateService = Depends(get_weaviate_service),
 ):
     logger.info(f"Getting products with params: {params}")
-    offset = (params.page - 1) * params.page_size
-
     filter_dict = json.loads(params.filter) if params.filter else None
 
+    if params.cursor is not None:
+        if filter_dict:
+            raise HTTPException(status_code=400, detail="Cursor pagination does not support filters")
+        try:
+            products, total_count, next_cursor = await weaviate_service.get_products_after(
+                params.page_size, params.cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "total": total_count,
+            "page_size": params.page_size,
+            "products": [filter_internal_fields(product) for product in products],
+            "next_cursor": next_cursor,
+        }
+
+    offset = (params.page - 1) * params.page_size
+
     products, total_count = await weaviate_service.get_products(params.page_size, offset, filter_dict)
     filtered_products = [filter_internal_fields(product) for product in products]
 
@@ -194,3 +217,43 @@ async def add_products_batch_raw(
     except Exception as e:
         logger.error(f"Error adding products batch: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/metrics")
+async def get_metrics(
+    weaviate_service: WeaviateService = Depends(get_weaviate_service),
+    openai_service: OpenAIService = Depends(get_openai_service),
+    anthropic_service: AnthropicService = Depends(get_anthropic_service),
+):
+    completion_cache = openai_service.completion_cache
+    embedding_cache = openai_service.embedding_cache
+    return {
+        "completion_cache": completion_cache.stats() if completion_cache else None,
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "single_flight": {
+            "openai": openai_service.single_flight.stats(),
+            "anthropic": anthropic_service.single_flight.stats(),
+            "weaviate_search": weaviate_service.single_flight.stats(),
+        },
+        "rate_limiters": {
+            "openai": openai_service.rate_limiter.stats(),
+            "anthropic": anthropic_service.rate_limiter.stats(),
+        },
+    }
+
+
+@api_router.get("/admin/traces")
+async def get_traces(limit: int = Query(50, ge=1, le=1000), format: str = Query("summary", pattern="^(summary|otel)$")):
+    summaries = tracer.summaries(limit)
+    if format == "otel":
+        return tracer.export([summary["trace_id"] for summary in summaries])
+    return {"traces": summaries}
+
+
+@api_router.get("/admin/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = Query("timeline", pattern="^(timeline|otel)$")):
+    if tracer.get_trace(trace_id) is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == "otel":
+        return tracer.export([trace_id])
+    return {"trace_id": trace_id, "spans": tracer.breakdown(trace_id)}
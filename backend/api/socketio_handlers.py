@@ -91,7 +91,20 @@ class SocketIOHandler:
             history_management_choice=data.get("history_management_choice"),
             is_user_message=True,
         )
-        response = await self.message_processor.process_message(message, data.get("sql_mode", False))
+        stream_callback = None
+        # Chunks are only sent to clients that ask for them
+        if data.get("stream", False):
+
+            async def stream_callback(chunk: str):
+                await self.sio.emit(
+                    "text_response_chunk",
+                    {"session_id": message.session_id, "id": f"{message.id}_response", "chunk": chunk},
+                    room=sid,
+                )
+
+        response = await self.message_processor.process_message(
+            message, data.get("sql_mode", False), stream_callback=stream_callback
+        )
         response_dict = response.to_dict()
         logger.info(f"Response sent to {sid}: {response_dict}")
         await self.sio.emit("text_response", response_dict, room=sid)
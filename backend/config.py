@@ -1,6 +1,7 @@
 from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
+from typing import Optional
 
 
 class Config(BaseSettings):
@@ -17,6 +18,42 @@ class Config(BaseSettings):
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     DEFAULT_ANTHROPIC_MODEL: str = "claude-3-sonnet-20240229"
     DATABASE_URI: str = Field("sqlite+aiosqlite:///./database.db", env="DATABASE_URI")
+    LLM_CACHE_ENABLED: bool = Field(True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_MAX_ENTRIES: int = Field(1024, env="LLM_CACHE_MAX_ENTRIES")
+    LLM_CACHE_TTL_SECONDS: int = Field(3600, env="LLM_CACHE_TTL_SECONDS")
+    LLM_CACHE_MAX_TEMPERATURE: float = Field(0.1, env="LLM_CACHE_MAX_TEMPERATURE")
+    LLM_CACHE_SQLITE_PATH: Optional[str] = Field(None, env="LLM_CACHE_SQLITE_PATH")
+    LLM_CACHE_DISK_TTL_SECONDS: int = Field(86400, env="LLM_CACHE_DISK_TTL_SECONDS")
+    OPENAI_REQUESTS_PER_MINUTE: int = Field(5000, env="OPENAI_REQUESTS_PER_MINUTE")
+    OPENAI_TOKENS_PER_MINUTE: int = Field(800000, env="OPENAI_TOKENS_PER_MINUTE")
+    ANTHROPIC_REQUESTS_PER_MINUTE: int = Field(1000, env="ANTHROPIC_REQUESTS_PER_MINUTE")
+    ANTHROPIC_TOKENS_PER_MINUTE: int = Field(400000, env="ANTHROPIC_TOKENS_PER_MINUTE")
+    LLM_MAX_RETRIES: int = Field(3, env="LLM_MAX_RETRIES")
+    FEATURE_EXTRACTION_CONCURRENCY: int = Field(5, env="FEATURE_EXTRACTION_CONCURRENCY")
+    CLASSIFICATION_MAX_TOKENS: int = Field(256, env="CLASSIFICATION_MAX_TOKENS")
+    CLASSIFICATION_CASCADE_ENABLED: bool = Field(True, env="CLASSIFICATION_CASCADE_ENABLED")
+    CLASSIFICATION_CASCADE_MODEL: str = Field("gpt-4o-mini", env="CLASSIFICATION_CASCADE_MODEL")
+    CLASSIFICATION_CASCADE_MIN_CONFIDENCE: float = Field(80, env="CLASSIFICATION_CASCADE_MIN_CONFIDENCE")
+    HYBRID_ROUTER_SEMANTIC_THRESHOLD: float = Field(0.7, env="HYBRID_ROUTER_SEMANTIC_THRESHOLD")
+    HYBRID_ROUTER_SPECULATIVE: bool = Field(False, env="HYBRID_ROUTER_SPECULATIVE")
+    INTENT_CLASSIFIER_PATH: str = Field("data/intent_classifier.npz", env="INTENT_CLASSIFIER_PATH")
+    INTENT_CLASSIFIER_DATA_DIR: str = Field("data", env="INTENT_CLASSIFIER_DATA_DIR")
+    INTENT_CLASSIFIER_MIN_MARGIN: float = Field(0.35, env="INTENT_CLASSIFIER_MIN_MARGIN")
+    INTENT_CLASSIFIER_MIN_KNOWN_WORDS: float = Field(0.6, env="INTENT_CLASSIFIER_MIN_KNOWN_WORDS")
+    INTENT_CLASSIFIER_LLM_FALLBACK: bool = Field(False, env="INTENT_CLASSIFIER_LLM_FALLBACK")
+    PRODUCT_SEARCH_PREFETCH: bool = Field(False, env="PRODUCT_SEARCH_PREFETCH")
+    PRODUCT_SEARCH_PREFETCH_LIMIT: int = Field(10, env="PRODUCT_SEARCH_PREFETCH_LIMIT")
+    PRODUCT_RERANKER: str = Field("none", env="PRODUCT_RERANKER")
+    PRODUCT_RERANKER_VECTOR_WEIGHT: float = Field(0.7, env="PRODUCT_RERANKER_VECTOR_WEIGHT")
+    PRODUCT_RERANKER_CANDIDATE_FACTOR: int = Field(2, env="PRODUCT_RERANKER_CANDIDATE_FACTOR")
+    TRACING_ENABLED: bool = Field(True, env="TRACING_ENABLED")
+    TRACE_BUFFER_SIZE: int = Field(200, env="TRACE_BUFFER_SIZE")
+    EMBEDDING_MODEL: str = Field("text-embedding-3-small", env="EMBEDDING_MODEL")
+    EMBEDDING_BATCH_MAX_TOKENS: int = Field(100000, env="EMBEDDING_BATCH_MAX_TOKENS")
+    EMBEDDING_BATCH_MAX_INPUTS: int = Field(2048, env="EMBEDDING_BATCH_MAX_INPUTS")
+    EMBEDDING_CONCURRENCY: int = Field(4, env="EMBEDDING_CONCURRENCY")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = Field(10000, env="EMBEDDING_CACHE_MAX_ENTRIES")
+    EMBEDDING_CACHE_DIR: Optional[str] = Field(None, env="EMBEDDING_CACHE_DIR")
 
     class Config:
         env_file = ".env"
@@ -11,12 +11,18 @@ from generators.llm_router import LLMRouter
 from generators.dynamic_agent import DynamicAgent
 from generators.hybrid_router import HybridRouter
 from generators.semantic_router import SemanticRouter
+from generators.trained_router import TrainedRouter
 from generators.clear_intent_agent import ClearIntentAgent
 from generators.vague_intent_agent import VagueIntentAgent
 from feature_extraction import AgenticFeatureExtractor, ConfigSchema
 from feature_extraction.product_data_preprocessor import ProductDataProcessor
 from services.feature_extraction_service import FeatureExtractionService, BatchFeatureExtractionService
 from services.anthropic_service import AnthropicService
+from services.utils.completion_cache import CompletionCache
+from services.utils.embedding_cache import EmbeddingCache
+from services.semantic_route_index import SemanticRouteIndex
+from services.intent_classifier import IntentClassifier
+from services.vector_reranker import VectorReranker
 
 
 from config import Config
@@ -30,7 +36,16 @@ class Container(containers.DeclarativeContainer):
     session_manager = providers.Singleton(SessionManager)
     product_data_preprocessor = providers.Singleton(ProductDataProcessor)
 
-    openai_service = providers.Singleton(OpenAIService, api_key=config.OPENAI_API_KEY, config=config_obj)
+    completion_cache = providers.Singleton(CompletionCache.from_config, config=config_obj)
+    embedding_cache = providers.Singleton(EmbeddingCache.from_config, config=config_obj)
+
+    openai_service = providers.Singleton(
+        OpenAIService,
+        api_key=config.OPENAI_API_KEY,
+        config=config_obj,
+        completion_cache=completion_cache,
+        embedding_cache=embedding_cache,
+    )
     tavily_service = providers.Singleton(TavilyService, api_key=config.TAVILY_API_KEY)
 
     weaviate_service = providers.Singleton(
@@ -46,12 +61,15 @@ class Container(containers.DeclarativeContainer):
         prompt_manager=prompt_manager,
     )
 
+    vector_reranker = providers.Singleton(VectorReranker.from_config, config=config_obj, openai_service=openai_service)
+
     clear_intent_agent = providers.Singleton(
         ClearIntentAgent,
         openai_service=openai_service,
         prompt_manager=prompt_manager,
         query_processor=query_processor,
         weaviate_service=weaviate_service,
+        reranker=vector_reranker,
     )
 
     vague_intent_agent = providers.Singleton(
@@ -60,6 +78,13 @@ class Container(containers.DeclarativeContainer):
         prompt_manager=prompt_manager,
         query_processor=query_processor,
         weaviate_service=weaviate_service,
+        reranker=vector_reranker,
+    )
+
+    route_index = providers.Singleton(
+        SemanticRouteIndex,
+        openai_service=openai_service,
+        weaviate_service=weaviate_service,
     )
 
     llm_router = providers.Singleton(
@@ -80,6 +105,7 @@ class Container(containers.DeclarativeContainer):
         clear_intent_agent=clear_intent_agent,
         vague_intent_agent=vague_intent_agent,
         prompt_manager=prompt_manager,
+        route_index=route_index,
     )
 
     hybrid_router = providers.Singleton(
@@ -90,12 +116,27 @@ class Container(containers.DeclarativeContainer):
         clear_intent_agent=clear_intent_agent,
         vague_intent_agent=vague_intent_agent,
         prompt_manager=prompt_manager,
+        route_index=route_index,
+    )
+
+    intent_classifier = providers.Singleton(IntentClassifier.from_config, config=config_obj)
+
+    trained_router = providers.Singleton(
+        TrainedRouter,
+        session_manager=session_manager,
+        openai_service=openai_service,
+        weaviate_service=weaviate_service,
+        clear_intent_agent=clear_intent_agent,
+        vague_intent_agent=vague_intent_agent,
+        prompt_manager=prompt_manager,
+        intent_classifier=intent_classifier,
     )
 
     anthropic_service = providers.Singleton(
         AnthropicService, 
-        api_key=config.ANTHROPIC_API_KEY, 
-        config=config_obj
+        api_key=config.ANTHROPIC_API_KEY,
+        config=config_obj,
+        completion_cache=completion_cache,
     )
 
     dynamic_agent = providers.Singleton(
@@ -112,6 +153,7 @@ class Container(containers.DeclarativeContainer):
         llm_router=llm_router,
         semantic_router=semantic_router,
         hybrid_router=hybrid_router,
+        trained_router=trained_router,
         dynamic_agent=dynamic_agent,
     )
 
@@ -5,8 +5,12 @@ from generators.llm_router import LLMRouter
 from generators.dynamic_agent import DynamicAgent
 from generators.hybrid_router import HybridRouter
 from generators.semantic_router import SemanticRouter
+from generators.trained_router import TrainedRouter
 from .models.message import Message, ResponseMessage
 from services.anthropic_service import AnthropicService
+from services.utils.streaming import StreamCallback
+from services.utils.tracing import SpanKind, tracer
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +22,18 @@ class MessageProcessor:
         llm_router: LLMRouter,
         semantic_router: SemanticRouter,
         hybrid_router: HybridRouter,
+        trained_router: TrainedRouter,
         dynamic_agent: DynamicAgent,
     ):
         self.llm_router = llm_router
         self.semantic_router = semantic_router
         self.hybrid_router = hybrid_router
+        self.trained_router = trained_router
         self.dynamic_agent = dynamic_agent
 
-    async def process_message(self, message: Message, sql_mode: bool = False) -> ResponseMessage:
+    async def process_message(
+        self, message: Message, sql_mode: bool = False, stream_callback: Optional[StreamCallback] = None
+    ) -> ResponseMessage:
         # Validate model choice
         if message.model.startswith(("gpt-", "text-")):
             service_type = "openai"
@@ -34,16 +42,29 @@ class MessageProcessor:
         else:
             raise ValueError(f"Unsupported model: {message.model}")
 
-        if message.architecture_choice == "llm-router":
-            response = await self.llm_router.run(message, sql_mode=sql_mode)
-        elif message.architecture_choice == "semantic-router":
-            response = await self.semantic_router.run(message)
-        elif message.architecture_choice == "hybrid-router":
-            response = await self.hybrid_router.run(message)
-        elif message.architecture_choice == "dynamic-agent":
-            response = await self.dynamic_agent.run(message)
-        else:
-            raise ValueError(f"Unknown architecture choice: {message.architecture_choice}")
+        with tracer.span(
+            "process_message",
+            SpanKind.SERVER,
+            session_id=message.session_id,
+            message_id=message.id,
+            architecture=message.architecture_choice,
+            model=message.model,
+        ) as span:
+            if message.architecture_choice == "llm-router":
+                response = await self.llm_router.run(message, sql_mode=sql_mode, stream_callback=stream_callback)
+            elif message.architecture_choice == "semantic-router":
+                response = await self.semantic_router.run(message, stream_callback=stream_callback)
+            elif message.architecture_choice == "hybrid-router":
+                response = await self.hybrid_router.run(message, stream_callback=stream_callback)
+            elif message.architecture_choice == "trained-router":
+                response = await self.trained_router.run(message, stream_callback=stream_callback)
+            elif message.architecture_choice == "dynamic-agent":
+                response = await self.dynamic_agent.run(message, stream_callback=stream_callback)
+            else:
+                raise ValueError(f"Unknown architecture choice: {message.architecture_choice}")
+
+        if isinstance(response.get("metadata"), dict):
+            response["metadata"]["trace_id"] = span.trace_id
 
         response_message = ResponseMessage(
             session_id=message.session_id,
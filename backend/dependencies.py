@@ -36,3 +36,11 @@ def get_openai_service():
 
 def get_anthropic_service() -> AnthropicService:
     return container.anthropic_service()
+
+
+def get_route_index():
+    return container.route_index()
+
+
+def get_intent_classifier():
+    return container.intent_classifier()
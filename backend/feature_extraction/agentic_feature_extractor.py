@@ -1,12 +1,12 @@
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from langchain_core.runnables import RunnableConfig
 from .models.config import ConfigSchema
 from .models.extractor_state import ExtractorState
 from .utils.query_constructor import construct_search_query
-from .utils.json_utils import parse_json_response, merge_dicts
+from .utils.json_utils import merge_dicts
 from .utils.feature_utils import (
     filter_features_by_confidence,
     get_missing_features,
@@ -14,18 +14,26 @@ from .utils.feature_utils import (
     build_missing_features_structure,
 )
 from weaviate_interface.models.product import attribute_descriptions
+from services.utils.rate_limiter import RateLimitPriority
+from services.utils.structured_output import generate_structured_response
+from prompts.output_schemas import feature_extraction_model
 
 logger = logging.getLogger(__name__)
 
 
 class AgenticFeatureExtractor:
+    # The nodes take services, the prompt manager and settings from the runnable config only, so the
+    # graph is compiled once and shared by every extractor
+    _workflow = None
+
     def __init__(self, services: Dict[str, Any], prompt_manager: Any, config: ConfigSchema):
         self.services = services
         self.prompt_manager = prompt_manager
         self.config = self.initialize_config(config)
         self.required_features = attribute_descriptions
-        logger.info(f"Required features: {self.required_features}")
-        self.workflow = self.setup_workflow()
+        if AgenticFeatureExtractor._workflow is None:
+            AgenticFeatureExtractor._workflow = self.setup_workflow()
+        self.workflow = AgenticFeatureExtractor._workflow
 
     def initialize_config(self, config: ConfigSchema) -> ConfigSchema:
         defaults = {
@@ -134,10 +142,17 @@ class AgenticFeatureExtractor:
 
             system_message, user_message = prompt_manager.get_data_extraction_prompt(context)
 
-            response, input_tokens, output_tokens = await openai_service.generate_response(
-                user_message, system_message, max_tokens=2048, temperature=0.1, model=model_name
+            response, input_tokens, output_tokens = await generate_structured_response(
+                openai_service,
+                feature_extraction_model(attribute_descriptions),
+                user_message=user_message,
+                system_message=system_message,
+                max_tokens=2048,
+                temperature=0.1,
+                model=model_name,
+                priority=RateLimitPriority.BATCH,
             )
-            extracted_features = parse_json_response(response)
+            extracted_features = response.model_dump(exclude_none=True)
             logger.info(f"Extracted features: {extracted_features}")
 
             usage = {
@@ -285,10 +300,17 @@ class AgenticFeatureExtractor:
                 features_to_extract=missing_features_structure,
             )
 
-            response, input_tokens, output_tokens = await openai_service.generate_response(
-                user_message, system_message, max_tokens=2048, temperature=0.1, model=model_name
+            response, input_tokens, output_tokens = await generate_structured_response(
+                openai_service,
+                feature_extraction_model(missing_features_structure),
+                user_message=user_message,
+                system_message=system_message,
+                max_tokens=2048,
+                temperature=0.1,
+                model=model_name,
+                priority=RateLimitPriority.BATCH,
             )
-            new_features = parse_json_response(response)
+            new_features = response.model_dump(exclude_none=True)
             logger.info(f"New features generated: {new_features}")
 
             usage = {
@@ -422,10 +444,17 @@ class AgenticFeatureExtractor:
                 features_to_refine=low_confidence_features_structure,
             )
 
-            response, input_tokens, output_tokens = await openai_service.generate_response(
-                user_message, system_message, max_tokens=2048, temperature=0.1, model=model_name
+            response, input_tokens, output_tokens = await generate_structured_response(
+                openai_service,
+                feature_extraction_model(low_confidence_features_structure),
+                user_message=user_message,
+                system_message=system_message,
+                max_tokens=2048,
+                temperature=0.1,
+                model=model_name,
+                priority=RateLimitPriority.BATCH,
             )
-            refined_features = parse_json_response(response)
+            refined_features = response.model_dump(exclude_none=True)
             logger.info(f"Refined features: {refined_features}")
 
             usage = {
@@ -502,7 +531,11 @@ class AgenticFeatureExtractor:
             logger.info("No further actions required. Ending workflow.")
             return "end"
 
-    async def extract_data(self, text: str, product_id: str) -> Dict[str, Any]:
+    async def extract_data(
+        self, text: str, product_id: str, config: Optional[ConfigSchema] = None
+    ) -> Dict[str, Any]:
+        """Run the extraction workflow; config overrides the extractor's settings for this product only."""
+        run_config = self.initialize_config(config) if config is not None else self.config
         initial_state = {
             "product_id": product_id,
             "raw_data": text,
@@ -511,14 +544,14 @@ class AgenticFeatureExtractor:
         }
         logger.info("Starting feature extraction workflow.")
 
-        config = {
-            "configurable": self.config,
+        runnable_config = {
+            "configurable": run_config,
             "services": self.services,
             "prompt_manager": self.prompt_manager,
         }
 
         try:
-            final_result = await self.workflow.ainvoke(initial_state, config=config)
+            final_result = await self.workflow.ainvoke(initial_state, config=runnable_config)
 
             if "error" in final_result:
                 logger.error(f"Workflow completed with error: {final_result['error']}")
@@ -531,7 +564,7 @@ class AgenticFeatureExtractor:
                 }
 
             filtered_features = filter_features_by_confidence(
-                final_result.get("extracted_features", {}), self.config["confidence_threshold"]
+                final_result.get("extracted_features", {}), run_config["confidence_threshold"]
             )
 
             result = {
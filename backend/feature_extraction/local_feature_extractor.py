@@ -115,10 +115,10 @@ class BatchProcessor:
                 confidence_threshold=0.7,
             )
 
+            agent = AgenticFeatureExtractor(services, self.prompt_manager, config=agent_config)
+
             async def process_row(row):
                 async with semaphore:
-                    # Instantiate a new AgenticFeatureExtractor per task
-                    agent = AgenticFeatureExtractor(services, self.prompt_manager, config=agent_config)
                     try:
                         result = await agent.extract_data(row["raw_data"], str(row["id"]))
                         return {
@@ -5,6 +5,7 @@ import tiktoken
 import pandas as pd
 from typing import List, Dict, Any
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from weaviate_interface.utils.unit_parser import FIELD_KINDS, standardize
 
 
 logger = logging.getLogger(__name__)
@@ -91,7 +92,13 @@ class ProductDataProcessor:
                 item["processor_core_count"] = None
 
     def _standardize_units(self, item: Dict[str, Any]) -> None:
-        unit_fields = ["memory", "processor_tdp", "operating_temperature_max", "operating_temperature_min"]
+        unit_fields = [
+            "memory",
+            "processor_tdp",
+            "input_voltage",
+            "operating_temperature_max",
+            "operating_temperature_min",
+        ]
         for key in unit_fields:
             value = item.get(key)
             if not self.is_na(value) and isinstance(value, str):
@@ -111,9 +118,12 @@ class ProductDataProcessor:
             return pd.isna(value).any()
 
     def standardize_units(self, value: str, field_name: str) -> str:
-        # Implement unit standardization logic based on field_name
-        # This is a placeholder implementation
-        return value
+        # Rewrite quantities in one unit per field ("4 GByte" -> "4.0GB", "+80℃" -> "80°C");
+        # the numeric shadows are parsed from the same text when the product is stored
+        kind = FIELD_KINDS.get(field_name)
+        if kind is None:
+            return value
+        return standardize(value, kind)
 
     def create_chunks(self, text: str) -> List[str]:
         return self.text_splitter.split_text(text)
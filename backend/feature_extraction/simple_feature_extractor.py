@@ -1,7 +1,8 @@
-import json
 import logging
 from prompts import PromptManager
 from services import OpenAIService
+from services.utils.rate_limiter import RateLimitPriority
+from services.utils.structured_output import StructuredOutputError, extract_json
 from weaviate_interface import NewProduct
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,7 @@ class SimpleFeatureExtractor:
     async def extract_data(self, text: str, model: str = "gpt-4o") -> tuple:
         system_message, user_message = self.prompt_manager.get_simple_data_extraction_prompt(text)
         response, input_tokens, output_tokens = await self.openai_service.generate_response(
-            user_message, system_message, max_tokens=4096, model=model
+            user_message, system_message, max_tokens=4096, model=model, priority=RateLimitPriority.BATCH
         )
         logger.info(f"\n\nResponse: {response}\n\n")
         extracted_data = self._parse_response(response)
@@ -23,13 +24,12 @@ class SimpleFeatureExtractor:
 
     def _parse_response(self, response: str) -> dict:
         try:
-            cleaned_response = response.replace("```json", "").replace("```", "").strip()
-            extracted_data = json.loads(cleaned_response)
+            extracted_data = extract_json(response)
 
             # Create a Product object (this will handle "Not available" conversion)
             product = NewProduct(**extracted_data)
             return product.model_dump()
-        except json.JSONDecodeError:
+        except StructuredOutputError:
             logger.error(f"Invalid JSON response: {response}")
             return {}
         except Exception as e:
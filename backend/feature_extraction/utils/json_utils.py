@@ -1,5 +1,6 @@
 import json
 from typing import Dict, Any
+from services.utils.structured_output import StructuredOutputError, extract_json
 
 
 def parse_json_response(response: str) -> Dict[str, Any]:
@@ -7,11 +8,9 @@ def parse_json_response(response: str) -> Dict[str, Any]:
     Parse a JSON string response into a nested Python dictionary.
     """
     try:
-        cleaned_response = response.replace("```json", "").replace("```", "").strip()
-        parsed = json.loads(cleaned_response)
-        return parsed
-    except json.JSONDecodeError as e:
-        raise json.JSONDecodeError(f"Failed to parse JSON response: {e}", e.doc, e.pos)
+        return extract_json(response)
+    except StructuredOutputError as e:
+        raise json.JSONDecodeError(f"Failed to parse JSON response: {e}", response, 0)
 
 
 def merge_dicts(dict1: Dict[str, Any], dict2: Dict[str, Any]) -> Dict[str, Any]:
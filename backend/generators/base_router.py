@@ -1,18 +1,26 @@
 import json
 import logging
 import time
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from core.session_manager import SessionManager
 from core.models.message import Message
 from prompts.prompt_manager import PromptManager
+from prompts.output_schemas import RouteClassification
 from services.openai_service import OpenAIService
 from services.weaviate_service import WeaviateService
+from services.semantic_route_index import SemanticRouteIndex
+from services.utils.streaming import StreamCallback, generate_with_stream_callback
+from services.utils.structured_output import StructuredOutputError, generate_structured_response
+from services.utils.tracing import tracer
+from .utils.product_prefetch import ProductPrefetch
 from .utils.response_formatter import ResponseFormatter
 from generators.clear_intent_agent import ClearIntentAgent
 from generators.vague_intent_agent import VagueIntentAgent
 
 logger = logging.getLogger(__name__)
 
+PRODUCT_ROUTES = ("vague_intent_product", "clear_intent_product")
+
 
 class BaseRouter:
     def __init__(
@@ -23,6 +31,7 @@ class BaseRouter:
         clear_intent_agent: ClearIntentAgent,
         vague_intent_agent: VagueIntentAgent,
         prompt_manager: PromptManager,
+        route_index: Optional[SemanticRouteIndex] = None,
     ):
         self.session_manager = session_manager
         self.openai_service = openai_service
@@ -30,18 +39,53 @@ class BaseRouter:
         self.clear_intent_agent = clear_intent_agent
         self.vague_intent_agent = vague_intent_agent
         self.prompt_manager = prompt_manager
+        self.route_index = route_index
         self.response_formatter = ResponseFormatter()
+        self.cascade_stats = {"classifications": 0, "escalations": 0, "full_model_time": None}
 
-    async def run(self, message: Message, sql_mode: bool = False) -> Dict[str, Any]:
+    async def run(
+        self, message: Message, sql_mode: bool = False, stream_callback: Optional[StreamCallback] = None
+    ) -> Dict[str, Any]:
         chat_history = self.session_manager.get_formatted_chat_history(
             message.session_id, message.history_management_choice, "message_only"
         )
-        classification, input_tokens, output_tokens, time_taken = await self.determine_route(
-            message, chat_history  # Pass as list of dicts
-        )
-        response = await self.handle_route(
-            classification, message, chat_history, input_tokens, output_tokens, time_taken, sql_mode=sql_mode
-        )
+        config = self.openai_service.config
+        prefetch = None
+        if config.PRODUCT_SEARCH_PREFETCH and not sql_mode:
+            # Most messages are product queries, so search while the route is still being classified
+            prefetch = ProductPrefetch(
+                self.weaviate_service,
+                message.message,
+                config.PRODUCT_SEARCH_PREFETCH_LIMIT,
+                # The vector reranker scores the candidates by their vectors
+                include_vector=config.PRODUCT_RERANKER == "vector",
+            )
+        try:
+            with tracer.span("router.classify", router=type(self).__name__) as span:
+                classification, input_tokens, output_tokens, time_taken = await self.determine_route(
+                    message, chat_history  # Pass as list of dicts
+                )
+                span.set_attributes(
+                    route=classification.get("category"),
+                    confidence=classification.get("confidence"),
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                )
+            with tracer.span("router.handle_route", route=classification.get("category")):
+                response = await self.handle_route(
+                    classification,
+                    message,
+                    chat_history,
+                    input_tokens,
+                    output_tokens,
+                    time_taken,
+                    sql_mode=sql_mode,
+                    stream_callback=stream_callback,
+                    prefetch=prefetch,
+                )
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
         return response
 
     async def determine_route(
@@ -51,6 +95,91 @@ class BaseRouter:
     ) -> Tuple[Dict[str, Any], int, int, float]:
         raise NotImplementedError("Subclasses must implement determine_route method")
 
+    async def search_routes(self, query: str) -> List[Tuple[str, float]]:
+        if self.route_index is not None:
+            return await self.route_index.search_routes(query)
+        return await self.weaviate_service.search_routes(query)
+
+    async def classify_with_llm(
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        """
+        Classify the route with an LLM. In cascade mode the small model answers first and the requested
+        model is only called when the small model's confidence is too low or its output is invalid.
+        """
+        config = self.openai_service.config
+        system_message, user_message = self.prompt_manager.get_route_classification_prompt(query=message.message)
+        plan = self.openai_service.token_planner.plan(
+            "route_classification", system_message, user_message, chat_history, message.model
+        )
+
+        async def classify(model: str) -> Tuple[RouteClassification, int, int]:
+            return await generate_structured_response(
+                self.openai_service,
+                RouteClassification,
+                user_message=user_message,
+                system_message=system_message,
+                formatted_chat_history=plan.chat_history,
+                temperature=0.1,
+                max_tokens=config.CLASSIFICATION_MAX_TOKENS,
+                model=model,
+            )
+
+        cascade_model = config.CLASSIFICATION_CASCADE_MODEL
+        if not config.CLASSIFICATION_CASCADE_ENABLED or cascade_model == message.model:
+            start_time = time.time()
+            route_classification, input_tokens, output_tokens = await classify(message.model)
+            self._record_full_model_time(time.time() - start_time)
+            classification = route_classification.model_dump()
+            classification["token_budget"] = plan.report(input_tokens)
+            return classification, input_tokens, output_tokens
+
+        self.cascade_stats["classifications"] += 1
+        cascade = {"model": cascade_model, "escalated": False, "escalation_reason": None, "time_taken": {}}
+
+        start_time = time.time()
+        try:
+            route_classification, input_tokens, output_tokens = await classify(cascade_model)
+            cascade["cascade_confidence"] = route_classification.confidence
+            if route_classification.confidence < config.CLASSIFICATION_CASCADE_MIN_CONFIDENCE:
+                cascade["escalation_reason"] = "low_confidence"
+        except StructuredOutputError as e:
+            logger.warning(f"Cascade classification returned invalid output, escalating: {e}")
+            input_tokens = output_tokens = 0
+            cascade["escalation_reason"] = "invalid_output"
+        cascade_time = time.time() - start_time
+        cascade["time_taken"]["cascade"] = cascade_time
+
+        if cascade["escalation_reason"]:
+            self.cascade_stats["escalations"] += 1
+            cascade["escalated"] = True
+            start_time = time.time()
+            route_classification, escalation_input_tokens, escalation_output_tokens = await classify(message.model)
+            escalation_time = time.time() - start_time
+            self._record_full_model_time(escalation_time)
+            cascade["time_taken"]["escalation"] = escalation_time
+            input_tokens += escalation_input_tokens
+            output_tokens += escalation_output_tokens
+            # Escalating costs the time spent on the small model
+            cascade["latency_saved"] = -cascade_time
+        else:
+            full_model_time = self.cascade_stats["full_model_time"]
+            cascade["latency_saved"] = full_model_time - cascade_time if full_model_time is not None else None
+
+        cascade["escalation_rate"] = self.cascade_stats["escalations"] / self.cascade_stats["classifications"]
+
+        classification = route_classification.model_dump()
+        classification["cascade"] = cascade
+        classification["token_budget"] = plan.report(input_tokens)
+        return classification, input_tokens, output_tokens
+
+    def _record_full_model_time(self, time_taken: float) -> None:
+        # Moving average of the requested model's classification latency, the baseline for latency saved
+        previous = self.cascade_stats["full_model_time"]
+        self.cascade_stats["full_model_time"] = time_taken if previous is None else 0.8 * previous + 0.2 * time_taken
+
     async def handle_route(
         self,
         classification: Dict[str, Any],
@@ -60,6 +189,8 @@ class BaseRouter:
         output_tokens: int,
         time_taken: float,
         sql_mode: bool = False,
+        stream_callback: Optional[StreamCallback] = None,
+        prefetch: Optional[ProductPrefetch] = None,
     ) -> Dict[str, Any]:
         route = classification["category"]
         confidence = classification["confidence"]
@@ -74,8 +205,14 @@ class BaseRouter:
         if sql_mode:
             base_metadata["sql_mode"] = True
 
+        if prefetch is not None and (route not in PRODUCT_ROUTES or confidence < 50):
+            prefetch.cancel()
+            prefetch = None
+
         if confidence < 50:
-            return await self.handle_low_confidence_query(message, chat_history, classification, base_metadata)
+            return await self.handle_low_confidence_query(
+                message, chat_history, classification, base_metadata, stream_callback
+            )
 
         route_handlers = {
             "politics": self.handle_politics,
@@ -86,7 +223,9 @@ class BaseRouter:
         }
 
         handler = route_handlers.get(route, self.handle_unknown_route)
-        return await handler(message, chat_history, base_metadata)
+        if route in PRODUCT_ROUTES:
+            return await handler(message, chat_history, base_metadata, stream_callback, prefetch=prefetch)
+        return await handler(message, chat_history, base_metadata, stream_callback)
 
     async def handle_low_confidence_query(
         self,
@@ -94,17 +233,24 @@ class BaseRouter:
         chat_history: List[Dict[str, str]],
         classification: Dict[str, Any],
         base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
     ) -> Dict[str, Any]:
         start_time = time.time()
         system_message, user_message = self.prompt_manager.get_low_confidence_prompt(message.message, classification)
+        plan = self.openai_service.token_planner.plan(
+            "low_confidence", system_message, user_message, chat_history, message.model
+        )
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
+        response, input_tokens, output_tokens = await generate_with_stream_callback(
+            self.openai_service,
+            stream_callback,
             user_message=user_message,
             system_message=system_message,
-            formatted_chat_history=chat_history,
+            formatted_chat_history=plan.chat_history,
             model=message.model,
         )
 
+        base_metadata["token_budget"] = {"generate": plan.report(input_tokens)}
         base_metadata["input_token_usage"]["generate"] = input_tokens
         base_metadata["output_token_usage"]["generate"] = output_tokens
         base_metadata["time_taken"]["generate"] = time.time() - start_time
@@ -112,7 +258,11 @@ class BaseRouter:
         return self.response_formatter.format_response("low_confidence", response, base_metadata)
 
     async def handle_politics(
-        self, message: Message, chat_history: List[Dict[str, str]], base_metadata: Dict[str, Any]
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
     ) -> Dict[str, Any]:
         return self.response_formatter.format_response(
             "politics",
@@ -126,21 +276,31 @@ class BaseRouter:
         )
 
     async def handle_chitchat(
-        self, message: Message, chat_history: List[Dict[str, str]], base_metadata: Dict[str, Any]
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
     ) -> Dict[str, Any]:
         start_time = time.time()
         system_message, user_message = self.prompt_manager.get_chitchat_prompt(message.message)
         print("system_message", system_message)
         print("user_message", user_message)
+        plan = self.openai_service.token_planner.plan(
+            "chitchat", system_message, user_message, chat_history, message.model
+        )
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
+        response, input_tokens, output_tokens = await generate_with_stream_callback(
+            self.openai_service,
+            stream_callback,
             user_message=user_message,
             system_message=system_message,
-            formatted_chat_history=chat_history,
+            formatted_chat_history=plan.chat_history,
             model=message.model,
             sql_mode=base_metadata["sql_mode"] if "sql_mode" in base_metadata else False,
         )
 
+        base_metadata["token_budget"] = {"generate": plan.report(input_tokens)}
         base_metadata["input_token_usage"]["generate"] = input_tokens
         base_metadata["output_token_usage"]["generate"] = output_tokens
         base_metadata["time_taken"]["generate"] = time.time() - start_time
@@ -148,11 +308,19 @@ class BaseRouter:
         return self.response_formatter.format_response("chitchat", response, base_metadata)
 
     async def handle_vague_intent(
-        self, message: Message, chat_history: List[Dict[str, str]], base_metadata: Dict[str, Any]
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
+        prefetch: Optional[ProductPrefetch] = None,
     ) -> Dict[str, Any]:
-        response = await self.vague_intent_agent.run(message, chat_history)
+        response = await self.vague_intent_agent.run(message, chat_history, stream_callback, prefetch=prefetch)
 
         base_metadata["filters"] = response["filters"]
+        if prefetch is not None:
+            base_metadata["prefetch"] = prefetch.stats(response["search_results"])
+        base_metadata["token_budget"] = response.get("token_budget", {})
         base_metadata["input_token_usage"].update(response["input_tokens"])
         base_metadata["output_token_usage"].update(response["output_tokens"])
         base_metadata["time_taken"].update(response["time_taken"])
@@ -162,11 +330,19 @@ class BaseRouter:
         )
 
     async def handle_clear_intent(
-        self, message: Message, chat_history: List[Dict[str, str]], base_metadata: Dict[str, Any]
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
+        prefetch: Optional[ProductPrefetch] = None,
     ) -> Dict[str, Any]:
-        response = await self.clear_intent_agent.run(message, chat_history)
+        response = await self.clear_intent_agent.run(message, chat_history, stream_callback, prefetch=prefetch)
 
         base_metadata["filters"] = response["filters"]
+        if prefetch is not None:
+            base_metadata["prefetch"] = prefetch.stats(response["search_results"])
+        base_metadata["token_budget"] = response.get("token_budget", {})
         base_metadata["input_token_usage"].update(response["input_tokens"])
         base_metadata["output_token_usage"].update(response["output_tokens"])
         base_metadata["time_taken"].update(response["time_taken"])
@@ -175,7 +351,13 @@ class BaseRouter:
             "clear_intent_product", response["output"], base_metadata, response["search_results"]
         )
 
-    async def handle_do_not_respond(self, base_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_do_not_respond(
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
+    ) -> Dict[str, Any]:
         return self.response_formatter.format_response(
             "do_not_respond",
             json.dumps(
@@ -187,6 +369,12 @@ class BaseRouter:
             base_metadata,
         )
 
-    async def handle_unknown_route(self, base_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_unknown_route(
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+        base_metadata: Dict[str, Any],
+        stream_callback: Optional[StreamCallback] = None,
+    ) -> Dict[str, Any]:
         logger.error(f"Unknown route encountered: {base_metadata['classification_result']['category']}")
         return self.response_formatter.format_error_response("An error occurred while processing your request.")
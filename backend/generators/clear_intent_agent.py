@@ -1,13 +1,18 @@
 import json
 import time
 import logging
-from typing import TypedDict, List, Dict, Any, Annotated
+from typing import TypedDict, List, Dict, Any, Optional, Annotated
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from core.models.message import Message
 from services.openai_service import OpenAIService
+from services.utils.product_serializer import ProductSerializer
+from services.utils.streaming import StreamCallback, generate_with_stream_callback
+from services.utils.tracing import tracer
 from services.query_processor import QueryProcessor
 from services.weaviate_service import WeaviateService
+from services.vector_reranker import VectorReranker
+from .utils.product_prefetch import ProductPrefetch
 from .utils.response_formatter import ResponseFormatter
 from prompts.prompt_manager import PromptManager
 
@@ -30,6 +35,7 @@ class ClearIntentState(TypedDict):
     input_tokens: Annotated[Dict[str, int], merge_dict]
     output_tokens: Annotated[Dict[str, int], merge_dict]
     time_taken: Annotated[Dict[str, float], merge_dict]
+    token_budget: Annotated[Dict[str, Dict[str, Any]], merge_dict]
     output: Dict[str, Any]
 
 
@@ -40,11 +46,13 @@ class ClearIntentAgent:
         query_processor: QueryProcessor,
         openai_service: OpenAIService,
         prompt_manager: PromptManager,
+        reranker: Optional[VectorReranker] = None,
     ):
         self.weaviate_service = weaviate_service
         self.query_processor = query_processor
         self.openai_service = openai_service
         self.prompt_manager = prompt_manager
+        self.reranker = reranker
         self.response_formatter = ResponseFormatter()
         self.workflow = self.setup_workflow()
 
@@ -63,6 +71,7 @@ class ClearIntentAgent:
 
         return workflow.compile()
 
+    @tracer.traced("clear_intent.query_processing")
     async def query_processing_node(self, state: ClearIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
         query_result, input_tokens, output_tokens = await self.query_processor.process_query_comprehensive(
@@ -78,6 +87,7 @@ class ClearIntentAgent:
             "time_taken": {"query_processing": time.time() - start_time},
         }
 
+    @tracer.traced("clear_intent.product_search")
     async def product_search_node(self, state: ClearIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
         limit = state["query_context"].get("num_products_requested", 5)
@@ -85,73 +95,58 @@ class ClearIntentAgent:
 
         logger.info(f"Filters: {filters}")
 
-        # Construct query for hybrid search based on filters
-        filter_query = " ".join([f"{key}:{value}" for key, value in filters.items()])
-
-        unique_results = {}
-
-        # Perform hybrid search with all filters
-        initial_results = await self.weaviate_service.search_products(
-            {"query": filter_query, "filters": filters, "limit": limit * 2, "search_type": "hybrid"}
+        prefetch = config.get("configurable", {}).get("prefetch")
+        final_results = await self.weaviate_service.search_with_relaxation(
+            filters,
+            self.reranker.candidate_limit(limit) if self.reranker else limit,
+            # Fill any remaining slots with the semantic search started during route classification
+            warm_candidates=prefetch.results if prefetch is not None else None,
+            include_vector=self.reranker is not None,
         )
+        time_taken = {"search": time.time() - start_time}
 
-        for result in initial_results:
-            if len(unique_results) >= limit:
-                break
-            unique_results[result["product_id"]] = result
-
-        # If not enough results, perform partial hybrid searches
-        if len(unique_results) < limit:
-            for key, value in filters.items():
-                partial_results = await self.weaviate_service.search_products(
-                    {"query": f"{key}:{value}", "filters": {key: value}, "limit": limit, "search_type": "hybrid"}
-                )
-                for result in partial_results:
-                    if result["product_id"] not in unique_results:
-                        unique_results[result["product_id"]] = result
-                        if len(unique_results) >= limit:
-                            break
-                if len(unique_results) >= limit:
-                    break
-
-        final_results = list(unique_results.values())[:limit]
+        if self.reranker:
+            rerank_start_time = time.time()
+            final_results = await self.reranker.rerank(state["current_message"], final_results, filters, limit)
+            time_taken["rerank"] = time.time() - rerank_start_time
 
         logger.info(f"\n\n===:> Final results: {final_results}\n\n")
 
         return {
             "search_results": final_results,
-            "time_taken": {"search": time.time() - start_time},
+            "time_taken": time_taken,
         }
 
+    @tracer.traced("clear_intent.response_generation")
     async def response_generation_node(self, state: ClearIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
+        planner = self.openai_service.token_planner
 
-        relevant_products = json.dumps(
-            [
-                {
-                    "product_id": p["product_id"],
-                    "name": p["name"],
-                    **{attr: p.get(attr, "Not specified") for attr in state["filters"].keys()},
-                    "summary": p.get("full_product_description", ""),
-                }
-                for p in state["search_results"]
-            ],
-            indent=2,
+        products = ProductSerializer(planner).fit(
+            state["search_results"],
+            planner.get_budget("clear_intent_response").max_payload_tokens,
+            state["model_name"],
+            attributes=state["filters"].keys(),
         )
 
         system_message, user_message = self.prompt_manager.get_clear_intent_response_prompt(
             state["current_message"],
-            relevant_products,
+            products.payload,
             json.dumps(state["filters"], indent=2),
         )
+        plan = planner.plan(
+            "clear_intent_response", system_message, user_message, state["chat_history"], state["model_name"]
+        )
 
         logger.info(f"\n\nSystem message: {system_message}\n\n")
         logger.info(f"\n\nUser message: {user_message}\n\n")
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
+        response, input_tokens, output_tokens = await generate_with_stream_callback(
+            self.openai_service,
+            config.get("configurable", {}).get("stream_callback"),
             user_message=user_message,
             system_message=system_message,
-            formatted_chat_history=state["chat_history"],
+            formatted_chat_history=plan.chat_history,
             temperature=0.1,
             model=state["model_name"],
         )
@@ -160,12 +155,19 @@ class ClearIntentAgent:
 
         return {
             "output": response,
+            "token_budget": {"generate": plan.report(input_tokens), "products": products.report()},
             "input_tokens": {"generate": input_tokens},
             "output_tokens": {"generate": output_tokens},
             "time_taken": {"generate": time.time() - start_time},
         }
 
-    async def run(self, message: Message, chat_history: List[Message]) -> Dict[str, Any]:
+    async def run(
+        self,
+        message: Message,
+        chat_history: List[Message],
+        stream_callback: Optional[StreamCallback] = None,
+        prefetch: Optional[ProductPrefetch] = None,
+    ) -> Dict[str, Any]:
         logger.info(f"Running ClearIntentAgent with message: {message}")
 
         initial_state: ClearIntentState = {
@@ -181,12 +183,15 @@ class ClearIntentAgent:
             "input_tokens": {},
             "output_tokens": {},
             "time_taken": {},
+            "token_budget": {},
             "output": {},
         }
 
         try:
             logger.info("Starting workflow execution")
-            final_state = await self.workflow.ainvoke(initial_state)
+            final_state = await self.workflow.ainvoke(
+                initial_state, config={"configurable": {"stream_callback": stream_callback, "prefetch": prefetch}}
+            )
             logger.info("Workflow execution completed")
             return final_state
         except Exception as e:
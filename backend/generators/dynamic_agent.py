@@ -2,19 +2,25 @@ import time
 import logging
 import json
 import traceback
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from core.models.message import Message
 from core.session_manager import SessionManager
 from prompts.prompt_manager import PromptManager
+from prompts.output_schemas import DynamicAnalysis
 from services.openai_service import OpenAIService
 from services.weaviate_service import WeaviateService
 from services.anthropic_service import AnthropicService
+from services.utils.product_serializer import ProductContext, ProductSerializer
+from services.utils.streaming import StreamCallback, generate_with_stream_callback
+from services.utils.structured_output import generate_structured_response
+from services.utils.token_budget import TokenBudgetPlanner
+from services.utils.tracing import tracer
 from .utils.response_formatter import ResponseFormatter
 from typing import List, Dict, Any, Literal, Tuple, TypedDict, Optional, Annotated, Callable, Union
 from functools import wraps
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 def merge_dict(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
@@ -25,7 +31,7 @@ def format_log_data(data: Dict[str, Any]) -> str:
     """Helper to format dictionary data for logging"""
     if data is None:
         return "null"
-    return json.dumps(data, indent=2, default=str)
+    return json.dumps(data, default=str)
 
 
 def format_exception(e: Exception) -> str:
@@ -39,7 +45,7 @@ class DynamicAgentState(TypedDict):
     chat_history: List[Dict[str, str]]
     filters: Optional[Dict[str, Any]]
     entities: Optional[Dict[str, List[str]]]
-    sort_context: Optional[Dict[str, Any]]
+    sort_context: Optional[List[Dict[str, Any]]]
     num_products_requested: int
     search_results: Optional[List[Dict[str, Any]]]
     search_method: Optional[Literal["sorted_query", "hybrid", "semantic"]]
@@ -47,6 +53,7 @@ class DynamicAgentState(TypedDict):
     input_tokens: Annotated[Dict[str, int], merge_dict]
     output_tokens: Annotated[Dict[str, int], merge_dict]
     time_taken: Annotated[Dict[str, float], merge_dict]
+    token_budget: Annotated[Dict[str, Dict[str, Any]], merge_dict]
     security_flag: Optional[str]
 
 
@@ -72,51 +79,26 @@ def log_node(node_name: str, config: Optional[Union[LogConfig, Dict[str, List[st
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(self, state: Dict[str, Any], *args, **kwargs):
-            def log_state(attributes: List[str]):
-                for attr in attributes:
-                    if attr in state:
-                        friendly_name = attr.replace("_", " ").title()
-                        value = state[attr]
-                        logger.info(f"║ {friendly_name}: {format_log_data(value)}")
-
-            # Log before execution
-            if config.before:
-                logger.info("╔══════════════════════════════════════════")
-                logger.info(f"║ Starting {node_name}")
-                log_state(config.before)
-
-            try:
-                start_time = time.time()
-                result = await func(self, state, *args, **kwargs)
-                execution_time = time.time() - start_time
-
-                # Log after execution
-                if config.after or config.log_result:
-                    if not config.before:  # Only print header if not already printed
-                        logger.info("╔══════════════════════════════════════════")
-                        logger.info(f"║ Completed {node_name}")
-                    log_state(config.after)
+            # Timing goes to the trace; state is only formatted when debug logging is on
+            with tracer.span(node_name):
+                if config.before and logger.isEnabledFor(logging.DEBUG):
+                    before = {attr: state[attr] for attr in config.before if attr in state}
+                    logger.debug(f"Starting {node_name}: {format_log_data(before)}")
+
+                try:
+                    result = await func(self, state, *args, **kwargs)
+                except Exception as e:
+                    logger.error(f"Error in {node_name}: {type(e).__name__}: {e}\n{format_exception(e)}")
+                    raise
+
+                if (config.after or config.log_result) and logger.isEnabledFor(logging.DEBUG):
+                    after = {attr: state[attr] for attr in config.after if attr in state}
                     if config.log_result:
-                        logger.info(f"║ Result: {format_log_data(result)}")
-                    logger.info(f"║ Execution Time: {execution_time:.2f}s")
-
-                if config.before or config.after or config.log_result:
-                    logger.info("╚══════════════════════════════════════════")
+                        after["result"] = result
+                    logger.debug(f"Completed {node_name}: {format_log_data(after)}")
 
                 return result
 
-            except Exception as e:
-                logger.error("╔══════════════════════════════════════════")
-                logger.error(f"║ ❌ Error in {node_name}")
-                logger.error(f"║ Type: {type(e).__name__}")
-                logger.error(f"║ Message: {str(e)}")
-                logger.error("║ Traceback:")
-                for line in format_exception(e).split("\n"):
-                    if line.strip():
-                        logger.error(f"║ {line}")
-                logger.error("╚══════════════════════════════════════════")
-                raise
-
         return wrapper
 
     return decorator
@@ -203,7 +185,7 @@ class DynamicAgent:
             return "direct_response"
 
         # Check for sort context
-        if state.get("sort_context") and isinstance(state["sort_context"], dict) and state["sort_context"]:
+        if state.get("sort_context") and isinstance(state["sort_context"], list):
             return "sorted_query"
 
         # Check for filters
@@ -240,21 +222,30 @@ class DynamicAgent:
         """Enhanced initial analysis with better context handling and sort extraction"""
         start_time = time.time()
         try:
+            llm_service = await self._get_llm_service(state["model_name"])
+            planner = llm_service.token_planner
+            chat_history, _, _ = planner.fit_history(
+                state["chat_history"], planner.get_budget("dynamic_analysis").max_history_tokens, state["model_name"]
+            )
+
             # Generate analysis prompts with chat history context
             system_message, user_message = self.prompt_manager.get_dynamic_analysis_prompt(
-                query=state["current_message"], chat_history=state["chat_history"]
+                query=state["current_message"], chat_history=chat_history
             )
+            plan = planner.plan("dynamic_analysis", system_message, user_message, chat_history, state["model_name"])
 
-            llm_service = await self._get_llm_service(state["model_name"])
-            response, input_tokens, output_tokens = await llm_service.generate_response(
+            analysis, input_tokens, output_tokens = await generate_structured_response(
+                llm_service,
+                DynamicAnalysis,
                 user_message=user_message,
                 system_message=system_message,
-                formatted_chat_history=state["chat_history"],
+                formatted_chat_history=plan.chat_history,
                 model=state["model_name"],
                 temperature=0.0,
+                cache_system_prompt=self.prompt_manager.is_cacheable("dynamic_analysis"),
             )
 
-            parsed_response = self.response_formatter._clean_response(response)
+            parsed_response = analysis.model_dump(exclude_none=True)
             security_flag = self._check_security(parsed_response)
             final_response = parsed_response.get("direct_response")
             sort_context, filters, entities, num_products_requested = self._process_query_context(parsed_response)
@@ -266,6 +257,7 @@ class DynamicAgent:
                 "sort_context": sort_context,
                 "entities": entities,
                 "num_products_requested": num_products_requested,
+                "token_budget": {"analysis": plan.report(input_tokens)},
                 "input_tokens": {"analysis": input_tokens},
                 "output_tokens": {"analysis": output_tokens},
                 "time_taken": {"analysis": time.time() - start_time},
@@ -275,9 +267,11 @@ class DynamicAgent:
 
     def _process_query_context(
         self, parsed_response: Dict[str, Any]
-    ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], int]:
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any], Dict[str, Any], int]:
         query_context = parsed_response.get("query_context", {})
-        sort_context = query_context.get("sort")
+        # One sort key or a list of them, most significant first
+        sort = query_context.get("sort")
+        sort_context = (sort if isinstance(sort, list) else [sort] if sort else []) or None
         filters = query_context.get("filters")
         entities = query_context.get("entities")
         num_products_requested = query_context.get("num_products_requested", 5)
@@ -305,7 +299,7 @@ class DynamicAgent:
         try:
             # Extract sorting parameters
             sort_context = state["sort_context"]
-            if not sort_context or "field" not in sort_context or "order" not in sort_context:
+            if not sort_context or any("field" not in key or "order" not in key for key in sort_context):
                 logger.error("Invalid sort context")
                 return self._generate_error_state(start_time, "sort")
 
@@ -481,13 +475,20 @@ class DynamicAgent:
             "log_result": True,
         },
     )
-    async def response_generation_node(self, state: DynamicAgentState) -> Dict[str, Any]:
+    async def response_generation_node(self, state: DynamicAgentState, config: RunnableConfig) -> Dict[str, Any]:
         """Enhanced response generation with sort awareness"""
         start_time = time.time()
 
+        # Get the appropriate service based on model name
+        llm_service = await self._get_llm_service(state["model_name"])
+        planner = llm_service.token_planner
+
         # Prepare context for response generation
+        products = self._prepare_product_data(
+            state, planner, planner.get_budget("dynamic_response").max_payload_tokens
+        )
         context = {
-            "products": self._prepare_product_data(state),
+            "products": products.payload,
             "filters": state.get("filters", {}),
             "sort": state.get("sort_context"),
             "entities": state.get("entities", {}),
@@ -497,22 +498,26 @@ class DynamicAgent:
         system_message, user_message = self.prompt_manager.get_dynamic_response_prompt(
             query=state["current_message"], **context
         )
+        plan = planner.plan(
+            "dynamic_response", system_message, user_message, state["chat_history"], state["model_name"]
+        )
 
-        # Get the appropriate service based on model name
-        llm_service = await self._get_llm_service(state["model_name"])
-
-        response, input_tokens, output_tokens = await llm_service.generate_response(
+        response, input_tokens, output_tokens = await generate_with_stream_callback(
+            llm_service,
+            config.get("configurable", {}).get("stream_callback"),
             user_message=user_message,
             system_message=system_message,
-            formatted_chat_history=state["chat_history"],
+            formatted_chat_history=plan.chat_history,
             model=state["model_name"],
             temperature=0.0,
+            cache_system_prompt=self.prompt_manager.is_cacheable("dynamic_response"),
         )
 
         final_response = self.response_formatter._clean_response(response)
 
         return {
             "final_response": final_response,
+            "token_budget": {"generate": plan.report(input_tokens), "products": products.report()},
             "input_tokens": {"generate": input_tokens},
             "output_tokens": {"generate": output_tokens},
             "time_taken": {"generate": time.time() - start_time},
@@ -525,7 +530,7 @@ class DynamicAgent:
             "log_result": True,
         },
     )
-    async def run(self, message: Message) -> Dict[str, Any]:
+    async def run(self, message: Message, stream_callback: Optional[StreamCallback] = None) -> Dict[str, Any]:
 
         chat_history = self.session_manager.get_formatted_chat_history(
             message.session_id, message.history_management_choice, "message_only"
@@ -545,37 +550,34 @@ class DynamicAgent:
             "input_tokens": {},
             "output_tokens": {},
             "time_taken": {},
+            "token_budget": {},
         }
 
         try:
-            final_state = await self.workflow.ainvoke(initial_state)
+            final_state = await self.workflow.ainvoke(
+                initial_state, config={"configurable": {"stream_callback": stream_callback}}
+            )
             return self.format_final_response(final_state)
         except Exception as e:  # noqa: F841
             return self.response_formatter.format_error_response(str(e))
 
-    def _prepare_product_data(self, state: DynamicAgentState) -> List[Dict[str, Any]]:
-        """Prepare product data for response generation"""
-        product_data = []
+    def _prepare_product_data(
+        self, state: DynamicAgentState, planner: TokenBudgetPlanner, max_tokens: int
+    ) -> ProductContext:
+        """Prepare product data for response generation: the richest rendering that fits max_tokens"""
         filters = state.get("filters", {}) or {}
         sort_context = state.get("sort_context")
 
-        for p in state.get("search_results", []):
-            product = {
-                "product_id": p["product_id"],
-                "name": p["name"],
-                "summary": p.get("full_product_description", ""),
-            }
-            # Include filter-relevant attributes
-            if filters:
-                product.update({attr: p.get(attr) for attr in filters.keys()})
-            # Include sort-relevant attributes
-            if sort_context:
-                product[sort_context["field"]] = p.get(sort_context["field"])
-            product_data.append(product)
-
-            logger.info(f"===:> Product: {product}")
+        # Include filter-relevant and sort-relevant attributes
+        attributes = list(filters.keys())
+        if sort_context:
+            attributes += [key["field"] for key in sort_context]
 
-        return product_data
+        products = ProductSerializer(planner).fit(
+            state.get("search_results", []), max_tokens, state["model_name"], attributes=attributes
+        )
+        logger.info(f"===:> Products: {products.report()}")
+        return products
 
     def format_final_response(self, final_state: DynamicAgentState) -> Dict[str, Any]:
         if not final_state.get("final_response"):
@@ -588,6 +590,7 @@ class DynamicAgent:
             "input_token_usage": final_state["input_tokens"],
             "output_token_usage": final_state["output_tokens"],
             "time_taken": final_state["time_taken"],
+            "token_budget": final_state.get("token_budget", {}),
         }
 
         # Get search results if available
@@ -630,10 +633,8 @@ class DynamicAgent:
             base_params["query"] = semantic_context
 
         if search_type == "filtered" and state.get("sort_context"):
-            base_params["sort"] = {
-                "field": state["sort_context"]["field"],
-                "order": state["sort_context"]["order"].lower(),
-                "weight": 1.0,
-            }
+            base_params["sort"] = [
+                {"field": key["field"], "order": key["order"].lower()} for key in state["sort_context"]
+            ]
 
         return base_params
@@ -1,15 +1,28 @@
+import asyncio
 import time
 import logging
 
 from core.models.message import Message
 from .base_router import BaseRouter
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
 class HybridRouter(BaseRouter):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.speculation_stats = {
+            "runs": 0,
+            "semantic_wins": 0,
+            "llm_wins": 0,
+            "latency_saved": 0.0,
+            "cancelled_llm_calls": 0,
+            "discarded_input_tokens": 0,
+            "discarded_output_tokens": 0,
+        }
+
     async def determine_route(
         self,
         message: Message,
@@ -17,30 +30,103 @@ class HybridRouter(BaseRouter):
     ) -> Tuple[Dict[str, Any], int, int, float]:
         start_time = time.time()
 
-        routes = await self.weaviate_service.search_routes(message.message)
-
-        if not routes:
-            similarity_score = 0
-        else:
-            route, similarity_score = routes[0]  # Get the top result
-
-        if similarity_score < 0.7:  # You can adjust this threshold
-            system_message, user_message = self.prompt_manager.get_route_classification_prompt(message.message)
-            response, input_tokens, output_tokens = await self.openai_service.generate_response(
-                user_message=user_message,
-                system_message=system_message,
-                formatted_chat_history=chat_history,
-                temperature=0.1,
-                model=message.model,
+        if self.openai_service.config.HYBRID_ROUTER_SPECULATIVE:
+            classification, input_tokens, output_tokens = await self._determine_route_speculatively(
+                message, chat_history
             )
-            classification = self.response_formatter._clean_response(response)
         else:
-            classification = {
-                "category": route,
-                "confidence": similarity_score * 100,  # Convert to percentage
-                "justification": "Determined by semantic search",
-            }
-            input_tokens = output_tokens = 0  # No tokens used for semantic search
+            routes = await self.search_routes(message.message)
+            classification = self._semantic_classification(routes)
+            if classification is None:
+                classification, input_tokens, output_tokens = await self.classify_with_llm(message, chat_history)
+            else:
+                input_tokens = output_tokens = 0  # No tokens used for semantic search
 
         logger.info(f"Route determined: {classification}")
         return classification, input_tokens, output_tokens, time.time() - start_time
+
+    def _semantic_classification(self, routes: List[Tuple[str, float]]) -> Optional[Dict[str, Any]]:
+        """The semantic route, or None if it does not clear the threshold and the LLM has to decide."""
+        if not routes:
+            return None
+        route, similarity_score = routes[0]  # Get the top result
+        if similarity_score < self.openai_service.config.HYBRID_ROUTER_SEMANTIC_THRESHOLD:
+            return None
+        return {
+            "category": route,
+            "confidence": similarity_score * 100,  # Convert to percentage
+            "justification": "Determined by semantic search",
+        }
+
+    async def _determine_route_speculatively(
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+    ) -> Tuple[Dict[str, Any], int, int]:
+        """
+        Start the LLM classification alongside the semantic search, instead of after it, and cancel it
+        if the semantic route turns out to be confident enough.
+        """
+        start_time = time.time()
+
+        async def timed_classification() -> Tuple[Tuple[Dict[str, Any], int, int], float]:
+            llm_start_time = time.time()
+            result = await self.classify_with_llm(message, chat_history)
+            return result, time.time() - llm_start_time
+
+        llm_task = asyncio.create_task(timed_classification())
+        try:
+            try:
+                routes = await self.search_routes(message.message)
+            except Exception as e:
+                logger.warning(f"Semantic route search failed, using the LLM classification: {e}")
+                routes = []
+            semantic_time = time.time() - start_time
+
+            self.speculation_stats["runs"] += 1
+            classification = self._semantic_classification(routes)
+            if classification is not None:
+                if not llm_task.done():
+                    # The request may already have reached OpenAI, but its usage never comes back
+                    llm_task.cancel()
+                    self.speculation_stats["cancelled_llm_calls"] += 1
+                try:
+                    (_, discarded_input_tokens, discarded_output_tokens), _ = await llm_task
+                    # The LLM answered before the semantic search did; its tokens were spent all the same
+                    self.speculation_stats["discarded_input_tokens"] += discarded_input_tokens
+                    self.speculation_stats["discarded_output_tokens"] += discarded_output_tokens
+                except asyncio.CancelledError:
+                    # Only swallow the cancellation of the speculative call, never the caller's own
+                    if not llm_task.cancelled() or asyncio.current_task().cancelling():
+                        raise
+                except Exception as e:
+                    logger.debug(f"Speculative LLM classification failed before cancellation: {e}")
+                self.speculation_stats["semantic_wins"] += 1
+                input_tokens = output_tokens = 0
+                winner, llm_time, latency_saved = "semantic", None, 0.0
+            else:
+                (classification, input_tokens, output_tokens), llm_time = await llm_task
+                self.speculation_stats["llm_wins"] += 1
+                winner = "llm"
+                # Sequentially the LLM call would only have started once the semantic search finished
+                latency_saved = max(0.0, semantic_time + llm_time - (time.time() - start_time))
+        finally:
+            # Stop the speculative call from spending tokens when the caller goes away, e.g. a socket disconnect
+            if not llm_task.done():
+                llm_task.cancel()
+
+        self.speculation_stats["latency_saved"] += latency_saved
+        runs = self.speculation_stats["runs"]
+        classification["speculation"] = {
+            "winner": winner,
+            "semantic_time": semantic_time,
+            "llm_time": llm_time,
+            "latency_saved": latency_saved,
+            "semantic_win_rate": self.speculation_stats["semantic_wins"] / runs,
+            "llm_win_rate": self.speculation_stats["llm_wins"] / runs,
+            "total_latency_saved": self.speculation_stats["latency_saved"],
+            "cancelled_llm_calls": self.speculation_stats["cancelled_llm_calls"],
+            "discarded_input_tokens": self.speculation_stats["discarded_input_tokens"],
+            "discarded_output_tokens": self.speculation_stats["discarded_output_tokens"],
+        }
+        return classification, input_tokens, output_tokens
@@ -16,7 +16,7 @@ class SemanticRouter(BaseRouter):
     ) -> Tuple[Dict[str, Any], int, int, float]:
         start_time = time.time()
 
-        routes = await self.weaviate_service.search_routes(message.message)
+        routes = await self.search_routes(message.message)
         if not routes:
             classification = {
                 "category": "unknown",
@@ -0,0 +1,62 @@
+import time
+import logging
+from core.models.message import Message
+from services.intent_classifier import IntentClassifier
+from .base_router import BaseRouter
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TrainedRouter(BaseRouter):
+
+    def __init__(self, *args, intent_classifier: IntentClassifier, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.intent_classifier = intent_classifier
+        self.fallback_stats = {"classifications": 0, "low_evidence": 0, "fallbacks": 0}
+
+    async def determine_route(
+        self,
+        message: Message,
+        chat_history: List[Dict[str, str]],
+    ) -> Tuple[Dict[str, Any], int, int, float]:
+        start_time = time.time()
+        config = self.openai_service.config
+
+        prediction = self.intent_classifier.predict_with_evidence(message.message)
+        evidence = {
+            "route": prediction.route,
+            "probability": prediction.probability,
+            "margin": prediction.margin,
+            "known_words": prediction.known_words,
+            "low_evidence": None,
+            "fallback": None,
+        }
+        if prediction.known_words < config.INTENT_CLASSIFIER_MIN_KNOWN_WORDS:
+            evidence["low_evidence"] = "unknown_words"
+        elif prediction.margin < config.INTENT_CLASSIFIER_MIN_MARGIN:
+            evidence["low_evidence"] = "small_margin"
+
+        self.fallback_stats["classifications"] += 1
+        if evidence["low_evidence"]:
+            self.fallback_stats["low_evidence"] += 1
+        if evidence["low_evidence"] and config.INTENT_CLASSIFIER_LLM_FALLBACK:
+            # Opt-in: the classifier has too little to go on, so the LLM decides
+            self.fallback_stats["fallbacks"] += 1
+            evidence["fallback"] = evidence["low_evidence"]
+            classification, input_tokens, output_tokens = await self.classify_with_llm(message, chat_history)
+        else:
+            # A low calibrated confidence makes handle_route ask for clarification
+            classification = {
+                "category": prediction.route,
+                "confidence": prediction.probability * 100,  # Convert to percentage
+                "justification": "Determined by trained intent classifier",
+            }
+            input_tokens = output_tokens = 0  # No tokens used for the local classifier
+        classifications = self.fallback_stats["classifications"]
+        evidence["low_evidence_rate"] = self.fallback_stats["low_evidence"] / classifications
+        evidence["fallback_rate"] = self.fallback_stats["fallbacks"] / classifications
+        classification["intent_classifier"] = evidence
+
+        logger.info(f"Route determined: {classification}")
+        return classification, input_tokens, output_tokens, time.time() - start_time
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from services.weaviate_service import SearchParams, WeaviateService
+
+logger = logging.getLogger(__name__)
+
+
+class ProductPrefetch:
+    """
+    A semantic product search on the raw message, started while the route is still being classified.
+
+    Product routes use the results as warm candidates instead of waiting on a search of their own; every
+    other route cancels it. Awaiting the results never raises: a failed or cancelled prefetch yields no
+    candidates and the agents search as usual.
+    """
+
+    def __init__(self, weaviate_service: WeaviateService, query: str, limit: int, include_vector: bool = False):
+        self.query = query
+        self.limit = limit
+        self.start_time = time.time()
+        self.time_taken: Optional[float] = None
+        self.candidates: Optional[List[Dict[str, Any]]] = None
+        search_params: SearchParams = {"query": query, "limit": limit, "search_type": "semantic"}
+        if include_vector:
+            search_params["include_vector"] = True
+        self.task = asyncio.create_task(weaviate_service.search_products(search_params))
+        self.task.add_done_callback(self._record_time)
+
+    def _record_time(self, task: asyncio.Task) -> None:
+        self.time_taken = time.time() - self.start_time
+
+    async def results(self) -> List[Dict[str, Any]]:
+        if self.candidates is None:
+            try:
+                self.candidates = await asyncio.shield(self.task)
+            except asyncio.CancelledError:
+                if not self.task.cancelled():
+                    raise
+                self.candidates = []
+            except Exception as e:
+                logger.warning(f"Product search prefetch failed, searching without it: {e}")
+                self.candidates = []
+        return self.candidates
+
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+
+    def stats(self, search_results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        used = self.candidates is not None
+        stats = {
+            "used": used,
+            "cancelled": self.task.cancelled(),
+            "time_taken": self.time_taken,
+            "candidates": len(self.candidates) if used else 0,
+        }
+        if used and search_results is not None:
+            candidate_ids = {candidate["product_id"] for candidate in self.candidates}
+            stats["hits"] = sum(1 for result in search_results if result.get("product_id") in candidate_ids)
+        return stats
@@ -1,6 +1,6 @@
-import json
 import logging
 from typing import Dict, Any, List, Union
+from services.utils.structured_output import extract_json
 
 logger = logging.getLogger(__name__)
 
@@ -53,8 +53,4 @@ class ResponseFormatter:
     def _clean_response(response: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
         if isinstance(response, dict):
             return response
-        try:
-            response = response.replace("```", "").replace("json", "").replace("\n", "").strip()
-            return json.loads(response)
-        except json.JSONDecodeError:
-            raise ValueError(f"Invalid JSON response: {response}")
+        return extract_json(response)
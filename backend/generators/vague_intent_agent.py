@@ -1,15 +1,19 @@
-import json
 import logging
 import time
 from core.models.message import Message
 from prompts.prompt_manager import PromptManager
 from services.openai_service import OpenAIService
+from services.utils.product_serializer import ProductSerializer
+from services.utils.streaming import StreamCallback, generate_with_stream_callback
+from services.utils.tracing import tracer
 from services.query_processor import QueryProcessor
 from services.weaviate_service import WeaviateService
+from services.vector_reranker import VectorReranker
+from .utils.product_prefetch import ProductPrefetch
 from .utils.response_formatter import ResponseFormatter
 from langgraph.graph import StateGraph, END
 from langchain_core.runnables import RunnableConfig
-from typing import List, Dict, Any, TypedDict, Annotated
+from typing import List, Dict, Any, Optional, TypedDict, Annotated
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +32,7 @@ class VagueIntentState(TypedDict):
     input_tokens: Annotated[Dict[str, int], merge_dict]
     output_tokens: Annotated[Dict[str, int], merge_dict]
     time_taken: Annotated[Dict[str, float], merge_dict]
+    token_budget: Annotated[Dict[str, Dict[str, Any]], merge_dict]
     output: Dict[str, Any]
     filters: Dict[str, Any]  # Add this line
 
@@ -39,11 +44,13 @@ class VagueIntentAgent:
         query_processor: QueryProcessor,
         openai_service: OpenAIService,
         prompt_manager: PromptManager,
+        reranker: Optional[VectorReranker] = None,
     ):
         self.weaviate_service = weaviate_service
         self.query_processor = query_processor
         self.openai_service = openai_service
         self.prompt_manager = prompt_manager
+        self.reranker = reranker
         self.response_formatter = ResponseFormatter()
         self.workflow = self.setup_workflow()
 
@@ -62,6 +69,7 @@ class VagueIntentAgent:
 
         return workflow.compile()
 
+    @tracer.traced("vague_intent.query_generation")
     async def query_generation_node(self, state: VagueIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
         result, input_tokens, output_tokens = await self.query_processor.generate_semantic_search_query(
@@ -79,6 +87,7 @@ class VagueIntentAgent:
             "time_taken": {"query_generation": time.time() - start_time},
         }
 
+    @tracer.traced("vague_intent.product_search")
     async def product_search_node(self, state: VagueIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
         limit = state["product_count"]
@@ -87,89 +96,57 @@ class VagueIntentAgent:
         logger.info(f"Filters: {filters}")
         logger.info(f"Semantic search query: {state['semantic_search_query']}")
 
-        unique_results = {}
-
-        # If filters exist, start with hybrid search
-        if filters:
-            filter_query = " ".join([f"{key}:{value}" for key, value in filters.items()])
-            hybrid_results = await self.weaviate_service.search_products(
-                {"query": filter_query, "filters": filters, "limit": limit * 2, "search_type": "hybrid"}
-            )
-
-            for result in hybrid_results:
-                if len(unique_results) >= limit:
-                    break
-                unique_results[result["product_id"]] = result
-
-            # If not enough results, perform partial hybrid searches
-            if len(unique_results) < limit:
-                for key, value in filters.items():
-                    if len(unique_results) >= limit:
-                        break
-                    partial_results = await self.weaviate_service.search_products(
-                        {
-                            "query": f"{key}:{value}",
-                            "filters": {key: value},
-                            "limit": limit - len(unique_results),
-                            "search_type": "hybrid",
-                        }
-                    )
-                    for result in partial_results:
-                        if result["product_id"] not in unique_results:
-                            unique_results[result["product_id"]] = result
-                            if len(unique_results) >= limit:
-                                break
-
-        # If still not enough results or no filters, use direct semantic search
-        if len(unique_results) < limit:
-            semantic_results = await self.weaviate_service.search_products(
-                {
-                    "query": state["semantic_search_query"],
-                    "limit": limit * 2 - len(unique_results),
-                    "search_type": "semantic",
-                }
-            )
-
-            for result in semantic_results:
-                if result["product_id"] not in unique_results:
-                    unique_results[result["product_id"]] = result
-                    if len(unique_results) >= limit:
-                        break
+        prefetch = config.get("configurable", {}).get("prefetch")
+        final_results = await self.weaviate_service.search_with_relaxation(
+            filters,
+            self.reranker.candidate_limit(limit) if self.reranker else limit,
+            semantic_query=state["semantic_search_query"],
+            # Warm candidates from the semantic search started during route classification
+            warm_candidates=prefetch.results if prefetch is not None else None,
+            include_vector=self.reranker is not None,
+        )
+        time_taken = {"search": time.time() - start_time}
 
-        final_results = list(unique_results.values())[:limit]
+        if self.reranker:
+            rerank_start_time = time.time()
+            final_results = await self.reranker.rerank(state["semantic_search_query"], final_results, filters, limit)
+            time_taken["rerank"] = time.time() - rerank_start_time
 
         logger.info(f"\n\n===:> Final results: {final_results}\n\n")
         logger.info(f"Number of products found: {len(final_results)}")
 
         return {
             "search_results": final_results,
-            "time_taken": {"search": time.time() - start_time},
+            "time_taken": time_taken,
         }
 
+    @tracer.traced("vague_intent.response_generation")
     async def response_generation_node(self, state: VagueIntentState, config: RunnableConfig) -> Dict[str, Any]:
         start_time = time.time()
+        planner = self.openai_service.token_planner
 
-        products_with_certainty = [
-            {
-                "product_id": p["product_id"],
-                "name": p["name"],
-                **{attr: p.get(attr, "Not specified") for attr in state["filters"].keys()},
-                "summary": p.get("full_product_description", ""),
-                "certainty": p.get("certainty", 0),
-            }
-            for p in state["search_results"]
-        ]
+        products = ProductSerializer(planner).fit(
+            state["search_results"],
+            planner.get_budget("vague_intent_response").max_payload_tokens,
+            state["model_name"],
+            attributes=[*state["filters"].keys(), "certainty"],
+        )
 
         system_message, user_message = self.prompt_manager.get_vague_intent_response_prompt(
             state["current_message"],
-            json.dumps(products_with_certainty, indent=2),
+            products.payload,
             state["product_count"],
         )
+        plan = planner.plan(
+            "vague_intent_response", system_message, user_message, state["chat_history"], state["model_name"]
+        )
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
+        response, input_tokens, output_tokens = await generate_with_stream_callback(
+            self.openai_service,
+            config.get("configurable", {}).get("stream_callback"),
             user_message=user_message,
             system_message=system_message,
-            formatted_chat_history=state["chat_history"],
+            formatted_chat_history=plan.chat_history,
             temperature=0,
             model=state["model_name"],
         )
@@ -177,12 +154,19 @@ class VagueIntentAgent:
 
         return {
             "output": response,
+            "token_budget": {"generate": plan.report(input_tokens), "products": products.report()},
             "input_tokens": {"generate": input_tokens},
             "output_tokens": {"generate": output_tokens},
             "time_taken": {"generate": time.time() - start_time},
         }
 
-    async def run(self, message: Message, chat_history: List[Message]) -> Dict[str, Any]:
+    async def run(
+        self,
+        message: Message,
+        chat_history: List[Message],
+        stream_callback: Optional[StreamCallback] = None,
+        prefetch: Optional[ProductPrefetch] = None,
+    ) -> Dict[str, Any]:
         logger.info(f"Running VagueIntentAgent with message: {message}")
 
         initial_state: VagueIntentState = {
@@ -195,13 +179,16 @@ class VagueIntentAgent:
             "input_tokens": {},
             "output_tokens": {},
             "time_taken": {},
+            "token_budget": {},
             "output": {},
             "filters": {},  # Add this line
         }
 
         try:
             logger.info("Starting workflow execution")
-            final_state = await self.workflow.ainvoke(initial_state)
+            final_state = await self.workflow.ainvoke(
+                initial_state, config={"configurable": {"stream_callback": stream_callback, "prefetch": prefetch}}
+            )
             logger.info("Workflow execution completed")
             return final_state
         except Exception as e:
@@ -6,9 +6,17 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.types import ASGIApp, Receive, Scope, Send
-from dependencies import container, get_socket_handler, get_weaviate_service, get_openai_service
+from dependencies import (
+    container,
+    get_socket_handler,
+    get_weaviate_service,
+    get_openai_service,
+    get_route_index,
+    get_intent_classifier,
+)
 
 from config import config
+from services.utils.tracing import tracer
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -47,12 +55,20 @@ class CustomCORSMiddleware:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tracer.configure(config.TRACE_BUFFER_SIZE, config.TRACING_ENABLED)
+
     weaviate_service = get_weaviate_service()
     await weaviate_service.initialize_weaviate(container.config.RESET_WEAVIATE())
 
     openai_service = get_openai_service()
     await openai_service.initialize()
 
+    route_index = get_route_index()
+    await route_index.initialize()
+
+    # Load (or train) the intent classifier now rather than on the first trained-router message
+    get_intent_classifier()
+
     socket_handler = get_socket_handler()
 
     # Apply custom CORS middleware to socket.io app
@@ -0,0 +1,94 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional, Type, Union
+from pydantic import BaseModel, Field, create_model, field_validator
+
+# Typed replies for the processing prompts. The services turn these into provider-side
+# schema constraints (OpenAI json_schema, Anthropic forced tool use) and validate the
+# reply back into the model, so callers never parse free text.
+
+
+class RouteClassification(BaseModel):
+    category: Literal["politics", "chitchat", "vague_intent_product", "clear_intent_product", "do_not_respond"]
+    justification: str = Field(description="A brief explanation for this classification")
+    confidence: float = Field(description="Confidence score between 0 and 100")
+
+
+class QueryProcessorContext(BaseModel):
+    num_products_requested: int = 5
+    sort_preference: Optional[str] = None
+
+
+class ProcessedQuery(BaseModel):
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Attribute name to standardized value")
+    query_context: QueryProcessorContext = Field(default_factory=QueryProcessorContext)
+
+
+class SemanticSearchQuery(BaseModel):
+    query: str = Field(description="The generated semantic search query")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Attribute name to standardized value")
+    product_count: int = 5
+
+
+class SortSpec(BaseModel):
+    field: str
+    order: Literal["asc", "desc"]
+
+
+class DynamicQueryContext(BaseModel):
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Attribute name to standardized value")
+    # A list sorts by each key in turn, later keys breaking ties
+    sort: Optional[Union[SortSpec, List[SortSpec]]] = None
+    entities: Dict[str, List[str]] = Field(default_factory=dict)
+    num_products_requested: int = 5
+
+    @field_validator("sort", mode="before")
+    @classmethod
+    def empty_sort_to_none(cls, v):
+        # The prompt examples use {} for "no sort"
+        return v or None
+
+
+class DirectResponse(BaseModel):
+    message: str
+    follow_up_suggestions: List[str] = Field(default_factory=list)
+
+
+class DynamicAnalysis(BaseModel):
+    """Exactly one of query_context, direct_response or security_flags is expected."""
+
+    query_context: Optional[DynamicQueryContext] = None
+    direct_response: Optional[DirectResponse] = None
+    security_flags: List[Literal["exploit", "inappropriate", "political"]] = Field(default_factory=list)
+
+
+class FeatureValue(BaseModel):
+    value: Any = Field(description="The extracted information, or 'Not available'")
+    confidence: float = Field(description="Confidence between 0 and 1")
+
+
+def _is_feature_leaf(value: Any) -> bool:
+    return not isinstance(value, dict) or ("value" in value and "confidence" in value)
+
+
+def _build_feature_model(name: str, structure: Dict[str, Any]) -> Type[BaseModel]:
+    fields = {}
+    for key, value in structure.items():
+        if _is_feature_leaf(value):
+            fields[key] = (Optional[FeatureValue], None)
+        else:
+            fields[key] = (Optional[_build_feature_model(f"{name}_{key}", value)], None)
+    return create_model(name, **fields)
+
+
+@lru_cache(maxsize=256)
+def _feature_extraction_model(structure_json: str) -> Type[BaseModel]:
+    return _build_feature_model("ExtractedFeatures", json.loads(structure_json))
+
+
+def feature_extraction_model(structure: Dict[str, Any]) -> Type[BaseModel]:
+    """
+    Build the reply model for a feature extraction prompt from its attribute structure, where
+    leaves (descriptions or value/confidence placeholders) become FeatureValue fields.
+    """
+    return _feature_extraction_model(json.dumps(structure, sort_keys=True))
@@ -67,6 +67,9 @@ class PromptManager:
 
         return messages[0].content, messages[1].content
 
+    def is_cacheable(self, prompt_type: str) -> bool:
+        return self.prompts[prompt_type].cacheable_system_prompt
+
     def validate_kwargs(self, prompt_type: str, **kwargs) -> None:
         expected_variables = set(self.prompts[prompt_type].input_variables)
         provided_variables = set(kwargs.keys())
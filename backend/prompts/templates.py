@@ -7,6 +7,9 @@ logger = logging.getLogger(__name__)
 
 
 class BaseChatPrompt:
+    # Large, static system prompts opt in to provider-side prompt caching
+    cacheable_system_prompt = False
+
     def __init__(self, system_template: str, human_template: str, input_variables: List[str]):
         self.template = ChatPromptTemplate.from_messages(
             [
@@ -693,6 +696,8 @@ class LowConfidenceFeatureRefinementPrompt(BaseChatPrompt):
 
 
 class DynamicAnalysisPrompt(BaseChatPrompt):
+    cacheable_system_prompt = True
+
     def __init__(self):
         system_template = (
             PROCESSING_BASE
@@ -792,7 +797,7 @@ class DynamicAnalysisPrompt(BaseChatPrompt):
                     "attribute_name": "STANDARDIZED_VALUE" // Use only provided attribute names; return empty if no filters
                 }},
                 "sort": {{                    // Optional—based on detected sort preference; return empty if no sort
-                    "field": "attribute_name",
+                    "field": "attribute_name",  // For tie-breakers, a list of these, most significant first
                     "order": "asc" | "desc"
                 }},
                 "entities": {{                // Contextual information—LLM determines groups and values; return empty if no entities
@@ -939,6 +944,8 @@ class DynamicAnalysisPrompt(BaseChatPrompt):
 
 
 class DynamicResponsePrompt(BaseChatPrompt):
+    cacheable_system_prompt = True
+
     def __init__(self):
         system_template = (
             PROCESSING_BASE
@@ -0,0 +1,67 @@
+"""
+Fill the Product collection's numeric shadow properties (memory_gb, tdp_w, temp_min_c, ...) for products stored
+before they existed. Adds any schema properties the collection lacks, then parses each product's text fields and
+updates the objects whose shadows are missing or stale. Safe to re-run.
+
+    python -m scripts.backfill_numeric_properties --dry-run
+    python -m scripts.backfill_numeric_properties --page-size 200
+"""
+
+import argparse
+import asyncio
+import json
+from collections import Counter
+from typing import Dict
+from config import Config
+from weaviate_interface import WeaviateInterface
+from weaviate_interface.services.product_service import ProductService
+from weaviate_interface.utils.unit_parser import FIELD_KINDS, NUMERIC_PROPERTIES, numeric_properties
+
+
+async def backfill(product_service: ProductService, page_size: int = 100, dry_run: bool = False) -> Dict[str, int]:
+    """Updates the products whose shadows differ from their parsed text fields; returns counts of what was done."""
+    stats: Counter = Counter()
+    return_properties = list(FIELD_KINDS) + list(NUMERIC_PROPERTIES)
+    after = None
+    while True:
+        # Cursor pages: each one costs the same however far into the catalog it is
+        products = await product_service.get_all(limit=page_size, after=after, return_properties=return_properties)
+        if not products:
+            break
+        after = products[-1]["id"]
+
+        for product in products:
+            stats["products"] += 1
+            shadows = numeric_properties({field: product.get(field) for field in FIELD_KINDS})
+            changes = {name: value for name, value in shadows.items() if product.get(name) != value}
+            stats.update(f"unparsed_{name}" for name, value in shadows.items() if value is None)
+            if not changes:
+                stats["unchanged"] += 1
+                continue
+            stats["updated"] += 1
+            if not dry_run:
+                await product_service.update(product["id"], changes)
+    return dict(stats)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without updating products")
+    args = parser.parse_args()
+
+    config = Config()
+    wi = WeaviateInterface(config.WEAVIATE_URL, config.OPENAI_API_KEY)
+    await wi.client.connect()
+    try:
+        # Adding properties keeps existing data, so it happens on dry runs too (the reads need them)
+        added = await wi.schema.add_missing_properties("Product")
+        print(f"Added properties: {added or 'none'}")
+        stats = await backfill(wi.product_service, args.page_size, args.dry_run)
+        print(json.dumps(stats, indent=2, sort_keys=True))
+    finally:
+        await wi.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,492 @@
+"""
+Compare the routers' determine_route on the labelled prompts in data/*.csv and test/*.json.
+
+Reports accuracy, the confusion matrix, p50/p95/p99 latency, tokens per query, the rate at which the LLM had to
+decide (fallback) and the rate at which the cascade's small model handed over to the default model (escalation)
+for each router, as summary.json and summary.csv, plus one row per query in queries.csv.
+
+Services:
+    live    call OpenAI and Weaviate
+    record  call OpenAI and Weaviate, and save every response with its latency to --tape
+    replay  answer from --tape with the recorded latencies; no network access or API keys needed
+    fake    deterministic stand-ins: the trained intent classifier plays the LLM with a fixed latency and
+            embeddings are hashed bags of words. Exercises the harness and the routers' orchestration;
+            accuracy is only meaningful with live or replayed services.
+
+Labels: CSV rows use their route/expected_route column. test/*.json prompts that carry expected filters
+or products are product queries, counted correct for either product route. Defensibility conversations
+expect politics for the politics category and do_not_respond otherwise. The trained router is not scored on
+the CSV files its intent classifier was fitted on, so its query count is lower than the other routers'.
+--limit takes a seeded random sample rather than the first rows, which all come from one file.
+
+    python -m scripts.benchmark_routers --services record --tape benchmark/tape.jsonl
+    python -m scripts.benchmark_routers --services replay --tape benchmark/tape.jsonl --output-dir benchmark
+"""
+
+import argparse
+import asyncio
+import csv
+import datetime
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, FrozenSet, List, Optional
+import numpy as np
+from config import Config
+from core.models.message import Message
+from generators.base_router import BaseRouter
+from generators.hybrid_router import HybridRouter
+from generators.llm_router import LLMRouter
+from generators.semantic_router import SemanticRouter
+from generators.trained_router import TrainedRouter
+from prompts.prompt_manager import PromptManager
+from services.intent_classifier import TRAINING_FILES, IntentClassifier
+from services.openai_service import OpenAIService
+from services.semantic_route_index import SemanticRouteIndex
+
+PRODUCT_ROUTES = frozenset({"clear_intent_product", "vague_intent_product"})
+LOW_CONFIDENCE_THRESHOLD = 50  # BaseRouter.handle_route asks for clarification below this
+
+
+@dataclass
+class BenchmarkSample:
+    prompt: str
+    expected: str
+    accepted: FrozenSet[str]
+    source: str
+
+
+def load_samples(data_dir: str, test_dir: str) -> List[BenchmarkSample]:
+    samples = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.csv"))):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            label_column = next((c for c in ("route", "expected_route") if c in (reader.fieldnames or [])), None)
+            if "prompt" not in (reader.fieldnames or []) or label_column is None:
+                continue
+            for row in reader:
+                route = (row[label_column] or "").strip().lower()
+                if row["prompt"] and route:
+                    samples.append(BenchmarkSample(row["prompt"].strip(), route, frozenset({route}), path))
+
+    for path in sorted(glob.glob(os.path.join(test_dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            cases = json.load(f)
+        for case in cases:
+            if "category" in case:
+                expected = "politics" if case["category"] == "politics" else "do_not_respond"
+                samples += [
+                    BenchmarkSample(turn["query"], expected, frozenset({expected}), path)
+                    for turn in case["conversation"]
+                ]
+            elif "conversation" in case:
+                samples += [
+                    BenchmarkSample(turn["query"], "product", PRODUCT_ROUTES, path) for turn in case["conversation"]
+                ]
+            else:
+                prompts = [case["prompt"]] + [v for v in case.get("variations", []) if isinstance(v, str)]
+                samples += [BenchmarkSample(prompt, "product", PRODUCT_ROUTES, path) for prompt in prompts]
+    return samples
+
+
+def samples_for(router_name: str, samples: List[BenchmarkSample]) -> List[BenchmarkSample]:
+    """The samples a router is scored on: the trained router's own training data would only measure recall."""
+    if router_name != "trained-router":
+        return samples
+    return [sample for sample in samples if os.path.basename(sample.source) not in TRAINING_FILES]
+
+
+class ServiceTape:
+    """Recorded service responses, keyed by a hash of the request, in a JSON lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry["response"]
+
+    @staticmethod
+    def key(kind: str, request: Any) -> str:
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get(self, key: str) -> Dict[str, Any]:
+        if key not in self.entries:
+            raise LookupError(f"No recorded response for {key}; record the tape again")
+        return self.entries[key]
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        self.entries[key] = response
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "response": response}) + "\n")
+
+
+def _completion_response(content: str, prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+def _embedding_response(vectors: List[List[float]], total_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        data=[SimpleNamespace(index=i, embedding=vector) for i, vector in enumerate(vectors)],
+        usage=SimpleNamespace(total_tokens=total_tokens),
+    )
+
+
+class TapedChatCompletions:
+    def __init__(self, tape: ServiceTape, inner=None):
+        self.tape = tape
+        self.inner = inner
+
+    async def create(self, **kwargs):
+        key = self.tape.key("chat", kwargs)
+        if self.inner is None:
+            recorded = self.tape.get(key)
+            await asyncio.sleep(recorded["latency"])
+            return _completion_response(recorded["content"], recorded["prompt_tokens"], recorded["completion_tokens"])
+
+        start_time = time.time()
+        response = await self.inner.create(**kwargs)
+        self.tape.put(
+            key,
+            {
+                "content": response.choices[0].message.content,
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "latency": time.time() - start_time,
+            },
+        )
+        return response
+
+
+class TapedEmbeddings:
+    """Records each input's vector separately, so replays do not depend on how inputs were batched."""
+
+    def __init__(self, tape: ServiceTape, inner=None):
+        self.tape = tape
+        self.inner = inner
+
+    async def create(self, input: List[str], model: str):
+        keys = [self.tape.key("embedding", {"model": model, "input": text}) for text in input]
+        if self.inner is None:
+            recorded = [self.tape.get(key) for key in keys]
+            await asyncio.sleep(max(entry["latency"] for entry in recorded))
+            return _embedding_response(
+                [entry["embedding"] for entry in recorded], sum(entry["tokens"] for entry in recorded)
+            )
+
+        start_time = time.time()
+        response = await self.inner.create(input=input, model=model)
+        latency = time.time() - start_time
+        for item in response.data:
+            self.tape.put(
+                keys[item.index],
+                {
+                    "embedding": list(item.embedding),
+                    "tokens": response.usage.total_tokens / len(input),
+                    "latency": latency,
+                },
+            )
+        return response
+
+
+class TapedWeaviateService:
+    def __init__(self, tape: ServiceTape, inner=None):
+        self.tape = tape
+        self.inner = inner
+
+    async def search_routes(self, query: str):
+        key = self.tape.key("search_routes", query)
+        if self.inner is None:
+            recorded = self.tape.get(key)
+            await asyncio.sleep(recorded["latency"])
+            return [tuple(route) for route in recorded["routes"]]
+
+        start_time = time.time()
+        routes = await self.inner.search_routes(query)
+        self.tape.put(key, {"routes": [list(route) for route in routes], "latency": time.time() - start_time})
+        return routes
+
+
+class FakeChatCompletions:
+    """Answers route classification prompts with the trained intent classifier's prediction for the current query."""
+
+    def __init__(self, classifier: IntentClassifier, latency: float):
+        self.classifier = classifier
+        self.latency = latency
+        self.query = ""
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        route, probability = self.classifier.predict(self.query)
+        content = json.dumps(
+            {"category": route, "justification": "Fake classification", "confidence": round(probability * 100)}
+        )
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in kwargs["messages"]) // 4
+        return _completion_response(content, prompt_tokens, len(content) // 4)
+
+
+class FakeEmbeddings:
+    DIMENSIONS = 256
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, input: List[str], model: str):
+        await asyncio.sleep(self.latency)
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.DIMENSIONS)
+            for word in re.findall(r"[a-z0-9]+", text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.DIMENSIONS] += 1
+            vectors.append(vector.tolist())
+        return _embedding_response(vectors, sum(len(text.split()) for text in input))
+
+
+class FakeWeaviateService:
+    async def search_routes(self, query: str):
+        return []
+
+
+class FixedEncoder:
+    """Four characters per token; avoids downloading tiktoken encodings for fake and replayed runs."""
+
+    def encode(self, text: str) -> List[int]:
+        return [0] * (len(text) // 4)
+
+
+async def build_services(args: argparse.Namespace, config: Config):
+    # No completion or embedding cache: repeated prompts must reach the services
+    openai_service = OpenAIService(config.OPENAI_API_KEY, config)
+    fake_completions = None
+
+    if args.services in ("live", "record"):
+        from feature_extraction.product_data_preprocessor import ProductDataProcessor
+        from services.weaviate_service import WeaviateService
+
+        await openai_service.connect()
+        weaviate_service = WeaviateService(config.OPENAI_API_KEY, config.WEAVIATE_URL, ProductDataProcessor())
+        await weaviate_service.initialize_weaviate()
+        if args.services == "record":
+            tape = ServiceTape(args.tape)
+            client = openai_service.client
+            openai_service.client = SimpleNamespace(
+                chat=SimpleNamespace(completions=TapedChatCompletions(tape, client.chat.completions)),
+                embeddings=TapedEmbeddings(tape, client.embeddings),
+            )
+            weaviate_service = TapedWeaviateService(tape, weaviate_service)
+    else:
+        for model in {config.DEFAULT_MODEL, config.CLASSIFICATION_CASCADE_MODEL, config.EMBEDDING_MODEL, args.model}:
+            openai_service.encoders[model] = FixedEncoder()
+        if args.services == "replay":
+            tape = ServiceTape(args.tape)
+            openai_service.client = SimpleNamespace(
+                chat=SimpleNamespace(completions=TapedChatCompletions(tape)), embeddings=TapedEmbeddings(tape)
+            )
+            weaviate_service = TapedWeaviateService(tape)
+        else:
+            fake_completions = FakeChatCompletions(IntentClassifier.from_config(config), args.fake_llm_latency)
+            openai_service.client = SimpleNamespace(
+                chat=SimpleNamespace(completions=fake_completions),
+                embeddings=FakeEmbeddings(args.fake_embedding_latency),
+            )
+            weaviate_service = FakeWeaviateService()
+
+    return openai_service, weaviate_service, fake_completions
+
+
+async def build_routers(args, config, openai_service, weaviate_service) -> Dict[str, BaseRouter]:
+    route_index = SemanticRouteIndex(openai_service, weaviate_service)
+    await route_index.initialize()
+    prompt_manager = PromptManager()
+    common = (None, openai_service, weaviate_service, None, None, prompt_manager)
+    routers = {
+        "llm-router": LLMRouter(*common),
+        "semantic-router": SemanticRouter(*common, route_index=route_index),
+        "hybrid-router": HybridRouter(*common, route_index=route_index),
+        "trained-router": TrainedRouter(*common, intent_classifier=IntentClassifier.from_config(config)),
+    }
+    return {name: router for name, router in routers.items() if name in args.routers}
+
+
+def _fallback(classification: Dict[str, Any], input_tokens: int, router_name: str) -> bool:
+    """Whether the router's own classification was not confident enough and the LLM decided."""
+    if router_name == "hybrid-router":
+        if "speculation" in classification:
+            return classification["speculation"]["winner"] == "llm"
+        return input_tokens > 0  # The semantic route was not confident enough and the LLM decided
+    if router_name == "trained-router":
+        return bool(classification.get("intent_classifier", {}).get("fallback"))
+    return False
+
+
+def _escalated(classification: Dict[str, Any]) -> bool:
+    """Whether the cascade's small model was not confident enough and the default model decided."""
+    return "cascade" in classification and classification["cascade"]["escalated"]
+
+
+async def run_router(
+    router_name: str,
+    router: BaseRouter,
+    samples: List[BenchmarkSample],
+    model: str,
+    fake_completions: Optional[FakeChatCompletions],
+) -> List[Dict[str, Any]]:
+    rows = []
+    for i, sample in enumerate(samples):
+        message = Message(
+            id=str(i),
+            message=sample.prompt,
+            timestamp=datetime.datetime.now(),
+            session_id="benchmark",
+            model=model,
+            architecture_choice=router_name,
+            history_management_choice="keep-none",
+        )
+        if fake_completions is not None:
+            fake_completions.query = sample.prompt
+        row = {"router": router_name, "source": sample.source, "prompt": sample.prompt, "expected": sample.expected}
+        start_time = time.time()
+        try:
+            classification, input_tokens, output_tokens, _ = await router.determine_route(message, [])
+            row.update(
+                predicted=classification["category"],
+                confidence=classification["confidence"],
+                correct=classification["category"] in sample.accepted,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                fallback=_fallback(classification, input_tokens, router_name),
+                escalated=_escalated(classification),
+                error="",
+            )
+        except Exception as e:
+            row.update(
+                predicted="error",
+                confidence=0,
+                correct=False,
+                input_tokens=0,
+                output_tokens=0,
+                fallback=False,
+                escalated=False,
+                error=str(e),
+            )
+        row["latency_ms"] = (time.time() - start_time) * 1000
+        rows.append(row)
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = np.array([row["latency_ms"] for row in rows])
+    confusion: Dict[str, Counter] = defaultdict(Counter)
+    for row in rows:
+        confusion[row["expected"]][row["predicted"]] += 1
+    return {
+        "queries": len(rows),
+        "accuracy": float(np.mean([row["correct"] for row in rows])),
+        "latency_ms": {
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "p99": float(np.percentile(latencies, 99)),
+        },
+        "tokens_per_query": {
+            "input": float(np.mean([row["input_tokens"] for row in rows])),
+            "output": float(np.mean([row["output_tokens"] for row in rows])),
+        },
+        "fallback_rate": float(np.mean([row["fallback"] for row in rows])),
+        "escalation_rate": float(np.mean([row["escalated"] for row in rows])),
+        "low_confidence_rate": float(np.mean([row["confidence"] < LOW_CONFIDENCE_THRESHOLD for row in rows])),
+        "error_rate": float(np.mean([bool(row["error"]) for row in rows])),
+        "confusion_matrix": {expected: dict(predicted) for expected, predicted in sorted(confusion.items())},
+    }
+
+
+def write_reports(output_dir: str, summaries: Dict[str, Dict[str, Any]], rows: List[Dict[str, Any]]) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summaries, f, indent=2)
+
+    with open(os.path.join(output_dir, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["router", "queries", "accuracy", "p50_ms", "p95_ms", "p99_ms", "input_tokens", "output_tokens"]
+            + ["fallback_rate", "escalation_rate", "low_confidence_rate", "error_rate"]
+        )
+        for name, summary in summaries.items():
+            latency, tokens = summary["latency_ms"], summary["tokens_per_query"]
+            writer.writerow(
+                [name, summary["queries"], summary["accuracy"], latency["p50"], latency["p95"], latency["p99"]]
+                + [tokens["input"], tokens["output"], summary["fallback_rate"], summary["escalation_rate"]]
+                + [summary["low_confidence_rate"], summary["error_rate"]]
+            )
+
+    with open(os.path.join(output_dir, "queries.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", choices=["live", "record", "replay", "fake"], default="fake")
+    parser.add_argument("--tape", default="benchmark/tape.jsonl", help="Recorded responses for record/replay")
+    parser.add_argument(
+        "--routers",
+        nargs="+",
+        default=["llm-router", "semantic-router", "hybrid-router", "trained-router"],
+        choices=["llm-router", "semantic-router", "hybrid-router", "trained-router"],
+    )
+    parser.add_argument("--model", default=None, help="Model requested by the messages (default: DEFAULT_MODEL)")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--test-dir", default="test")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay a random sample of N prompts")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the --limit sample")
+    parser.add_argument("--fake-llm-latency", type=float, default=0.5)
+    parser.add_argument("--fake-embedding-latency", type=float, default=0.05)
+    parser.add_argument("--output-dir", default="benchmark")
+    args = parser.parse_args()
+
+    config = Config()
+    args.model = args.model or config.DEFAULT_MODEL
+    samples = load_samples(args.data_dir, args.test_dir)
+    if args.limit is not None and args.limit < len(samples):
+        samples = random.Random(args.seed).sample(samples, args.limit)
+    print(f"Benchmarking {len(args.routers)} routers on {len(samples)} prompts with {args.services} services")
+
+    openai_service, weaviate_service, fake_completions = await build_services(args, config)
+    routers = await build_routers(args, config, openai_service, weaviate_service)
+
+    rows, summaries = [], {}
+    for name, router in routers.items():
+        router_rows = await run_router(name, router, samples_for(name, samples), args.model, fake_completions)
+        summaries[name] = summarize(router_rows)
+        rows += router_rows
+        summary = summaries[name]
+        print(
+            f"{name}: accuracy {summary['accuracy']:.3f}, p50 {summary['latency_ms']['p50']:.1f}ms, "
+            f"p95 {summary['latency_ms']['p95']:.1f}ms, {summary['tokens_per_query']['input']:.0f} input tokens/query, "
+            f"fallback {summary['fallback_rate']:.2f}, escalation {summary['escalation_rate']:.2f}, "
+            f"errors {summary['error_rate']:.2f}"
+        )
+
+    write_reports(args.output_dir, summaries, rows)
+    print(f"Reports written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+Check the sorted_query route's server-side multi-key sorts against a full-scan ground truth.
+
+For each case, runs the filtered, sorted search DynamicAgent issues, then pages through every product matching
+the filters and sorts them in Python on the same keys. Unit-bearing fields are compared on the value their text
+parses to, which is what the numeric shadow the server sorts on holds, so stale shadows show up as mismatches.
+Nulls sort as the smallest value. A case is exact when the top-N sort keys agree; products that tie on every key
+may come back in either order, so overlap compares product ids only as a hint. Latency is reported for both ways
+of answering.
+
+    python -m scripts.benchmark_sorting
+    python -m scripts.benchmark_sorting --limit 10 --repeat 20 --output benchmark/sorting.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from config import Config
+from feature_extraction.product_data_preprocessor import ProductDataProcessor
+from services.weaviate_service import SortConfig, SortOrder, WeaviateService
+from weaviate_interface.utils.unit_parser import comparison_property, numeric_properties
+
+# (filters, sort keys most significant first) as DynamicAgent passes them to search_products
+CASES: List[Tuple[Dict[str, Any], List[Dict[str, str]]]] = [
+    ({}, [{"field": "memory", "order": "desc"}, {"field": "processor_core_count", "order": "desc"}]),
+    ({"form_factor": "SBC"}, [{"field": "processor_tdp", "order": "asc"}, {"field": "memory", "order": "desc"}]),
+    (
+        {},
+        [
+            {"field": "operating_temperature_min", "order": "asc"},
+            {"field": "operating_temperature_max", "order": "desc"},
+        ],
+    ),
+    ({"memory": ">=8GB"}, [{"field": "input_voltage", "order": "desc"}, {"field": "manufacturer", "order": "asc"}]),
+]
+
+
+def sort_key(product: Dict[str, Any], sort_configs: List[SortConfig]) -> Tuple[Any, ...]:
+    """
+    The values a product is sorted on. Searches return the text fields, not the shadows, so unit-bearing fields
+    are parsed the way their shadow is derived.
+    """
+    values = []
+    for config in sort_configs:
+        shadow = comparison_property(config.field)
+        if shadow is None:
+            values.append(product.get(config.field))
+        else:
+            values.append(numeric_properties({config.field: product.get(config.field)})[shadow])
+    return tuple(values)
+
+
+def full_scan_sort(products: List[Dict[str, Any]], sort_configs: List[SortConfig]) -> List[Dict[str, Any]]:
+    """Ground truth ordering: stable sorts from the least significant key up, nulls sorting as the smallest value."""
+    ordered = list(products)
+    for index in reversed(range(len(sort_configs))):
+
+        def key(product: Dict[str, Any]) -> Tuple[Any, ...]:
+            value = sort_key(product, sort_configs)[index]
+            return (0,) if value is None else (1, value)
+
+        ordered.sort(key=key, reverse=sort_configs[index].order == SortOrder.DESC)
+    return ordered
+
+
+async def scan(weaviate_service: WeaviateService, filters: Dict[str, Any], page_size: int) -> List[Dict[str, Any]]:
+    """Every product matching the filters, unsorted."""
+    product_service = weaviate_service.wi.product_service
+    weaviate_filter = weaviate_service.query_builder.build_weaviate_filter(filters) if filters else None
+    products: List[Dict[str, Any]] = []
+    while True:
+        page = await product_service.get_all(limit=page_size, offset=len(products), filters=weaviate_filter)
+        products += page
+        if len(page) < page_size:
+            return products
+
+
+async def run_case(
+    weaviate_service: WeaviateService,
+    filters: Dict[str, Any],
+    sort: List[Dict[str, str]],
+    limit: int,
+    repeat: int,
+    page_size: int,
+) -> Dict[str, Any]:
+    search_params = {"search_type": "filtered", "filters": filters, "sort": sort, "limit": limit}
+    sort_configs = weaviate_service._normalize_sort_config(sort)
+
+    sorted_latencies, scan_latencies = [], []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        results = await weaviate_service.search_products(search_params)
+        sorted_latencies.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        products = await scan(weaviate_service, filters, page_size)
+        truth = full_scan_sort(products, sort_configs)[:limit]
+        scan_latencies.append(time.perf_counter() - start_time)
+
+    result_ids = {product.get("product_id") for product in results}
+    return {
+        "filters": filters,
+        "sort": sort,
+        "matching_products": len(products),
+        "exact": [sort_key(p, sort_configs) for p in results] == [sort_key(p, sort_configs) for p in truth],
+        "overlap": len(result_ids & {product.get("product_id") for product in truth}) / max(len(truth), 1),
+        "sorted_query_ms": {"p50": float(np.percentile(sorted_latencies, 50) * 1000)},
+        "full_scan_ms": {"p50": float(np.percentile(scan_latencies, 50) * 1000)},
+        "top_keys": [list(sort_key(product, sort_configs)) for product in results],
+        "expected_keys": [list(sort_key(product, sort_configs)) for product in truth],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=5, help="Products requested per query")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case for the latency percentiles")
+    parser.add_argument("--page-size", type=int, default=100, help="Page size of the full scan")
+    parser.add_argument("--output", default=None, help="Also write the per-case results to this JSON file")
+    args = parser.parse_args()
+
+    config = Config()
+    weaviate_service = WeaviateService(config.OPENAI_API_KEY, config.WEAVIATE_URL, ProductDataProcessor())
+    await weaviate_service.initialize_weaviate()
+    try:
+        rows = []
+        for filters, sort in CASES:
+            row = await run_case(weaviate_service, filters, sort, args.limit, args.repeat, args.page_size)
+            rows.append(row)
+            keys = ", ".join(f"{key['field']} {key['order']}" for key in sort)
+            print(
+                f"{keys} | filters {filters or 'none'}: exact {row['exact']}, overlap {row['overlap']:.2f}, "
+                f"sorted query p50 {row['sorted_query_ms']['p50']:.1f}ms, full scan of {row['matching_products']} "
+                f"p50 {row['full_scan_ms']['p50']:.1f}ms"
+            )
+    finally:
+        await weaviate_service.close_connection()
+
+    print(f"{sum(row['exact'] for row in rows)}/{len(rows)} cases match the full scan")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Train the trained-router's intent classifier from the labelled CSVs and save it for the API to load.
+
+    python -m scripts.train_intent_classifier --output data/intent_classifier.npz
+"""
+
+import argparse
+import time
+import numpy as np
+from config import Config
+from services.intent_classifier import IntentClassifier, load_training_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data", help="Directory holding the labelled prompt,route CSVs")
+    parser.add_argument("--output", default="data/intent_classifier.npz", help="Where to save the classifier")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out to report accuracy")
+    parser.add_argument("--seed", type=int, default=1729)
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(args.data_dir)
+    print(f"Loaded {len(texts)} labelled prompts for routes {sorted(set(labels))}")
+
+    if args.holdout > 0:
+        order = np.random.default_rng(args.seed).permutation(len(texts))
+        split = int(len(texts) * (1 - args.holdout))
+        train, test = order[:split], order[split:]
+        classifier = IntentClassifier.fit([texts[i] for i in train], [labels[i] for i in train], seed=args.seed)
+        metrics = classifier.evaluate([texts[i] for i in test], [labels[i] for i in test])
+        config = Config()
+        predictions = [classifier.predict_with_evidence(texts[i]) for i in test]
+        low_evidence = np.mean(
+            [
+                p.known_words < config.INTENT_CLASSIFIER_MIN_KNOWN_WORDS
+                or p.margin < config.INTENT_CLASSIFIER_MIN_MARGIN
+                for p in predictions
+            ]
+        )
+        print(
+            f"Held-out accuracy: {metrics['accuracy']:.3f}, "
+            f"mean confidence: {metrics['mean_confidence']:.3f}, "
+            f"low-evidence rate: {low_evidence:.3f} ({len(test)} prompts)"
+        )
+
+    start_time = time.time()
+    classifier = IntentClassifier.fit(texts, labels, seed=args.seed)
+    print(f"Trained on all prompts in {time.time() - start_time:.1f}s, temperature {classifier.temperature:.3f}")
+
+    start_time = time.time()
+    for text in texts:
+        classifier.predict(text)
+    print(f"Mean prediction time: {(time.time() - start_time) / len(texts) * 1e6:.0f}us")
+
+    classifier.save(args.output)
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,35 @@
+import json
 import logging
-from anthropic import AsyncAnthropic
-from typing import List, Optional, Tuple, Dict, Any
+import time
+import tiktoken
+from anthropic import APIConnectionError, AsyncAnthropic, InternalServerError, RateLimitError
+from pydantic import BaseModel
+from typing import AsyncIterator, List, Optional, Tuple, Type, Dict, Any
 from services.utils.enhanced_error_logger import create_error_logger
+from services.utils.completion_cache import CompletionCache
+from services.utils.streaming import StreamChunk, collect_stream
+from services.utils.token_budget import TokenBudgetPlanner
+from services.utils.rate_limiter import RateLimitPriority, call_with_rate_limit, get_rate_limiter
+from services.utils.single_flight import SingleFlight
+from services.utils.structured_output import anthropic_tool, get_response_schema
+from services.utils.tracing import SpanKind, tracer
 from config import Config
 
 logger = logging.getLogger(__name__)
 logger.error = create_error_logger(logger)
 
 class AnthropicService:
-    def __init__(self, api_key: str, config: Config):
+    def __init__(self, api_key: str, config: Config, completion_cache: Optional[CompletionCache] = None):
         self.api_key = api_key
         self.config = config
         self.client = None
+        self.completion_cache = completion_cache
+        self.single_flight = SingleFlight("anthropic")
+        self.encoder = None
+        self.token_planner = TokenBudgetPlanner(self._get_encoder, config.DEFAULT_ANTHROPIC_MODEL)
+        self.rate_limiter = get_rate_limiter(
+            "anthropic", config.ANTHROPIC_REQUESTS_PER_MINUTE, config.ANTHROPIC_TOKENS_PER_MINUTE
+        )
 
     async def initialize(self):
         await self.connect()
@@ -25,7 +43,8 @@ class AnthropicService:
 
     async def connect(self):
         if self.client is None:
-            self.client = AsyncAnthropic(api_key=self.api_key)
+            # Retries are handled by the shared rate limiter so 429s feed back into its pacing
+            self.client = AsyncAnthropic(api_key=self.api_key, max_retries=0)
         logger.debug("Anthropic client connected.")
 
     async def close(self):
@@ -34,6 +53,89 @@ class AnthropicService:
             self.client = None
         logger.debug("Anthropic client closed.")
 
+    def _get_encoder(self, model: str):
+        # Anthropic does not publish its tokenizer, cl100k_base is a close enough estimate for budgeting
+        if self.encoder is None:
+            self.encoder = tiktoken.get_encoding("cl100k_base")
+        return self.encoder
+
+    def _build_completion_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        cache_system_prompt: bool = False,
+        response_model: Optional[Type[BaseModel]] = None,
+    ) -> Dict[str, Any]:
+        system_blocks, anthropic_messages = self._convert_messages(messages, cache_system_prompt)
+        kwargs = {
+            "model": model or self.config.DEFAULT_ANTHROPIC_MODEL,
+            "messages": anthropic_messages,
+            "temperature": temperature or self.config.DEFAULT_TEMPERATURE,
+            "max_tokens": max_tokens or self.config.DEFAULT_MAX_TOKENS,
+            "top_p": top_p or self.config.DEFAULT_TOP_P,
+        }
+        if system_blocks:
+            kwargs["system"] = system_blocks
+        if response_model:
+            # Forcing the tool makes the reply arrive as schema-shaped tool input
+            tool = anthropic_tool(response_model)
+            kwargs["tools"] = [tool]
+            kwargs["tool_choice"] = {"type": "tool", "name": tool["name"]}
+        return kwargs
+
+    @staticmethod
+    def _convert_messages(
+        messages: List[Dict[str, str]], cache_system_prompt: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """
+        Convert OpenAI-style messages to Anthropic's format: system content moves to the top-level
+        system blocks and the conversation must alternate user/assistant, starting with user.
+        """
+        system_blocks = []
+        anthropic_messages = []
+
+        for msg in messages:
+            content = msg.get("content") or ""
+            if msg["role"] == "system":
+                if content:
+                    system_blocks.append({"type": "text", "text": content})
+                continue
+            if not content.strip():
+                continue
+            role = "assistant" if msg["role"] == "assistant" else "user"
+            if anthropic_messages and anthropic_messages[-1]["role"] == role:
+                anthropic_messages[-1]["content"] += f"\n\n{content}"
+            else:
+                anthropic_messages.append({"role": role, "content": content})
+
+        if anthropic_messages and anthropic_messages[0]["role"] == "assistant":
+            anthropic_messages.insert(0, {"role": "user", "content": "Continue our conversation."})
+
+        # Only the leading (static) system prompt is marked, later blocks such as history digests vary per call
+        if cache_system_prompt and system_blocks:
+            system_blocks[0]["cache_control"] = {"type": "ephemeral"}
+
+        return system_blocks, anthropic_messages
+
+    @staticmethod
+    def _get_content(response: Any) -> str:
+        for block in response.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    @staticmethod
+    def _get_input_token_count(usage: Any) -> int:
+        # Cached prefix tokens are reported separately from the uncached remainder
+        return (
+            (usage.input_tokens or 0)
+            + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+            + (getattr(usage, "cache_read_input_tokens", None) or 0)
+        )
+
     async def create_chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -42,41 +144,34 @@ class AnthropicService:
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
         stream: bool = False,
+        priority: str = RateLimitPriority.INTERACTIVE,
+        cache_system_prompt: bool = False,
+        response_model: Optional[Type[BaseModel]] = None,
     ) -> Tuple[str, int, int]:
+        if stream:
+            return await collect_stream(
+                self.stream_chat_completion(
+                    messages, model, temperature, max_tokens, top_p, priority, cache_system_prompt, response_model
+                )
+            )
+
         if self.client is None:
             await self.connect()
         try:
-            model = model or self.config.DEFAULT_ANTHROPIC_MODEL
-            
-            # Convert OpenAI-style messages to Anthropic format
-            system_message = next((msg["content"] for msg in messages if msg["role"] == "system"), None)
-            messages_text = ""
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    continue
-                role = "Assistant" if msg["role"] == "assistant" else "Human"
-                messages_text += f"\n\n{role}: {msg['content']}"
-            
-            if system_message:
-                messages_text = f"System: {system_message}{messages_text}"
-
-            kwargs = {
-                "model": model,
-                "messages": [{"role": "user", "content": messages_text}],
-                "temperature": temperature or self.config.DEFAULT_TEMPERATURE,
-                "max_tokens": max_tokens or self.config.DEFAULT_MAX_TOKENS,
-                "top_p": top_p or self.config.DEFAULT_TOP_P,
-                "stream": stream,
-            }
-
-            response = await self.client.messages.create(**kwargs)
-
-            content = response.content[0].text
-            # Note: Anthropic doesn't provide token counts directly
-            # You might want to implement your own token counting if needed
-            input_token_count = 0  # Placeholder
-            output_token_count = 0  # Placeholder
+            kwargs = self._build_completion_kwargs(
+                messages, model, temperature, max_tokens, top_p, cache_system_prompt, response_model
+            )
+            estimated_tokens = self._estimate_tokens(messages, kwargs)
+            with tracer.span("anthropic.chat", SpanKind.CLIENT, model=kwargs["model"], priority=priority) as span:
+                response = await self._call_with_rate_limit(
+                    lambda: self.client.messages.create(**kwargs), estimated_tokens, priority
+                )
+                content = self._get_content(response)
+                input_token_count = self._get_input_token_count(response.usage)
+                output_token_count = response.usage.output_tokens
+                span.set_attributes(input_tokens=input_token_count, output_tokens=output_token_count)
+            logger.debug(f"Anthropic prompt cache read tokens: {getattr(response.usage, 'cache_read_input_tokens', 0)}")
+            self.rate_limiter.reconcile(estimated_tokens, input_token_count + output_token_count)
 
             return content, input_token_count, output_token_count
 
@@ -84,6 +179,75 @@ class AnthropicService:
             logger.error(f"Error in Anthropic API call: {str(e)}")
             raise
 
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        priority: str = RateLimitPriority.INTERACTIVE,
+        cache_system_prompt: bool = False,
+        response_model: Optional[Type[BaseModel]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        if self.client is None:
+            await self.connect()
+        try:
+            kwargs = self._build_completion_kwargs(
+                messages, model, temperature, max_tokens, top_p, cache_system_prompt, response_model
+            )
+            estimated_tokens = self._estimate_tokens(messages, kwargs)
+            # Not made current: a generator can resume in another context
+            span = tracer.start_span(
+                "anthropic.chat.stream", SpanKind.CLIENT, model=kwargs["model"], priority=priority
+            )
+            try:
+                response = await self._call_with_rate_limit(
+                    lambda: self.client.messages.create(**kwargs, stream=True), estimated_tokens, priority
+                )
+
+                input_token_count = output_token_count = 0
+                async for event in response:
+                    if event.type == "message_start":
+                        input_token_count = self._get_input_token_count(event.message.usage)
+                    elif event.type == "content_block_delta":
+                        # Text replies stream as text, schema-constrained (tool use) replies as partial JSON
+                        delta = getattr(event.delta, "text", None) or getattr(event.delta, "partial_json", None)
+                        if delta:
+                            if "time_to_first_token" not in span.attributes:
+                                span.set_attributes(time_to_first_token=(time.time_ns() - span.start_time_ns) / 1e9)
+                            yield delta, 0, 0
+                    elif event.type == "message_delta":
+                        output_token_count = event.usage.output_tokens
+                span.set_attributes(input_tokens=input_token_count, output_tokens=output_token_count)
+            except Exception as e:
+                span.end(e)
+                raise
+            finally:
+                span.end()
+
+            self.rate_limiter.reconcile(estimated_tokens, input_token_count + output_token_count)
+            yield "", input_token_count, output_token_count
+
+        except Exception as e:
+            logger.error(f"Error in Anthropic streaming API call: {str(e)}")
+            raise
+
+    def _estimate_tokens(self, messages: List[Dict[str, str]], completion_kwargs: Dict[str, Any]) -> int:
+        # Providers count max_tokens against the TPM limit up front, so the estimate does too
+        return self.token_planner.count_messages(messages) + completion_kwargs["max_tokens"]
+
+    async def _call_with_rate_limit(self, call, estimated_tokens: int, priority: str):
+        return await call_with_rate_limit(
+            self.rate_limiter,
+            call,
+            estimated_tokens,
+            priority,
+            rate_limit_errors=(RateLimitError,),
+            transient_errors=(APIConnectionError, InternalServerError),
+            max_retries=self.config.LLM_MAX_RETRIES,
+        )
+
     async def generate_response(
         self,
         user_message: str,
@@ -91,9 +255,72 @@ class AnthropicService:
         formatted_chat_history: Optional[List[Dict[str, str]]] = None,
         **kwargs,
     ) -> Tuple[str, int, int]:
+        use_cache = kwargs.pop("use_cache", True)
         messages = self._prepare_messages(user_message, system_message, formatted_chat_history)
         logger.info(f"\n\n\nMessages: {messages}\n\n\n")
-        return await self.create_chat_completion(messages, **kwargs)
+
+        cache_key = self._get_cache_key(messages, kwargs) if use_cache else None
+        if cache_key:
+            cached = await self.completion_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Completion cache hit")
+                return cached, 0, 0
+
+        async def complete() -> Tuple[str, int, int]:
+            content, input_tokens, output_tokens = await self.create_chat_completion(messages, **kwargs)
+            if cache_key:
+                await self.completion_cache.set(cache_key, content)
+            return content, input_tokens, output_tokens
+
+        # Identical requests already in flight share one API call, callers that joined it spent no tokens
+        return await self.single_flight.do(
+            self._get_request_key(messages, kwargs), complete, copy_result=lambda result: (result[0], 0, 0)
+        )
+
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        system_message: Optional[str] = None,
+        formatted_chat_history: Optional[List[Dict[str, str]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[StreamChunk]:
+        kwargs.pop("stream", None)
+        use_cache = kwargs.pop("use_cache", True)
+        messages = self._prepare_messages(user_message, system_message, formatted_chat_history)
+
+        cache_key = self._get_cache_key(messages, kwargs) if use_cache else None
+        if cache_key:
+            cached = await self.completion_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Completion cache hit")
+                yield cached, 0, 0
+                return
+
+        parts = []
+        async for delta, input_tokens, output_tokens in self.stream_chat_completion(messages, **kwargs):
+            parts.append(delta)
+            yield delta, input_tokens, output_tokens
+
+        if cache_key:
+            await self.completion_cache.set(cache_key, "".join(parts))
+
+    def _get_cache_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        if self.completion_cache is None or kwargs.get("stream"):
+            return None
+        temperature = kwargs.get("temperature") or self.config.DEFAULT_TEMPERATURE
+        if not self.completion_cache.is_cacheable(temperature):
+            return None
+        return self._get_request_key(messages, kwargs)
+
+    def _get_request_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        params = {
+            "temperature": kwargs.get("temperature") or self.config.DEFAULT_TEMPERATURE,
+            "max_tokens": kwargs.get("max_tokens") or self.config.DEFAULT_MAX_TOKENS,
+            "top_p": kwargs.get("top_p") or self.config.DEFAULT_TOP_P,
+            "response_schema": get_response_schema(kwargs["response_model"]) if kwargs.get("response_model") else None,
+        }
+        model = kwargs.get("model") or self.config.DEFAULT_ANTHROPIC_MODEL
+        return CompletionCache.make_key("anthropic", model, messages, params)
 
     def _prepare_messages(
         self,
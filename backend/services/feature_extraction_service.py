@@ -28,17 +28,20 @@ class FeatureExtractionService:
         self.openai_service = openai_service
         self.tavily_service = tavily_service
         self.weaviate_service = weaviate_service
+        # One extractor for every product; each request's settings are passed to extract_data
+        self.extractor = AgenticFeatureExtractor(
+            {
+                "openai_service": openai_service,
+                "tavily_service": tavily_service,
+                "weaviate_service": weaviate_service,
+            },
+            prompt_manager,
+            config=ConfigSchema(),
+        )
 
     async def extract_features(self, raw_data: str, product_id: str, config_schema: ConfigSchema) -> Dict[str, Any]:
-        services = {
-            "openai_service": self.openai_service,
-            "tavily_service": self.tavily_service,
-            "weaviate_service": self.weaviate_service,
-        }
-
-        agent = AgenticFeatureExtractor(services, self.prompt_manager, config=config_schema)
         try:
-            result = await agent.extract_data(raw_data, product_id)
+            result = await self.extractor.extract_data(raw_data, product_id, config=config_schema)
             extracted_data = result["extracted_data"]
 
             # Ensure required fields are present
@@ -57,7 +60,8 @@ class FeatureExtractionService:
             return {"id": product_id, "error": str(e)}
 
     async def process_batch(self, batch: List[Dict[str, str]], config_schema: ConfigSchema) -> List[Dict[str, Any]]:
-        semaphore = asyncio.Semaphore(5)  # Adjust based on your system's capacity
+        # LLM pacing is handled by the shared rate limiter (batch lane); this only bounds in-flight products
+        semaphore = asyncio.Semaphore(self.config.FEATURE_EXTRACTION_CONCURRENCY)
 
         async def process_item(item):
             async with semaphore:
@@ -78,7 +82,11 @@ class BatchFeatureExtractionService:
         weaviate_service: WeaviateService,
     ):
         self.feature_extraction_service = FeatureExtractionService(
-            prompt_manager, openai_service, tavily_service, weaviate_service, config
+            config=config,
+            prompt_manager=prompt_manager,
+            openai_service=openai_service,
+            tavily_service=tavily_service,
+            weaviate_service=weaviate_service,
         )
 
     async def process_batch(self, batch: List[Dict[str, str]], config_schema: ConfigSchema) -> List[Dict[str, Any]]:
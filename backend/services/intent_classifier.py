@@ -0,0 +1,244 @@
+import csv
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TRAINING_FILES = ("chitchat.csv", "politics.csv", "clear_intent.csv", "vague_intent.csv")
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+LEARNING_RATE = 10.0
+
+
+def load_training_data(data_dir: str) -> Tuple[List[str], List[str]]:
+    """Read the labelled prompt,route CSVs. Routes are lower-cased to match the route names used by the routers."""
+    texts, labels = [], []
+    for filename in TRAINING_FILES:
+        with open(os.path.join(data_dir, filename), newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["prompt"] and row["route"]:
+                    texts.append(row["prompt"].strip())
+                    labels.append(row["route"].strip().lower())
+    return texts, labels
+
+
+def extract_terms(text: str) -> List[str]:
+    """Word unigrams and bigrams, plus character trigrams that tolerate typos and unseen word forms."""
+    words = WORD_PATTERN.findall(text.lower())
+    terms = [f"w:{word}" for word in words]
+    terms += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        terms += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return terms
+
+
+class IntentPrediction(NamedTuple):
+    route: str
+    probability: float
+    # Probability lead over the runner-up route
+    margin: float
+    # Share of the message's words seen in training; the model knows little about messages made of new words
+    known_words: float
+
+
+class SparseFeatures(NamedTuple):
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+    n_rows: int
+
+
+def _sparse_matmul(
+    rows: np.ndarray, cols: np.ndarray, values: np.ndarray, n_rows: int, matrix: np.ndarray
+) -> np.ndarray:
+    """Multiply the sparse matrix given by (rows, cols, values) with a dense matrix."""
+    n_outputs = matrix.shape[1]
+    flat_index = (rows[:, None] * n_outputs + np.arange(n_outputs)).ravel()
+    products = (values[:, None] * matrix[cols]).ravel()
+    return np.bincount(flat_index, weights=products, minlength=n_rows * n_outputs).reshape(n_rows, n_outputs)
+
+
+class IntentClassifier:
+    """
+    TF-IDF features with a multinomial logistic regression, in NumPy only.
+
+    Probabilities are calibrated with temperature scaling fitted on out-of-fold predictions, so the
+    confidence can be compared against the same thresholds as the LLM's. Prediction is a sparse dot
+    product over the terms of the message, with no API call.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        idf: np.ndarray,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        labels: Sequence[str],
+        temperature: float = 1.0,
+    ):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.labels = list(labels)
+        self.temperature = temperature
+
+    @classmethod
+    def from_config(cls, config: Config) -> "IntentClassifier":
+        if os.path.exists(config.INTENT_CLASSIFIER_PATH):
+            classifier = cls.load(config.INTENT_CLASSIFIER_PATH)
+            logger.info(f"Intent classifier loaded from {config.INTENT_CLASSIFIER_PATH}")
+            return classifier
+        logger.warning(
+            f"No intent classifier at {config.INTENT_CLASSIFIER_PATH}, "
+            f"training one from {config.INTENT_CLASSIFIER_DATA_DIR}"
+        )
+        return cls.fit(*load_training_data(config.INTENT_CLASSIFIER_DATA_DIR), seed=config.RANDOM_SEED)
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        l2: float = 1e-4,
+        iterations: int = 200,
+        folds: int = 5,
+        seed: int = 1729,
+    ) -> "IntentClassifier":
+        classes = sorted(set(labels))
+        y = np.array([classes.index(label) for label in labels])
+        documents = [extract_terms(text) for text in texts]
+
+        # Out-of-fold logits to fit the temperature on predictions the model has not been trained on
+        order = np.random.default_rng(seed).permutation(len(texts))
+        held_out_logits = np.zeros((len(texts), len(classes)))
+        for fold in np.array_split(order, folds):
+            train = np.setdiff1d(order, fold)
+            model = cls._fit_fold([documents[i] for i in train], y[train], classes, l2, iterations)
+            held_out_logits[fold] = model._logits(model._transform([documents[i] for i in fold]))
+        temperature = cls._fit_temperature(held_out_logits, y)
+
+        model = cls._fit_fold(documents, y, classes, l2, iterations)
+        model.temperature = temperature
+        return model
+
+    @classmethod
+    def _fit_fold(
+        cls, documents: List[List[str]], y: np.ndarray, classes: List[str], l2: float, iterations: int
+    ) -> "IntentClassifier":
+        document_frequency = Counter(term for terms in documents for term in set(terms))
+        vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        idf = np.log((1 + len(documents)) / (1 + np.array([document_frequency[t] for t in vocabulary]))) + 1
+
+        model = cls(vocabulary, idf, np.zeros((len(vocabulary), len(classes))), np.zeros(len(classes)), classes)
+        features = model._transform(documents)
+        targets = np.eye(len(classes))[y]
+
+        # Full-batch gradient descent; features are L2-normalized so a fixed step size is stable
+        for _ in range(iterations):
+            probabilities = model._softmax(model._logits(features))
+            error = (probabilities - targets) / len(documents)
+            gradient = _sparse_matmul(features.cols, features.rows, features.values, len(vocabulary), error)
+            model.weights -= LEARNING_RATE * (gradient + l2 * model.weights)
+            model.bias -= LEARNING_RATE * error.sum(axis=0)
+        return model
+
+    @staticmethod
+    def _fit_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+        def negative_log_likelihood(temperature: float) -> float:
+            probabilities = IntentClassifier._softmax(logits / temperature)
+            return -np.mean(np.log(probabilities[np.arange(len(y)), y] + 1e-12))
+
+        return float(min(np.logspace(-2, 1, 61), key=negative_log_likelihood))
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exponentials = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exponentials / exponentials.sum(axis=-1, keepdims=True)
+
+    def _transform(self, documents: List[List[str]]) -> SparseFeatures:
+        """Sublinear TF-IDF rows, L2-normalized, in coordinate form."""
+        rows, cols, values = [], [], []
+        for row, terms in enumerate(documents):
+            counts = Counter(term for term in terms if term in self.vocabulary)
+            if not counts:
+                continue
+            indices = np.array([self.vocabulary[term] for term in counts])
+            weights = (1 + np.log(np.array(list(counts.values()), dtype=float))) * self.idf[indices]
+            rows.append(np.full(len(indices), row))
+            cols.append(indices)
+            values.append(weights / np.linalg.norm(weights))
+        if not rows:
+            return SparseFeatures(np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0), len(documents))
+        return SparseFeatures(np.concatenate(rows), np.concatenate(cols), np.concatenate(values), len(documents))
+
+    def _logits(self, features: SparseFeatures) -> np.ndarray:
+        return (
+            _sparse_matmul(features.rows, features.cols, features.values, features.n_rows, self.weights) + self.bias
+        )
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        probabilities = self._softmax(self._logits(self._transform([extract_terms(text)]))[0] / self.temperature)
+        return dict(zip(self.labels, probabilities.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """The most likely route and its calibrated probability."""
+        probabilities = self.predict_proba(text)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    def predict_with_evidence(self, text: str) -> IntentPrediction:
+        """
+        The prediction with how much it rests on: out-of-vocabulary or ambiguous messages ("hi", "thanks!") can
+        still get a probability above 50%, since the bias and a few character trigrams decide them.
+        """
+        probabilities = self.predict_proba(text)
+        ranked = sorted(probabilities.values(), reverse=True)
+        route = max(probabilities, key=probabilities.get)
+        words = WORD_PATTERN.findall(text.lower())
+        known_words = sum(f"w:{word}" in self.vocabulary for word in words) / len(words) if words else 0.0
+        margin = ranked[0] - ranked[1] if len(ranked) > 1 else ranked[0]
+        return IntentPrediction(route, probabilities[route], margin, known_words)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                terms=np.array(terms),
+                idf=self.idf,
+                weights=self.weights.astype(np.float32),
+                bias=self.bias,
+                labels=np.array(self.labels),
+                temperature=np.array(self.temperature),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                {term: index for index, term in enumerate(data["terms"].tolist())},
+                data["idf"],
+                data["weights"].astype(np.float64),
+                data["bias"],
+                data["labels"].tolist(),
+                float(data["temperature"]),
+            )
+
+    def evaluate(self, texts: Sequence[str], labels: Sequence[str]) -> Dict[str, float]:
+        predictions = [self.predict(text) for text in texts]
+        correct = [predicted == label for (predicted, _), label in zip(predictions, labels)]
+        return {
+            "accuracy": float(np.mean(correct)),
+            "mean_confidence": float(np.mean([confidence for _, confidence in predictions])),
+        }
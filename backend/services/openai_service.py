@@ -1,21 +1,49 @@
+import asyncio
+import time
 import tiktoken
 import logging
-from openai import AsyncOpenAI
-from typing import List, Optional, Tuple, Dict, Any
+import numpy as np
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, RateLimitError
+from pydantic import BaseModel
+from typing import AsyncIterator, List, Optional, Tuple, Type, Dict, Any
 from config import Config
 from services.utils.enhanced_error_logger import create_error_logger
+from services.utils.completion_cache import CompletionCache
+from services.utils.embedding_cache import EmbeddingCache
+from services.utils.streaming import StreamChunk, collect_stream
+from services.utils.token_budget import TokenBudgetPlanner
+from services.utils.rate_limiter import RateLimitPriority, call_with_rate_limit, get_rate_limiter
+from services.utils.single_flight import SingleFlight
+from services.utils.structured_output import get_response_schema, openai_response_format
+from services.utils.tracing import SpanKind, tracer
 import os
 
 logger = logging.getLogger(__name__)
 logger.error = create_error_logger(logger)
 
+# Per-input limit of the OpenAI embedding models
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+
 class OpenAIService:
 
-    def __init__(self, api_key: str, config: Config):
+    def __init__(
+        self,
+        api_key: str,
+        config: Config,
+        completion_cache: Optional[CompletionCache] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ):
         self.api_key = api_key
         self.config = config
         self.client = None
         self.encoders = {}
+        self.completion_cache = completion_cache
+        self.embedding_cache = embedding_cache
+        self.single_flight = SingleFlight("openai")
+        self.token_planner = TokenBudgetPlanner(self._get_encoder, config.DEFAULT_MODEL)
+        self.rate_limiter = get_rate_limiter(
+            "openai", config.OPENAI_REQUESTS_PER_MINUTE, config.OPENAI_TOKENS_PER_MINUTE
+        )
 
     async def initialize(self):
         await self.connect()
@@ -29,7 +57,8 @@ class OpenAIService:
 
     async def connect(self):
         if self.client is None:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # Retries are handled by the shared rate limiter so 429s feed back into its pacing
+            self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
         logger.debug("OpenAI client connected.")
 
     async def close(self):
@@ -40,9 +69,37 @@ class OpenAIService:
 
     def _get_encoder(self, model: str):
         if model not in self.encoders:
-            self.encoders[model] = tiktoken.encoding_for_model(model)
+            try:
+                self.encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoders[model] = tiktoken.get_encoding("o200k_base")
         return self.encoders[model]
 
+    def _build_completion_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        functions: Optional[List[Dict[str, Any]]] = None,
+        response_model: Optional[Type[BaseModel]] = None,
+    ) -> Dict[str, Any]:
+        kwargs = {
+            "model": model or self.config.DEFAULT_MODEL,
+            "messages": messages,
+            "temperature": temperature or self.config.DEFAULT_TEMPERATURE,
+            "max_tokens": max_tokens or self.config.DEFAULT_MAX_TOKENS,
+            "top_p": top_p or self.config.DEFAULT_TOP_P,
+        }
+        if functions:
+            kwargs["functions"] = functions
+        if response_model:
+            response_format = openai_response_format(response_model, kwargs["model"], messages)
+            if response_format:
+                kwargs["response_format"] = response_format
+        return kwargs
+
     async def create_chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -52,35 +109,107 @@ class OpenAIService:
         top_p: Optional[float] = None,
         stream: bool = False,
         functions: Optional[List[Dict[str, Any]]] = None,
+        priority: str = RateLimitPriority.INTERACTIVE,
+        response_model: Optional[Type[BaseModel]] = None,
     ) -> Tuple[str, int, int]:
+        if stream:
+            return await collect_stream(
+                self.stream_chat_completion(
+                    messages, model, temperature, max_tokens, top_p, functions, priority, response_model
+                )
+            )
+
         if self.client is None:
             await self.connect()
         try:
-            model = model or self.config.DEFAULT_MODEL
+            kwargs = self._build_completion_kwargs(
+                messages, model, temperature, max_tokens, top_p, functions, response_model
+            )
+            estimated_tokens = self._estimate_tokens(kwargs)
+            with tracer.span("openai.chat", SpanKind.CLIENT, model=kwargs["model"], priority=priority) as span:
+                response = await self._call_with_rate_limit(
+                    lambda: self.client.chat.completions.create(**kwargs), estimated_tokens, priority
+                )
+                content = response.choices[0].message.content or ""
+                input_token_count = response.usage.prompt_tokens
+                output_token_count = response.usage.completion_tokens
+                span.set_attributes(input_tokens=input_token_count, output_tokens=output_token_count)
+            self.rate_limiter.reconcile(estimated_tokens, input_token_count + output_token_count)
 
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature or self.config.DEFAULT_TEMPERATURE,
-                "max_tokens": max_tokens or self.config.DEFAULT_MAX_TOKENS,
-                "top_p": top_p or self.config.DEFAULT_TOP_P,
-                "stream": stream,
-            }
-            if functions:
-                kwargs["functions"] = functions
+            return content, input_token_count, output_token_count
 
-            response = await self.client.chat.completions.create(**kwargs)
+        except Exception as e:
+            logger.error(f"Error in OpenAI API call: {str(e)}")
+            raise
 
-            content = response.choices[0].message.content or ""
-            input_token_count = response.usage.prompt_tokens
-            output_token_count = response.usage.completion_tokens
+    async def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        functions: Optional[List[Dict[str, Any]]] = None,
+        priority: str = RateLimitPriority.INTERACTIVE,
+        response_model: Optional[Type[BaseModel]] = None,
+    ) -> AsyncIterator[StreamChunk]:
+        if self.client is None:
+            await self.connect()
+        try:
+            kwargs = self._build_completion_kwargs(
+                messages, model, temperature, max_tokens, top_p, functions, response_model
+            )
+            estimated_tokens = self._estimate_tokens(kwargs)
+            # Not made current: a generator can resume in another context
+            span = tracer.start_span("openai.chat.stream", SpanKind.CLIENT, model=kwargs["model"], priority=priority)
+            try:
+                response = await self._call_with_rate_limit(
+                    lambda: self.client.chat.completions.create(
+                        **kwargs, stream=True, stream_options={"include_usage": True}
+                    ),
+                    estimated_tokens,
+                    priority,
+                )
 
-            return content, input_token_count, output_token_count
+                input_token_count = output_token_count = 0
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if "time_to_first_token" not in span.attributes:
+                            span.set_attributes(time_to_first_token=(time.time_ns() - span.start_time_ns) / 1e9)
+                        yield chunk.choices[0].delta.content, 0, 0
+                    if chunk.usage:
+                        input_token_count = chunk.usage.prompt_tokens
+                        output_token_count = chunk.usage.completion_tokens
+                span.set_attributes(input_tokens=input_token_count, output_tokens=output_token_count)
+            except Exception as e:
+                span.end(e)
+                raise
+            finally:
+                span.end()
+
+            self.rate_limiter.reconcile(estimated_tokens, input_token_count + output_token_count)
+            yield "", input_token_count, output_token_count
 
         except Exception as e:
-            logger.error(f"Error in OpenAI API call: {str(e)}")
+            logger.error(f"Error in OpenAI streaming API call: {str(e)}")
             raise
 
+    def _estimate_tokens(self, completion_kwargs: Dict[str, Any]) -> int:
+        # Providers count max_tokens against the TPM limit up front, so the estimate does too
+        prompt_tokens = self.token_planner.count_messages(completion_kwargs["messages"], completion_kwargs["model"])
+        return prompt_tokens + completion_kwargs["max_tokens"]
+
+    async def _call_with_rate_limit(self, call, estimated_tokens: int, priority: str):
+        return await call_with_rate_limit(
+            self.rate_limiter,
+            call,
+            estimated_tokens,
+            priority,
+            rate_limit_errors=(RateLimitError,),
+            transient_errors=(APIConnectionError, InternalServerError),
+            max_retries=self.config.LLM_MAX_RETRIES,
+        )
+
     async def generate_response(
         self,
         user_message: str,
@@ -106,9 +235,81 @@ class OpenAIService:
                 raise
         else:
             # Default flow: chat completion
+            use_cache = kwargs.pop("use_cache", True)
+            # OpenAI applies prompt caching to repeated prefixes automatically
+            kwargs.pop("cache_system_prompt", None)
             messages = self._prepare_messages(user_message, system_message, formatted_chat_history)
             logger.info(f"\n\n\nMessages: {messages}\n\n\n")
-            return await self.create_chat_completion(messages, **kwargs)
+
+            cache_key = self._get_cache_key(messages, kwargs) if use_cache else None
+            if cache_key:
+                cached = await self.completion_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Completion cache hit")
+                    return cached, 0, 0
+
+            async def complete() -> Tuple[str, int, int]:
+                content, input_tokens, output_tokens = await self.create_chat_completion(messages, **kwargs)
+                if cache_key:
+                    await self.completion_cache.set(cache_key, content)
+                return content, input_tokens, output_tokens
+
+            # Identical requests already in flight share one API call, callers that joined it spent no tokens
+            return await self.single_flight.do(
+                self._get_request_key(messages, kwargs), complete, copy_result=lambda result: (result[0], 0, 0)
+            )
+
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        system_message: Optional[str] = None,
+        formatted_chat_history: Optional[List[Dict[str, str]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[StreamChunk]:
+        kwargs.pop("stream", None)
+        if kwargs.get("sql_mode"):
+            # The SQL agent has no streaming mode, emit its answer as a single chunk
+            yield await self.generate_response(user_message, system_message, formatted_chat_history, **kwargs)
+            return
+
+        use_cache = kwargs.pop("use_cache", True)
+        kwargs.pop("cache_system_prompt", None)
+        messages = self._prepare_messages(user_message, system_message, formatted_chat_history)
+
+        cache_key = self._get_cache_key(messages, kwargs) if use_cache else None
+        if cache_key:
+            cached = await self.completion_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Completion cache hit")
+                yield cached, 0, 0
+                return
+
+        parts = []
+        async for delta, input_tokens, output_tokens in self.stream_chat_completion(messages, **kwargs):
+            parts.append(delta)
+            yield delta, input_tokens, output_tokens
+
+        if cache_key:
+            await self.completion_cache.set(cache_key, "".join(parts))
+
+    def _get_cache_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        if self.completion_cache is None or kwargs.get("stream"):
+            return None
+        temperature = kwargs.get("temperature") or self.config.DEFAULT_TEMPERATURE
+        if not self.completion_cache.is_cacheable(temperature):
+            return None
+        return self._get_request_key(messages, kwargs)
+
+    def _get_request_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        params = {
+            "temperature": kwargs.get("temperature") or self.config.DEFAULT_TEMPERATURE,
+            "max_tokens": kwargs.get("max_tokens") or self.config.DEFAULT_MAX_TOKENS,
+            "top_p": kwargs.get("top_p") or self.config.DEFAULT_TOP_P,
+            "functions": kwargs.get("functions"),
+            "response_schema": get_response_schema(kwargs["response_model"]) if kwargs.get("response_model") else None,
+        }
+        model = kwargs.get("model") or self.config.DEFAULT_MODEL
+        return CompletionCache.make_key("openai", model, messages, params)
 
     def _prepare_messages(
         self,
@@ -127,10 +328,82 @@ class OpenAIService:
         messages.append({"role": "user", "content": user_message})
         return messages
 
-    async def create_embedding(self, text: str, model: str = "text-embedding-ada-002") -> List[float]:
-        try:
-            response = await self.client.embeddings.create(input=[text], model=model)
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Error in creating embedding: {str(e)}")
-            raise
+    async def create_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
+        embeddings = await self.create_embeddings([text], model)
+        return embeddings[0].tolist()
+
+    async def create_embeddings(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        priority: str = RateLimitPriority.INTERACTIVE,
+    ) -> np.ndarray:
+        """
+        Embed texts, returning a float32 matrix with one row per input. Cached vectors are reused;
+        the rest are embedded in token-bounded batches that run concurrently.
+        """
+        model = model or self.config.EMBEDDING_MODEL
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        unique_texts = list(dict.fromkeys(texts))
+        vectors = await self.embedding_cache.get_many(model, unique_texts) if self.embedding_cache else {}
+        missing = [text for text in unique_texts if text not in vectors]
+
+        if missing:
+            if self.client is None:
+                await self.connect()
+            semaphore = asyncio.Semaphore(self.config.EMBEDDING_CONCURRENCY)
+
+            async def embed_batch(batch: List[Tuple[str, str, int]]) -> Dict[str, np.ndarray]:
+                async with semaphore:
+                    inputs = [text for _, text, _ in batch]
+                    estimated_tokens = sum(tokens for _, _, tokens in batch)
+                    with tracer.span("openai.embeddings", SpanKind.CLIENT, model=model, inputs=len(inputs)) as span:
+                        response = await self._call_with_rate_limit(
+                            lambda: self.client.embeddings.create(input=inputs, model=model),
+                            estimated_tokens,
+                            priority,
+                        )
+                        span.set_attributes(input_tokens=response.usage.total_tokens)
+                    self.rate_limiter.reconcile(estimated_tokens, response.usage.total_tokens)
+                    return {
+                        original: np.asarray(item.embedding, dtype=np.float32)
+                        for (original, _, _), item in zip(batch, sorted(response.data, key=lambda d: d.index))
+                    }
+
+            try:
+                batches = self._batch_embedding_inputs(missing, model)
+                results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+            except Exception as e:
+                logger.error(f"Error in creating embeddings: {str(e)}")
+                raise
+
+            new_vectors = {text: vector for result in results for text, vector in result.items()}
+            if self.embedding_cache:
+                await self.embedding_cache.set_many(model, new_vectors)
+            vectors.update(new_vectors)
+
+        return np.stack([vectors[text] for text in texts])
+
+    def _batch_embedding_inputs(self, texts: List[str], model: str) -> List[List[Tuple[str, str, int]]]:
+        """Group (original, input, tokens) triples into batches under the per-request token and input limits."""
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = self.token_planner.count_tokens(text, model)
+            embedding_input = text
+            if tokens > EMBEDDING_MAX_INPUT_TOKENS:
+                # Leave room for the ellipsis truncate appends
+                embedding_input = self.token_planner.truncate(text, EMBEDDING_MAX_INPUT_TOKENS - 1, model)
+                tokens = EMBEDDING_MAX_INPUT_TOKENS
+            if batch and (
+                batch_tokens + tokens > self.config.EMBEDDING_BATCH_MAX_TOKENS
+                or len(batch) >= self.config.EMBEDDING_BATCH_MAX_INPUTS
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append((text, embedding_input, tokens))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
@@ -1,10 +1,11 @@
-import json
 import logging
 from typing import List, Dict, Any, Tuple
 from prompts.prompt_manager import PromptManager
 from services.openai_service import OpenAIService
 from weaviate_interface.models.product import attribute_descriptions
 from services.utils.enhanced_error_logger import create_error_logger
+from services.utils.structured_output import extract_json, generate_structured_response
+from prompts.output_schemas import ProcessedQuery, SemanticSearchQuery
 
 logger = logging.getLogger(__name__)
 logger.error = create_error_logger(logger)
@@ -29,11 +30,20 @@ class QueryProcessor:
         system_message, user_message = self.prompt_manager.get_query_processor_prompt(
             query, attribute_descriptions=attribute_descriptions
         )
+        plan = self.openai_service.token_planner.plan(
+            "query_processor", system_message, user_message, chat_history, model
+        )
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
-            user_message, system_message, formatted_chat_history=chat_history, temperature=temperature, model=model
+        processed_query, input_tokens, output_tokens = await generate_structured_response(
+            self.openai_service,
+            ProcessedQuery,
+            user_message=user_message,
+            system_message=system_message,
+            formatted_chat_history=plan.chat_history,
+            temperature=temperature,
+            model=model,
         )
-        processed_response = self._clean_response(response)
+        processed_response = processed_query.model_dump()
         logger.info(f"\n\nQuery_processor response from OpenAI: {processed_response}\n\n")
 
         # Validate filters
@@ -147,11 +157,20 @@ class QueryProcessor:
         system_message, user_message = self.prompt_manager.get_semantic_search_query_prompt(
             query, attribute_descriptions
         )
+        plan = self.openai_service.token_planner.plan(
+            "semantic_search_query", system_message, user_message, chat_history, model
+        )
 
-        response, input_tokens, output_tokens = await self.openai_service.generate_response(
-            user_message, system_message, formatted_chat_history=chat_history, temperature=temperature, model=model
+        search_query, input_tokens, output_tokens = await generate_structured_response(
+            self.openai_service,
+            SemanticSearchQuery,
+            user_message=user_message,
+            system_message=system_message,
+            formatted_chat_history=plan.chat_history,
+            temperature=temperature,
+            model=model,
         )
-        processed_response = self._clean_response(response)
+        processed_response = search_query.model_dump()
 
         # Validate and clean filters
         if "filters" in processed_response:
@@ -161,8 +180,4 @@ class QueryProcessor:
 
     @staticmethod
     def _clean_response(response: str) -> Any:
-        try:
-            response = response.replace("```", "").replace("json", "").replace("\n", "").strip()
-            return json.loads(response)
-        except json.JSONDecodeError:
-            raise ValueError(f"Invalid JSON response: {response}")
+        return extract_json(response)
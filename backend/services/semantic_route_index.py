@@ -0,0 +1,76 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from services.openai_service import OpenAIService
+from services.weaviate_service import WeaviateService
+from services.utils.enhanced_error_logger import create_error_logger
+from weaviate_interface.models.route import route_descriptions
+
+logger = logging.getLogger(__name__)
+logger.error = create_error_logger(logger)
+
+
+class SemanticRouteIndex:
+    """
+    In-process nearest-neighbour index over the route descriptions.
+
+    The descriptions are embedded once at startup into a row-normalized matrix, so routing a
+    message costs one (usually cached) query embedding and a matrix-vector product instead of a
+    near_text query against Weaviate. Weaviate remains the fallback if the index is unavailable.
+    """
+
+    def __init__(
+        self,
+        openai_service: OpenAIService,
+        weaviate_service: WeaviateService,
+        routes: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.openai_service = openai_service
+        self.weaviate_service = weaviate_service
+        self.routes = routes or route_descriptions
+        self.labels: List[str] = []
+        self.matrix: Optional[np.ndarray] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.matrix is not None
+
+    async def initialize(self) -> None:
+        labels = [route for route, descriptions in self.routes.items() for _ in descriptions]
+        descriptions = [description for descriptions in self.routes.values() for description in descriptions]
+        try:
+            vectors = await self.openai_service.create_embeddings(descriptions)
+        except Exception as e:
+            logger.error(f"Error building semantic route index, falling back to Weaviate: {e}", exc_info=True)
+            return
+        self.labels = labels
+        self.matrix = self._normalize(vectors)
+        logger.info(f"Semantic route index loaded with {len(labels)} descriptions for {len(self.routes)} routes")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    async def search_routes(self, query: str, limit: int = 1) -> List[Tuple[str, float]]:
+        """
+        Return up to limit (route, certainty) pairs, best first. Certainty uses Weaviate's definition,
+        (1 + cosine) / 2, so thresholds tuned against the Route collection still apply.
+        """
+        if not self.is_ready:
+            return await self.weaviate_service.search_routes(query)
+        try:
+            query_vector = self._normalize(await self.openai_service.create_embeddings([query]))[0]
+        except Exception as e:
+            logger.error(f"Error embedding route query, falling back to Weaviate: {e}", exc_info=True)
+            return await self.weaviate_service.search_routes(query)
+
+        similarities = self.matrix @ query_vector
+        best: Dict[str, float] = {}
+        for index in np.argsort(-similarities):
+            label = self.labels[index]
+            if label not in best:
+                best[label] = float((1 + similarities[index]) / 2)
+                if len(best) == limit:
+                    break
+        return list(best.items())
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCacheBackend(ABC):
+    """Interface for a completion cache tier."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCacheBackend(CompletionCacheBackend):
+    """In-memory LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CompletionCacheBackend):
+    """On-disk cache tier so completions survive restarts."""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completion_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM completion_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= time.time():
+                self._conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completion_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM completion_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completion_cache").fetchone()[0]
+
+
+class CompletionCache:
+    """
+    Two-tier cache for LLM completions.
+
+    Lookups hit the in-memory tier first and fall back to the optional disk tier,
+    promoting disk hits into memory. Only low-temperature requests are cached since
+    anything above that is expected to vary between calls.
+    """
+
+    def __init__(
+        self,
+        memory_backend: Optional[CompletionCacheBackend] = None,
+        disk_backend: Optional[CompletionCacheBackend] = None,
+        max_temperature: float = 0.1,
+        enabled: bool = True,
+    ):
+        self.memory_backend = memory_backend or MemoryCacheBackend()
+        self.disk_backend = disk_backend
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config) -> "CompletionCache":
+        disk_backend = None
+        if config.LLM_CACHE_SQLITE_PATH:
+            disk_backend = SQLiteCacheBackend(
+                config.LLM_CACHE_SQLITE_PATH, ttl_seconds=config.LLM_CACHE_DISK_TTL_SECONDS
+            )
+        return cls(
+            memory_backend=MemoryCacheBackend(config.LLM_CACHE_MAX_ENTRIES, config.LLM_CACHE_TTL_SECONDS),
+            disk_backend=disk_backend,
+            max_temperature=config.LLM_CACHE_MAX_TEMPERATURE,
+            enabled=config.LLM_CACHE_ENABLED,
+        )
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        return self.enabled and (temperature or 0.0) <= self.max_temperature
+
+    @staticmethod
+    def make_key(provider: str, model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"provider": provider, "model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory_backend.get(key)
+        if value is None and self.disk_backend is not None:
+            try:
+                value = await asyncio.to_thread(self.disk_backend.get, key)
+            except Exception as e:
+                logger.warning(f"Completion cache disk lookup failed: {e}")
+                value = None
+            if value is not None:
+                self.memory_backend.set(key, value)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory_backend.set(key, value)
+        if self.disk_backend is not None:
+            try:
+                await asyncio.to_thread(self.disk_backend.set, key, value)
+            except Exception as e:
+                logger.warning(f"Completion cache disk write failed: {e}")
+
+    def clear(self) -> None:
+        self.memory_backend.clear()
+        if self.disk_backend is not None:
+            self.disk_backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory_backend),
+        }
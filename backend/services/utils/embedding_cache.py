@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MemmapEmbeddingStore:
+    """
+    Append-only on-disk embedding store for one model: vectors live in a float32 memory-mapped
+    file, and a JSON index maps content keys to rows. Capacity doubles when the file is full.
+    """
+
+    def __init__(self, directory: str, model: str, initial_capacity: int = 1024):
+        os.makedirs(directory, exist_ok=True)
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.vectors_path = os.path.join(directory, f"{safe_model}.f32")
+        self.index_path = os.path.join(directory, f"{safe_model}.index.json")
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._dimensions: Optional[int] = None
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.index_path) or not os.path.exists(self.vectors_path):
+            return
+        with open(self.index_path) as f:
+            index = json.load(f)
+        self._dimensions = index["dimensions"]
+        self._rows = index["rows"]
+        self._capacity = os.path.getsize(self.vectors_path) // (4 * self._dimensions)
+        self._vectors = self._open_vectors()
+
+    def _ensure_capacity(self, rows: int, dimensions: int) -> None:
+        if self._dimensions is None:
+            self._dimensions = dimensions
+        if rows <= self._capacity:
+            return
+        capacity = max(self.initial_capacity, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self._dimensions * 4)
+        self._capacity = capacity
+        self._vectors = self._open_vectors()
+
+    def _open_vectors(self) -> np.memmap:
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dimensions))
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if self._vectors is None:
+                return {}
+            return {key: np.array(self._vectors[self._rows[key]]) for key in keys if key in self._rows}
+
+    def set_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            new_keys = [key for key in vectors if key not in self._rows]
+            if not new_keys:
+                return
+            dimensions = len(vectors[new_keys[0]])
+            if self._dimensions is not None and dimensions != self._dimensions:
+                raise ValueError(f"Embedding dimension mismatch: expected {self._dimensions}, got {dimensions}")
+            self._ensure_capacity(len(self._rows) + len(new_keys), dimensions)
+            for key in new_keys:
+                row = len(self._rows)
+                self._vectors[row] = vectors[key]
+                self._rows[key] = row
+            self._vectors.flush()
+
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"dimensions": self._dimensions, "rows": self._rows}, f)
+            os.replace(tmp_path, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache: an in-memory LRU in front of an optional memory-mapped
+    store per model, so repeated texts are embedded once across requests and restarts.
+    """
+
+    def __init__(self, max_entries: int = 10000, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stores: Dict[str, MemmapEmbeddingStore] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config) -> "EmbeddingCache":
+        return cls(max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES, directory=config.EMBEDDING_CACHE_DIR)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _get_store(self, model: str) -> Optional[MemmapEmbeddingStore]:
+        if self.directory is None:
+            return None
+        if model not in self._stores:
+            self._stores[model] = MemmapEmbeddingStore(self.directory, model)
+        return self._stores[model]
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_many(self, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors keyed by text, for the texts that are cached."""
+        found = {}
+        disk_lookups = {}
+        for text in texts:
+            key = self.make_key(model, text)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[text] = self._memory[key]
+            else:
+                disk_lookups[key] = text
+
+        store = self._get_store(model)
+        if disk_lookups and store is not None:
+            try:
+                disk_hits = await asyncio.to_thread(store.get_many, list(disk_lookups))
+            except Exception as e:
+                logger.warning(f"Embedding cache disk lookup failed: {e}")
+                disk_hits = {}
+            for key, vector in disk_hits.items():
+                self._remember(key, vector)
+                found[disk_lookups[key]] = vector
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    async def set_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        keyed = {self.make_key(model, text): vector for text, vector in vectors.items()}
+        for key, vector in keyed.items():
+            self._remember(key, vector)
+        store = self._get_store(model)
+        if store is not None:
+            try:
+                await asyncio.to_thread(store.set_many, keyed)
+            except Exception as e:
+                logger.warning(f"Embedding cache disk write failed: {e}")
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": {model: len(store) for model, store in self._stores.items()},
+        }
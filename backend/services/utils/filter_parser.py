@@ -1,6 +1,11 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from enum import Enum
 from typing import Dict, Any, List, Optional, Union, Tuple, Set
 from weaviate.classes.query import Filter
+from weaviate_interface.models.product import attribute_descriptions
+from weaviate_interface.utils.unit_parser import FIELD_KINDS, UNIT_KINDS, comparison_property, parse_values
+import json
 import re
 
 
@@ -238,13 +243,30 @@ class FeatureValues:
         "processor_tdp": ValueTypes.POWER,
     }
 
+    VALUE_SETS = {
+        ValueTypes.MEMORY: MEMORY_STORAGE_VALUES,
+        ValueTypes.STORAGE: MEMORY_STORAGE_VALUES,
+        ValueTypes.VOLTAGE: VOLTAGE_VALUES,
+        ValueTypes.TEMPERATURE: TEMPERATURE_VALUES,
+        ValueTypes.PROCESSOR_CORES: PROCESSOR_CORES,
+        ValueTypes.POWER: POWER_VALUES,
+    }
+
+    # Per feature type: the sorted values, all their spellings in the same order, and where each value's
+    # spellings start (plus the total), so a ">=" or "<=" lookup is a bisect and a slice. Built at import.
+    VALUE_TABLES: Dict[ValueTypes, Tuple[List[float], List[str], List[int]]] = {}
+
     @classmethod
-    def _get_nearest_valid_values(cls, value: float, valid_set: Set[float], operator: str) -> List[float]:
-        """Get nearest valid values based on operator."""
-        if operator == ">=":
-            return sorted([v for v in valid_set if v >= value])
-        else:  # "<="
-            return sorted([v for v in valid_set if v <= value])
+    def _build_value_tables(cls) -> None:
+        for feature_type, valid_set in cls.VALUE_SETS.items():
+            values = sorted({float(v) for v in valid_set})
+            spellings: List[str] = []
+            offsets: List[int] = []
+            for v in values:
+                offsets.append(len(spellings))
+                spellings.extend(cls._format_numeric_values([v]))
+            offsets.append(len(spellings))
+            cls.VALUE_TABLES[feature_type] = (values, spellings, offsets)
 
     @classmethod
     def _format_numeric_values(cls, values: List[float]) -> List[str]:
@@ -271,28 +293,50 @@ class FeatureValues:
         except ValueError:
             return [value]
 
-        # Map feature types to their corresponding value sets
-        value_set_map = {
-            ValueTypes.MEMORY: cls.MEMORY_STORAGE_VALUES,
-            ValueTypes.STORAGE: cls.MEMORY_STORAGE_VALUES,
-            ValueTypes.VOLTAGE: cls.VOLTAGE_VALUES,
-            ValueTypes.TEMPERATURE: cls.TEMPERATURE_VALUES,
-            ValueTypes.PROCESSOR_CORES: cls.PROCESSOR_CORES,
-            ValueTypes.POWER: cls.POWER_VALUES,
-        }
-
-        valid_set = value_set_map.get(feature_type)
-        if valid_set is None:
+        table = cls.VALUE_TABLES.get(feature_type)
+        if table is None:
             return [value]
 
-        valid_values = cls._get_nearest_valid_values(num_value, valid_set, operator)
-        return cls._format_numeric_values(valid_values)
+        values, spellings, offsets = table
+        if operator == ">=":
+            return spellings[offsets[bisect_left(values, num_value)] :]
+        # "<="
+        return spellings[: offsets[bisect_right(values, num_value)]]
+
+
+FeatureValues._build_value_tables()
+
+
+def _parse_example_values(description: str) -> List[str]:
+    """The examples listed in an attribute description: "... (e.g., 60°C, 85°C)" -> ["60°C", "85°C"]."""
+    if not description or "e.g.," not in description:
+        return []
+
+    # Extract examples between parentheses
+    match = re.search(r"\((.*?)\)", description)
+    if not match:
+        return []
+
+    # Split examples and clean them
+    examples = [ex.strip() for ex in match.group(1).split(",")]
+    return [ex for ex in examples if ex and not ex.startswith("e.g")]
+
+
+EXAMPLE_VALUES = {field: _parse_example_values(description) for field, description in attribute_descriptions.items()}
+
+# Number (including decimals) followed by any non-numeric characters
+VALUE_AND_UNIT = re.compile(r"^([-+]?\d*\.?\d+)([A-Za-z°℃\s]*)?$")
 
 
 class QueryBuilder:
-    def __init__(self):
+    def __init__(self, cache_size: int = 256):
         # Cache for parsed values from attribute descriptions
         self._valid_values_cache: Dict[str, Dict[str, Set[Union[int, float]]]] = {}
+        # LRU of built filters keyed by the canonical filter dict; Filter objects are never mutated once built
+        self.cache_size = cache_size
+        self._filter_cache: "OrderedDict[str, Filter]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def build_weaviate_filter(self, filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
         """
@@ -301,11 +345,40 @@ class QueryBuilder:
         if not filters:
             return None
 
+        key = self._cache_key(filters)
+        cached = self._filter_cache.get(key)
+        if cached is not None:
+            self._filter_cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        weaviate_filter = self._build_filter(filters)
+        if self.cache_size > 0:
+            self._filter_cache[key] = weaviate_filter
+            while len(self._filter_cache) > self.cache_size:
+                self._filter_cache.popitem(last=False)
+        return weaviate_filter
+
+    @staticmethod
+    def _cache_key(filters: Dict[str, Any]) -> str:
+        """Filters that build the same Filter share a key: key order and list order do not matter."""
+        canonical = {
+            key: sorted(str(v) for v in value) if isinstance(value, list) else value for key, value in filters.items()
+        }
+        return json.dumps(canonical, sort_keys=True, default=str)
+
+    def _build_filter(self, filters: Dict[str, Any]) -> Filter:
         filter_conditions = []
 
         for key, value in filters.items():
             if isinstance(value, str):
                 if value.startswith(">=") or value.startswith("<="):
+                    # Fields with a numeric shadow get a native range filter
+                    numeric_filter = self._build_numeric_filter(key, value[:2], value[2:])
+                    if numeric_filter is not None:
+                        filter_conditions.append(numeric_filter)
+                        continue
                     # Extract unit if present
                     numeric_part, unit = self._split_value_and_unit(value[2:])
                     if numeric_part:
@@ -328,10 +401,23 @@ class QueryBuilder:
 
         return Filter.all_of(filter_conditions) if len(filter_conditions) > 1 else filter_conditions[0]
 
+    def _build_numeric_filter(self, field: str, operator: str, value: str) -> Optional[Filter]:
+        """A range filter on the field's numeric shadow property, with the value converted to its unit."""
+        property_name = comparison_property(field, operator)
+        if property_name is None:
+            return None
+        kind = FIELD_KINDS[field]
+        # A bare number is already in the canonical unit
+        values = parse_values(value, kind, default_unit=UNIT_KINDS[kind].canonical_unit.lower())
+        if not values:
+            return None
+        if operator == ">=":
+            return Filter.by_property(property_name).greater_or_equal(values[0])
+        return Filter.by_property(property_name).less_or_equal(values[0])
+
     def _split_value_and_unit(self, value: str) -> Tuple[str, str]:
         """Split a value into its numeric part and unit."""
-        # Match number (including decimals) followed by any non-numeric characters
-        match = re.match(r"^([-+]?\d*\.?\d+)([A-Za-z°℃\s]*)?$", value.strip())
+        match = VALUE_AND_UNIT.match(value.strip())
         if match:
             return match.group(1), (match.group(2) or "").strip()
         return value, ""
@@ -377,21 +463,8 @@ class QueryBuilder:
         return FeatureValues.get_valid_values(field, value)
 
     def _get_example_values(self, field: str) -> List[str]:
-        """Extract example values from attribute descriptions."""
-        from weaviate_interface.models.product import attribute_descriptions
-
-        desc = attribute_descriptions.get(field, "")
-        if not desc or "e.g.," not in desc:
-            return []
-
-        # Extract examples between parentheses
-        match = re.search(r"\((.*?)\)", desc)
-        if not match:
-            return []
-
-        # Split examples and clean them
-        examples = [ex.strip() for ex in match.group(1).split(",")]
-        return [ex for ex in examples if ex and not ex.startswith("e.g")]
+        """Example values from attribute descriptions, parsed once at import."""
+        return EXAMPLE_VALUES.get(field, [])
 
     def _extract_number(self, text: str) -> Optional[Union[int, float]]:
         """Extract the first number from a text string."""
@@ -0,0 +1,103 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from services.utils.token_budget import MIN_ITEM_TEXT_TOKENS, TokenBudgetPlanner
+
+# Renderings from richest to leanest
+PROFILES = ("summary", "filtered", "minimal")
+# Summaries start at this many tokens and are halved down to MIN_ITEM_TEXT_TOKENS before falling back to "filtered"
+DEFAULT_SUMMARY_TOKENS = 160
+
+
+def serialize_products(items: List[Dict[str, Any]]) -> str:
+    return json.dumps(items, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class ProductContext:
+    payload: str
+    profile: str
+    summary_tokens: Optional[int]
+    products: int
+    dropped: int
+    tokens: int
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "summary_tokens": self.summary_tokens,
+            "products": self.products,
+            "dropped": self.dropped,
+            "tokens": self.tokens,
+        }
+
+
+class ProductSerializer:
+    """
+    Renders search results for generation prompts as compact JSON.
+
+    Profiles, richest first:
+      - "summary": id, name, the requested attributes and the description truncated to a token limit
+      - "filtered": id, name and the requested attributes
+      - "minimal": id and name
+
+    fit returns the richest rendering whose payload fits a token budget. Null and empty fields are
+    dropped, and products are only dropped (lowest-ranked first) when even "minimal" does not fit.
+    """
+
+    def __init__(self, planner: TokenBudgetPlanner, summary_tokens: int = DEFAULT_SUMMARY_TOKENS):
+        self.planner = planner
+        self.summary_tokens = summary_tokens
+
+    def render(
+        self,
+        products: List[Dict[str, Any]],
+        profile: str,
+        attributes: Sequence[str] = (),
+        summary_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown product profile: {profile}")
+        items = []
+        for product in products:
+            item = {"product_id": product.get("product_id"), "name": product.get("name")}
+            if profile != "minimal":
+                item.update({attr: product.get(attr) for attr in attributes})
+            if profile == "summary":
+                summary = product.get("full_product_description")
+                if summary:
+                    item["summary"] = self.planner.truncate(summary, summary_tokens or self.summary_tokens, model)
+            items.append({key: value for key, value in item.items() if value is not None and value != ""})
+        return items
+
+    def fit(
+        self,
+        products: List[Dict[str, Any]],
+        max_tokens: int,
+        model: Optional[str] = None,
+        attributes: Sequence[str] = (),
+    ) -> ProductContext:
+        attributes = list(dict.fromkeys(attributes))
+        renderings = []
+        summary_tokens = self.summary_tokens
+        while True:
+            renderings.append(("summary", summary_tokens))
+            if summary_tokens <= MIN_ITEM_TEXT_TOKENS:
+                break
+            summary_tokens = max(summary_tokens // 2, MIN_ITEM_TEXT_TOKENS)
+        renderings += [("filtered", None), ("minimal", None)]
+
+        for profile, summary_tokens in renderings:
+            items = self.render(products, profile, attributes, summary_tokens, model)
+            payload = serialize_products(items)
+            tokens = self.planner.count_tokens(payload, model)
+            if max_tokens <= 0 or tokens <= max_tokens:
+                return ProductContext(payload, profile, summary_tokens, len(items), 0, tokens)
+
+        # Even ids and names are over budget, so keep the highest-ranked products that fit
+        while len(items) > 1 and tokens > max_tokens:
+            items.pop()
+            payload = serialize_products(items)
+            tokens = self.planner.count_tokens(payload, model)
+        return ProductContext(payload, "minimal", None, len(items), len(products) - len(items), tokens)
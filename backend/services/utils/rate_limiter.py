@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upper bound on how long a queued caller sleeps before re-checking the buckets
+MAX_POLL_INTERVAL = 0.25
+
+
+class RateLimitPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+PRIORITY_RANK = {RateLimitPriority.INTERACTIVE: 0, RateLimitPriority.BATCH: 1}
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket limiter for requests-per-minute and tokens-per-minute.
+
+    Callers queue by priority so interactive requests are always served before batch
+    requests. A 429 pauses the limiter for the Retry-After period and halves the effective
+    rate, which then recovers a little with every successful call.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        min_rate_factor: float = 0.1,
+        recovery_step: float = 0.05,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_rate_factor = min_rate_factor
+        self.recovery_step = recovery_step
+
+        self.rate_factor = 1.0
+        self._available_requests = float(requests_per_minute)
+        self._available_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+        self._waiters: list = []
+        self._counter = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._stats = {
+            priority.value: {"acquired": 0, "total_wait_time": 0.0} for priority in RateLimitPriority
+        }
+        self.rate_limited_count = 0
+
+    @property
+    def request_capacity(self) -> float:
+        return self.requests_per_minute * self.rate_factor
+
+    @property
+    def token_capacity(self) -> float:
+        return self.tokens_per_minute * self.rate_factor
+
+    def _get_condition(self) -> asyncio.Condition:
+        # The limiter is process-wide, but asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self._waiters = []
+        return self._condition
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_requests = min(
+            self.request_capacity, self._available_requests + elapsed * self.request_capacity / 60
+        )
+        self._available_tokens = min(self.token_capacity, self._available_tokens + elapsed * self.token_capacity / 60)
+
+    def _time_until_available(self, tokens: float) -> float:
+        request_wait = max(0.0, 1 - self._available_requests) * 60 / self.request_capacity
+        token_wait = max(0.0, tokens - self._available_tokens) * 60 / self.token_capacity
+        return max(request_wait, token_wait)
+
+    async def acquire(self, estimated_tokens: int, priority: str = RateLimitPriority.INTERACTIVE) -> float:
+        """Wait until the request fits in both buckets. Returns the time spent waiting."""
+        priority = RateLimitPriority(priority)
+        condition = self._get_condition()
+        ticket = (PRIORITY_RANK[priority], next(self._counter))
+        heapq.heappush(self._waiters, ticket)
+        start_time = time.monotonic()
+
+        try:
+            async with condition:
+                while True:
+                    self._refill()
+                    now = time.monotonic()
+                    # A single request larger than the bucket would otherwise wait forever
+                    tokens = min(float(estimated_tokens), self.token_capacity)
+
+                    if self._waiters[0] == ticket and now >= self._paused_until:
+                        wait = self._time_until_available(tokens)
+                        if wait <= 0:
+                            self._available_requests -= 1
+                            self._available_tokens -= tokens
+                            heapq.heappop(self._waiters)
+                            condition.notify_all()
+                            break
+                    else:
+                        wait = MAX_POLL_INTERVAL
+
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=min(wait, MAX_POLL_INTERVAL))
+                    except asyncio.TimeoutError:
+                        pass
+        except BaseException:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+            raise
+
+        waited = time.monotonic() - start_time
+        self._stats[priority.value]["acquired"] += 1
+        self._stats[priority.value]["total_wait_time"] += waited
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Refund (or charge) the difference between the estimate and the provider-reported usage."""
+        if actual_tokens <= 0:
+            return
+        self._available_tokens = min(self.token_capacity, self._available_tokens + estimated_tokens - actual_tokens)
+
+    def on_success(self) -> None:
+        self.rate_factor = min(1.0, self.rate_factor + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        self.rate_limited_count += 1
+        self.rate_factor = max(self.min_rate_factor, self.rate_factor / 2)
+        self._available_requests = min(self._available_requests, self.request_capacity)
+        self._available_tokens = min(self._available_tokens, self.token_capacity)
+        pause = retry_after if retry_after is not None else 1.0
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        logger.warning(f"Rate limited by provider, pausing for {pause:.1f}s (rate factor {self.rate_factor:.2f})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "rate_factor": self.rate_factor,
+            "rate_limited_count": self.rate_limited_count,
+            "queued": len(self._waiters),
+            "lanes": self._stats,
+        }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(name: str, requests_per_minute: int, tokens_per_minute: int) -> AdaptiveRateLimiter:
+    """Return the process-wide limiter for a provider, creating it on first use."""
+    if name not in _limiters:
+        _limiters[name] = AdaptiveRateLimiter(requests_per_minute, tokens_per_minute)
+    return _limiters[name]
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+async def call_with_rate_limit(
+    limiter: AdaptiveRateLimiter,
+    call: Callable[[], Awaitable[T]],
+    estimated_tokens: int,
+    priority: str,
+    rate_limit_errors: Tuple[Type[Exception], ...],
+    transient_errors: Tuple[Type[Exception], ...] = (),
+    max_retries: int = 3,
+) -> T:
+    """Acquire capacity and run call, retrying rate-limit and transient errors with backoff."""
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(estimated_tokens, priority)
+        try:
+            result = await call()
+        except rate_limit_errors as e:
+            retry_after = get_retry_after(e)
+            limiter.on_rate_limited(retry_after if retry_after is not None else 2**attempt)
+            if attempt == max_retries:
+                raise
+        except transient_errors as e:
+            if attempt == max_retries:
+                raise
+            logger.warning(f"Transient LLM API error, retrying: {e}")
+            await asyncio.sleep(2**attempt)
+        else:
+            limiter.on_success()
+            return result
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_NO_SNAPSHOT = object()
+
+
+@dataclass
+class _InFlightCall:
+    task: Optional[asyncio.Task] = None
+    waiters: int = 1
+    snapshot: Any = _NO_SNAPSHOT
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key: the first caller runs the call and
+    everyone who arrives while it is in flight awaits the same result.
+
+    The shared call is only cancelled once every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._in_flight: Dict[str, _InFlightCall] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        copy_result: Optional[Callable[[T], T]] = None,
+    ) -> T:
+        """
+        Run fn once per in-flight key. copy_result is applied to the result handed to
+        collapsed callers, e.g. to copy mutable results or zero out usage they did not incur.
+        The leader's copy_result takes a snapshot as soon as fn returns, before any caller
+        resumes, and each collapsed caller gets its own copy of that snapshot, so the leader
+        mutating its result cannot leak into theirs.
+        """
+        self.calls += 1
+        call = self._in_flight.get(key)
+        is_leader = call is None
+
+        if is_leader:
+            call = _InFlightCall()
+            call.task = asyncio.ensure_future(self._run(call, fn, copy_result))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.collapsed += 1
+            call.waiters += 1
+            logger.debug(f"{self.name}: collapsed call for key {key[:16]}")
+
+        try:
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+            raise
+        call.waiters -= 1
+
+        if not is_leader and copy_result is not None:
+            # Copy the leader's snapshot; without one the leader passed no copy_result for this key
+            return copy_result(result if call.snapshot is _NO_SNAPSHOT else call.snapshot)
+        return result
+
+    @staticmethod
+    async def _run(
+        call: _InFlightCall,
+        fn: Callable[[], Awaitable[T]],
+        copy_result: Optional[Callable[[T], T]],
+    ) -> T:
+        result = await fn()
+        if copy_result is not None:
+            call.snapshot = copy_result(result)
+        return result
+
+    def _forget(self, key: str, call: _InFlightCall) -> None:
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "collapse_rate": self.collapsed / self.calls if self.calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
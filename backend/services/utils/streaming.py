@@ -0,0 +1,92 @@
+import json
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+# Receives each text delta as soon as the provider produces it
+StreamCallback = Callable[[str], Awaitable[None]]
+
+# (delta, input_tokens, output_tokens); token counts are only set on the final chunk
+StreamChunk = Tuple[str, int, int]
+
+
+async def collect_stream(
+    stream: AsyncIterator[StreamChunk], on_delta: Optional[StreamCallback] = None
+) -> Tuple[str, int, int]:
+    """Drain a streaming response, forwarding deltas, and return (content, input_tokens, output_tokens)."""
+    parts = []
+    input_tokens = output_tokens = 0
+    async for delta, chunk_input_tokens, chunk_output_tokens in stream:
+        if delta:
+            parts.append(delta)
+            if on_delta is not None:
+                await on_delta(delta)
+        input_tokens = chunk_input_tokens or input_tokens
+        output_tokens = chunk_output_tokens or output_tokens
+    return "".join(parts), input_tokens, output_tokens
+
+
+class JsonFieldStream:
+    """
+    Decodes one string field of a JSON reply as the reply streams in, so a client is sent the text of
+    {"message": "...", "products": [...]} rather than its JSON syntax. Escapes split across deltas are held back
+    until they are complete; nothing is returned before the field starts or after it ends.
+    """
+
+    def __init__(self, field: str = "message"):
+        self._start = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._in_value = False
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        if self.done:
+            return ""
+        self._buffer += delta
+        if not self._in_value:
+            match = self._start.search(self._buffer)
+            if match is None:
+                return ""
+            self._buffer = self._buffer[match.end() :]
+            self._in_value = True
+
+        text, i = [], 0
+        buffer = self._buffer
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                text.append(char)
+                i += 1
+                continue
+            # A \uXXXX high surrogate needs its low surrogate escape too
+            length = 2
+            if buffer[i + 1 : i + 2] == "u":
+                length = 12 if buffer[i + 2 : i + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if i + length > len(buffer):
+                break
+            text.append(json.loads(f'"{buffer[i : i + length]}"'))
+            i += length
+        self._buffer = "" if self.done else buffer[i:]
+        return "".join(text)
+
+
+async def generate_with_stream_callback(
+    llm_service: Any, stream_callback: Optional[StreamCallback], field: str = "message", **kwargs
+) -> Tuple[str, int, int]:
+    """
+    Call generate_response. When a stream_callback is provided, stream the reply and send it the decoded text of
+    the reply's JSON field as it arrives.
+    """
+    if stream_callback is None:
+        return await llm_service.generate_response(**kwargs)
+
+    field_stream = JsonFieldStream(field)
+
+    async def on_delta(delta: str) -> None:
+        text = field_stream.feed(delta)
+        if text:
+            await stream_callback(text)
+
+    return await collect_stream(llm_service.generate_response_stream(**kwargs), on_delta)
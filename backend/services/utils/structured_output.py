@@ -0,0 +1,95 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# OpenAI models that accept json_schema response formats (structured outputs)
+JSON_SCHEMA_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+JSON_SCHEMA_UNSUPPORTED_MODELS = {"gpt-4o-2024-05-13", "o1-preview", "o1-mini"}
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def extract_json(content: str) -> Any:
+    """Parse a JSON reply, tolerating markdown code fences and prose around the object."""
+    text = content.strip()
+    fence = _CODE_FENCE.search(text)
+    if fence:
+        text = fence.group(1).strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts:
+        try:
+            parsed, _ = json.JSONDecoder().raw_decode(text[min(starts) :])
+            return parsed
+        except json.JSONDecodeError:
+            pass
+    raise StructuredOutputError(f"Invalid JSON response: {content}")
+
+
+def parse_structured_output(content: str, response_model: Type[M]) -> M:
+    try:
+        return response_model.model_validate_json(content)
+    except ValidationError:
+        pass
+    try:
+        return response_model.model_validate(extract_json(content))
+    except ValidationError as e:
+        raise StructuredOutputError(f"Response does not match {response_model.__name__}: {e}") from e
+
+
+def get_response_schema(response_model: Type[BaseModel]) -> Dict[str, Any]:
+    return response_model.model_json_schema()
+
+
+def supports_json_schema(model: str) -> bool:
+    return model.startswith(JSON_SCHEMA_MODEL_PREFIXES) and model not in JSON_SCHEMA_UNSUPPORTED_MODELS
+
+
+def openai_response_format(
+    response_model: Type[BaseModel], model: str, messages: List[Dict[str, str]]
+) -> Optional[Dict[str, Any]]:
+    """
+    The response_format constraining a reply to response_model. Models without structured outputs (gpt-4-turbo,
+    gpt-3.5-turbo) reject json_schema, so they get JSON mode, which OpenAI only allows when the messages ask for
+    JSON, and otherwise no format at all. Replies are validated against the model either way.
+    """
+    if not supports_json_schema(model):
+        if any("json" in (message.get("content") or "").lower() for message in messages):
+            return {"type": "json_object"}
+        return None
+    # Non-strict, since strict mode rejects open-ended objects such as filter dictionaries
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": response_model.__name__,
+            "schema": get_response_schema(response_model),
+            "strict": False,
+        },
+    }
+
+
+def anthropic_tool(response_model: Type[BaseModel]) -> Dict[str, Any]:
+    return {
+        "name": response_model.__name__,
+        "description": f"Respond with a {response_model.__name__} object.",
+        "input_schema": get_response_schema(response_model),
+    }
+
+
+async def generate_structured_response(
+    llm_service: Any, response_model: Type[M], **kwargs
+) -> Tuple[M, int, int]:
+    """Generate a schema-constrained reply and validate it into response_model."""
+    content, input_tokens, output_tokens = await llm_service.generate_response(response_model=response_model, **kwargs)
+    return parse_structured_output(content, response_model), input_tokens, output_tokens
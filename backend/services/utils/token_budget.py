@@ -0,0 +1,156 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-message overhead of the chat format (role markers and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Each older message keeps at most this many tokens when condensed into the history digest
+DIGEST_TOKENS_PER_MESSAGE = 40
+# Product text fields are never truncated below this many tokens before products start getting dropped
+MIN_ITEM_TEXT_TOKENS = 32
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    """
+    Token limits for a prompt type.
+
+    The caps express priority: whatever a prompt type needs most gets the larger share,
+    and chat history is always the first thing trimmed when the total is over budget.
+    """
+
+    max_input_tokens: int
+    max_history_tokens: int
+    max_payload_tokens: int = 0
+
+
+PROMPT_BUDGETS: Dict[str, PromptBudget] = {
+    "route_classification": PromptBudget(max_input_tokens=6000, max_history_tokens=1000),
+    "query_processor": PromptBudget(max_input_tokens=8000, max_history_tokens=1500),
+    "semantic_search_query": PromptBudget(max_input_tokens=4000, max_history_tokens=1000),
+    "chitchat": PromptBudget(max_input_tokens=6000, max_history_tokens=3000),
+    "low_confidence": PromptBudget(max_input_tokens=6000, max_history_tokens=2000),
+    "clear_intent_response": PromptBudget(max_input_tokens=12000, max_history_tokens=1500, max_payload_tokens=6000),
+    "vague_intent_response": PromptBudget(max_input_tokens=12000, max_history_tokens=1500, max_payload_tokens=6000),
+    "dynamic_analysis": PromptBudget(max_input_tokens=12000, max_history_tokens=3000),
+    "dynamic_response": PromptBudget(max_input_tokens=14000, max_history_tokens=1500, max_payload_tokens=8000),
+}
+DEFAULT_BUDGET = PromptBudget(max_input_tokens=8000, max_history_tokens=2000, max_payload_tokens=4000)
+
+
+@dataclass
+class BudgetPlan:
+    prompt_type: str
+    budget: int
+    chat_history: List[Dict[str, str]]
+    planned_input_tokens: int
+    segments: Dict[str, int] = field(default_factory=dict)
+    history_messages_dropped: int = 0
+    history_summarized: bool = False
+
+    def report(self, actual_input_tokens: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "prompt_type": self.prompt_type,
+            "budget": self.budget,
+            "planned_input_tokens": self.planned_input_tokens,
+            "actual_input_tokens": actual_input_tokens,
+            "segments": self.segments,
+            "history_messages_dropped": self.history_messages_dropped,
+            "history_summarized": self.history_summarized,
+        }
+
+
+class TokenBudgetPlanner:
+    """Counts tokens per prompt segment and trims history and product payloads to fit a prompt budget."""
+
+    def __init__(self, get_encoder: Callable[[str], Any], default_model: str):
+        self.get_encoder = get_encoder
+        self.default_model = default_model
+
+    def get_budget(self, prompt_type: str) -> PromptBudget:
+        return PROMPT_BUDGETS.get(prompt_type, DEFAULT_BUDGET)
+
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
+        if not text:
+            return 0
+        return len(self.get_encoder(model or self.default_model).encode(text))
+
+    def count_messages(self, messages: Sequence[Dict[str, str]], model: Optional[str] = None) -> int:
+        return sum(self.count_tokens(m.get("content", ""), model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def truncate(self, text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        encoder = self.get_encoder(model or self.default_model)
+        tokens = encoder.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoder.decode(tokens[:max_tokens]).rstrip() + "..."
+
+    def fit_history(
+        self, chat_history: Optional[List[Dict[str, str]]], max_tokens: int, model: Optional[str] = None
+    ) -> Tuple[List[Dict[str, str]], int, bool]:
+        """
+        Keep the most recent messages that fit in max_tokens. Older messages are condensed into a
+        single digest message when there is room for it, otherwise they are dropped.
+
+        Returns (history, dropped_count, summarized).
+        """
+        chat_history = chat_history or []
+        if self.count_messages(chat_history, model) <= max_tokens:
+            return list(chat_history), 0, False
+
+        kept: List[Dict[str, str]] = []
+        used = 0
+        for message in reversed(chat_history):
+            cost = self.count_tokens(message.get("content", ""), model) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > max_tokens:
+                break
+            kept.insert(0, message)
+            used += cost
+
+        older = chat_history[: len(chat_history) - len(kept)]
+        remaining = max_tokens - used - MESSAGE_OVERHEAD_TOKENS
+        digest_lines = []
+        for message in reversed(older):
+            line = f"{message['role']}: {self.truncate(message.get('content', ''), DIGEST_TOKENS_PER_MESSAGE, model)}"
+            cost = self.count_tokens(line, model) + 1
+            if cost > remaining:
+                break
+            digest_lines.insert(0, line)
+            remaining -= cost
+
+        if digest_lines:
+            digest = {"role": "system", "content": "Summary of earlier conversation:\n" + "\n".join(digest_lines)}
+            return [digest] + kept, len(older), True
+        return kept, len(older), False
+
+    def plan(
+        self,
+        prompt_type: str,
+        system_message: Optional[str],
+        user_message: str,
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        model: Optional[str] = None,
+    ) -> BudgetPlan:
+        budget = self.get_budget(prompt_type)
+        system_tokens = self.count_tokens(system_message or "", model) + MESSAGE_OVERHEAD_TOKENS
+        user_tokens = self.count_tokens(user_message, model) + MESSAGE_OVERHEAD_TOKENS
+
+        history_allowance = min(budget.max_history_tokens, budget.max_input_tokens - system_tokens - user_tokens)
+        history, dropped, summarized = self.fit_history(chat_history, max(history_allowance, 0), model)
+        history_tokens = self.count_messages(history, model)
+
+        planned = system_tokens + user_tokens + history_tokens
+        if planned > budget.max_input_tokens:
+            logger.warning(f"Prompt '{prompt_type}' needs {planned} tokens, over its {budget.max_input_tokens} budget")
+
+        return BudgetPlan(
+            prompt_type=prompt_type,
+            budget=budget.max_input_tokens,
+            chat_history=history,
+            planned_input_tokens=planned,
+            segments={"system": system_tokens, "user": user_tokens, "history": history_tokens},
+            history_messages_dropped=dropped,
+            history_summarized=summarized,
+        )
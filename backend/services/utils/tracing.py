@@ -0,0 +1,216 @@
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "boardbot-backend"
+
+
+class SpanKind:
+    # OpenTelemetry span kinds
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: int = SpanKind.INTERNAL
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_time_ns is not None:
+            return
+        self.end_time_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_otel(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or time.time_ns()),
+            "attributes": [_otel_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    In-process tracing with OpenTelemetry-shaped spans.
+
+    Each message gets a trace; router steps, graph nodes, LLM calls and Weaviate queries open nested
+    spans under whatever span is current in their context, so concurrent requests (and tasks spawned
+    from them) keep separate trees. The most recent traces are kept in a ring buffer and can be exported
+    as OTLP/JSON.
+    """
+
+    def __init__(self, max_traces: int = 200, enabled: bool = True):
+        self.max_traces = max_traces
+        self.enabled = enabled
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+
+    def configure(self, max_traces: int, enabled: bool = True) -> None:
+        self.max_traces = max_traces
+        self.enabled = enabled
+        while len(self._traces) > max_traces:
+            self._traces.popitem(last=False)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    def current_trace_id(self) -> Optional[str]:
+        span = self.current_span()
+        return span.trace_id if span else None
+
+    def start_span(self, name: str, kind: int = SpanKind.INTERNAL, **attributes: Any) -> Span:
+        """
+        A span under the current one (or a new trace) that the caller ends. It does not become the current
+        span, so it suits work that outlives a single context, such as streaming generators.
+        """
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(trace_id, secrets.token_hex(8), parent.span_id if parent else None, name, kind, attributes)
+        if self.enabled:
+            if parent is None:
+                self._traces[trace_id] = []
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans = self._traces.get(trace_id)
+            # Spans of a trace already evicted from the buffer are dropped
+            if spans is not None:
+                spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: int = SpanKind.INTERNAL, **attributes: Any) -> Iterator[Span]:
+        span = self.start_span(name, kind, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def traced(self, name: str, kind: int = SpanKind.INTERNAL) -> Callable:
+        """Decorator running an async function in a span."""
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name, kind):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def get_trace(self, trace_id: str) -> Optional[List[Span]]:
+        return self._traces.get(trace_id)
+
+    def summaries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The most recent traces first, with their root span's name, timing and attributes."""
+        summaries = []
+        for trace_id, spans in reversed(self._traces.items()):
+            if len(summaries) == limit:
+                break
+            if not spans:
+                continue
+            root = spans[0]
+            summaries.append(
+                {
+                    "trace_id": trace_id,
+                    "name": root.name,
+                    "start_time": root.start_time_ns / 1e9,
+                    "duration": root.duration,
+                    "spans": len(spans),
+                    "error": any(span.error for span in spans),
+                    "attributes": root.attributes,
+                }
+            )
+        return summaries
+
+    def breakdown(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """The spans of a trace as an indented timeline, offsets in seconds from the start of the trace."""
+        spans = self._traces.get(trace_id)
+        if not spans:
+            return None
+        start = spans[0].start_time_ns
+        depths: Dict[str, int] = {}
+        timeline = []
+        for span in sorted(spans, key=lambda span: span.start_time_ns):
+            depths[span.span_id] = depths.get(span.parent_id, -1) + 1
+            timeline.append(
+                {
+                    "name": span.name,
+                    "depth": depths[span.span_id],
+                    "offset": (span.start_time_ns - start) / 1e9,
+                    "duration": span.duration,
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+            )
+        return timeline
+
+    def export(self, trace_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """OTLP/JSON (an ExportTraceServiceRequest) for the given traces, or every buffered trace."""
+        trace_ids = list(self._traces) if trace_ids is None else trace_ids
+        spans = [span.to_otel() for trace_id in trace_ids for span in self._traces.get(trace_id, [])]
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otel_attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }
+            ]
+        }
+
+
+tracer = Tracer()
@@ -0,0 +1,102 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import Config
+from services.openai_service import OpenAIService
+from services.utils.enhanced_error_logger import create_error_logger
+
+logger = logging.getLogger(__name__)
+logger.error = create_error_logger(logger)
+
+# Numbers and words separately, so "8GB" matches "8 GB LPDDR4"
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+
+
+class VectorReranker:
+    """
+    Local replacement for QueryProcessor.rerank_products.
+
+    Candidates are scored by the cosine similarity between the (usually cached) query embedding and
+    the product vectors Weaviate returns with include_vector, blended with the fraction of the parsed
+    filters each product matches. Scoring is a matrix-vector product and a mean over a match matrix,
+    so reranking takes milliseconds and no tokens. Products searched without their vector fall back to
+    the cosine implied by their Weaviate certainty, (1 + cosine) / 2.
+    """
+
+    def __init__(self, openai_service: OpenAIService, vector_weight: float = 0.7, candidate_factor: int = 2):
+        self.openai_service = openai_service
+        self.vector_weight = vector_weight
+        self.candidate_factor = candidate_factor
+
+    @classmethod
+    def from_config(cls, config: Config, openai_service: OpenAIService) -> Optional["VectorReranker"]:
+        """None when PRODUCT_RERANKER is "none", so the agents keep the search order."""
+        if config.PRODUCT_RERANKER == "none":
+            return None
+        if config.PRODUCT_RERANKER != "vector":
+            raise ValueError(f"Unknown PRODUCT_RERANKER: {config.PRODUCT_RERANKER}")
+        return cls(openai_service, config.PRODUCT_RERANKER_VECTOR_WEIGHT, config.PRODUCT_RERANKER_CANDIDATE_FACTOR)
+
+    def candidate_limit(self, limit: int) -> int:
+        """How many candidates to search for so reranking has more than limit products to choose from."""
+        return limit * self.candidate_factor
+
+    async def rerank(
+        self, query: str, products: List[Dict[str, Any]], filters: Dict[str, Any], top_k: int
+    ) -> List[Dict[str, Any]]:
+        """The top_k products, best first, without their vectors and with the score in _search_metadata."""
+        if not products:
+            return []
+        try:
+            query_vector = (await self.openai_service.create_embeddings([query]))[0]
+        except Exception as e:
+            logger.error(f"Error embedding rerank query, keeping the search order: {e}", exc_info=True)
+            return [self._strip_vector(product) for product in products[:top_k]]
+
+        scores = self.score(query_vector, products, filters)
+        # Stable, so equally scored products keep their search order
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        reranked = []
+        for index in order:
+            product = self._strip_vector(products[index])
+            search_metadata = product.get("_search_metadata", {})
+            product["_search_metadata"] = {**search_metadata, "rerank_score": float(scores[index])}
+            reranked.append(product)
+        return reranked
+
+    def score(self, query_vector: np.ndarray, products: List[Dict[str, Any]], filters: Dict[str, Any]) -> np.ndarray:
+        similarities = self._similarities(np.asarray(query_vector, dtype=np.float32), products)
+        if not filters:
+            return similarities
+        matches = self._attribute_matches(products, filters)
+        return self.vector_weight * similarities + (1 - self.vector_weight) * matches.mean(axis=1)
+
+    @staticmethod
+    def _similarities(query_vector: np.ndarray, products: List[Dict[str, Any]]) -> np.ndarray:
+        similarities = np.zeros(len(products), dtype=np.float32)
+        with_vector = [index for index, product in enumerate(products) if product.get("vector")]
+        if with_vector:
+            matrix = np.asarray([products[index]["vector"] for index in with_vector], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+            similarities[with_vector] = (matrix @ query_vector) / np.where(norms == 0, 1, norms)
+        for index, product in enumerate(products):
+            if not product.get("vector") and product.get("certainty") is not None:
+                similarities[index] = 2 * product["certainty"] - 1
+        return similarities
+
+    @staticmethod
+    def _attribute_matches(products: List[Dict[str, Any]], filters: Dict[str, Any]) -> np.ndarray:
+        """A products x filters matrix: 1 where the product's attribute mentions every token of the filter value."""
+        filter_tokens = [(key, set(TOKEN_PATTERN.findall(str(value).lower()))) for key, value in filters.items()]
+        matches = np.zeros((len(products), len(filter_tokens)), dtype=np.float32)
+        for row, product in enumerate(products):
+            for col, (key, tokens) in enumerate(filter_tokens):
+                value = product.get(key)
+                if value is not None and tokens:
+                    matches[row, col] = tokens <= set(TOKEN_PATTERN.findall(str(value).lower()))
+        return matches
+
+    @staticmethod
+    def _strip_vector(product: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in product.items() if key != "vector"}
@@ -1,18 +1,69 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
+import asyncio
+import base64
+import copy
 import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple, TypedDict, Union
+import uuid
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple, TypedDict, Union
 from services.utils.enhanced_error_logger import create_error_logger
 from services.utils.filter_parser import QueryBuilder
+from services.utils.single_flight import SingleFlight
+from services.utils.tracing import SpanKind, tracer
 from weaviate_interface import WeaviateInterface, route_descriptions
+from weaviate_interface.utils.unit_parser import comparison_property
 from feature_extraction.product_data_preprocessor import ProductDataProcessor
-from weaviate.classes.query import Filter
+from weaviate.classes.query import Filter, Sort
 from weaviate.classes.config import Property, DataType
 
 logger = logging.getLogger(__name__)
 logger.error = create_error_logger(logger)
 
+# Filters kept longest when relaxing a search, most important first. Unlisted filters are dropped first.
+FILTER_IMPORTANCE = (
+    "form_factor",
+    "processor_architecture",
+    "processor_manufacturer",
+    "manufacturer",
+    "memory",
+    "processor_core_count",
+    "operating_system_bsp",
+    "wireless",
+    "io_count",
+    "onboard_storage",
+    "operating_temperature_min",
+    "operating_temperature_max",
+    "input_voltage",
+    "processor_tdp",
+    "certifications",
+    "evaluation_or_commercialization",
+)
+
+# Reciprocal Rank Fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+# Fusion weights of the result lists from each relaxation level, and from the unfiltered fallbacks
+RELAXATION_LEVEL_WEIGHTS = (1.0, 0.5)
+RELAXATION_FALLBACK_WEIGHT = 0.25
+
+# Product counts remembered per filter between catalog changes
+COUNT_CACHE_SIZE = 256
+
+
+def encode_cursor(product_id: str) -> str:
+    """The opaque cursor of the page after a product."""
+    return base64.urlsafe_b64encode(uuid.UUID(product_id).bytes).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """The product id a cursor continues after; raises ValueError for anything encode_cursor did not produce."""
+    try:
+        return str(uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 class SortOrder(str, Enum):
     ASC = "asc"
     DESC = "desc"
@@ -22,7 +73,7 @@ class SortOrder(str, Enum):
 class SortConfig:
     field: str
     order: SortOrder
-    weight: float = 1.0  # For multi-sort scenarios
+    weight: float = 1.0  # Unused by the server-side sort, which orders keys lexicographically
 
 
 class SearchParams(TypedDict, total=False):
@@ -32,6 +83,7 @@ class SearchParams(TypedDict, total=False):
     limit: int
     offset: int
     search_type: str
+    include_vector: bool
 
 
 class WeaviateService:
@@ -41,6 +93,11 @@ class WeaviateService:
         self.wi = WeaviateInterface(weaviate_url, openai_key)
         self.data_processor = product_data_preprocessor
         self.query_builder = QueryBuilder()
+        self.single_flight = SingleFlight("weaviate_search")
+        # Bumped by every product write. Counts are cached under the version they were computed at, so a count
+        # that was in flight during a write is never served after it.
+        self.catalog_version = 0
+        self._count_cache: "OrderedDict[Tuple[int, str], int]" = OrderedDict()
 
     async def __aenter__(self):
         await self.connect()
@@ -94,6 +151,7 @@ class WeaviateService:
 
                 try:
                     await self.wi.product_service.batch_create_objects(batch)
+                    self._invalidate_counts()
                     logger.info(f"Inserted batch {i // 20 + 1} of {len(processed_data) // 20 + 1}")
                 except Exception as e:
                     logger.error(f"Error inserting products at index {i}: {e}", exc_info=True)
@@ -114,7 +172,8 @@ class WeaviateService:
 
     async def search_routes(self, query: str) -> List[Tuple[str, float]]:
         try:
-            routes = await self.wi.route_service.search(query_text=query, return_properties=["route"], limit=1)
+            with tracer.span("weaviate.search_routes", SpanKind.CLIENT):
+                routes = await self.wi.route_service.search(query_text=query, return_properties=["route"], limit=1)
             return [(route["route"], route["certainty"]) for route in routes]
         except Exception as e:
             logger.error(f"Error searching routes: {e}", exc_info=True)
@@ -136,7 +195,9 @@ class WeaviateService:
 
     async def add_product(self, product_data: Dict[str, Any]) -> str:
         try:
-            return await self.wi.product_service.create(product_data)
+            product_id = await self.wi.product_service.create(product_data)
+            self._invalidate_counts()
+            return product_id
         except Exception as e:
             logger.error(f"Error adding product: {e}", exc_info=True)
             raise
@@ -148,6 +209,7 @@ class WeaviateService:
             product_data_copy.pop("id", None)
 
             await self.wi.product_service.update(id, product_data_copy)
+            self._invalidate_counts()
         except Exception as e:
             logger.error(f"Error updating product {id}: {e}", exc_info=True)
             raise
@@ -155,6 +217,7 @@ class WeaviateService:
     async def delete_product(self, id: str) -> None:
         try:
             await self.wi.product_service.delete(id)
+            self._invalidate_counts()
         except Exception as e:
             logger.error(f"Error deleting product {id}: {e}", exc_info=True)
             raise
@@ -173,12 +236,60 @@ class WeaviateService:
                 )
 
             products = await self.wi.product_service.get_all(limit=limit, offset=offset, filters=weaviate_filter)
-            total_count = await self.wi.product_service.count()
+            total_count = await self.count_products(filter_dict, weaviate_filter)
             return products, total_count
         except Exception as e:
             logger.error(f"Error getting products: {e}", exc_info=True)
             raise
 
+    async def get_products_after(
+        self, limit: int = 10, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        The page of products following a cursor (the first page without one), with the total count and the cursor
+        of the next page, None on the last page, so no cursor leads to an empty page. Pages cost the same at any
+        depth, unlike offsets, but Weaviate's cursor cannot be filtered. Raises ValueError for an invalid cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            # One product past the page tells whether another page follows
+            products = await self.wi.product_service.get_all(limit=limit + 1, after=after)
+            total_count = await self.count_products()
+        except Exception as e:
+            logger.error(f"Error getting products after cursor {cursor}: {e}", exc_info=True)
+            raise
+        products, has_more = products[:limit], len(products) > limit
+        next_cursor = encode_cursor(products[-1]["id"]) if has_more else None
+        return products, total_count, next_cursor
+
+    async def count_products(
+        self, filter_dict: Optional[Dict[str, Any]] = None, weaviate_filter: Optional[Filter] = None
+    ) -> int:
+        """
+        The number of products matching filter_dict (all products without one), as built into weaviate_filter.
+        Counts are cached per canonical filter until the next product write; concurrent misses share one aggregate.
+        """
+        key = (self.catalog_version, json.dumps(filter_dict or {}, sort_keys=True, default=str))
+        if key in self._count_cache:
+            self._count_cache.move_to_end(key)
+            return self._count_cache[key]
+
+        count = await self.single_flight.do(
+            f"count:{key[0]}:{key[1]}", lambda: self.wi.product_service.count(filters=weaviate_filter)
+        )
+        if count is None:
+            # The aggregate failed; report nothing rather than caching it
+            return 0
+        if key[0] == self.catalog_version:
+            self._count_cache[key] = count
+            if len(self._count_cache) > COUNT_CACHE_SIZE:
+                self._count_cache.popitem(last=False)
+        return count
+
+    def _invalidate_counts(self) -> None:
+        self.catalog_version += 1
+        self._count_cache.clear()
+
     async def store_raw_data(self, product_id: str, raw_data: str) -> str:
         try:
             # Store the raw data
@@ -263,7 +374,206 @@ class WeaviateService:
     async def search_products(self, search_params: SearchParams) -> List[Dict[str, Any]]:
         """
         Unified search function handling all search scenarios.
+
+        Identical searches already in flight share one Weaviate query; each caller gets its own copy of the results.
+        """
+        key = json.dumps(search_params, sort_keys=True, default=str)
+        with tracer.span(
+            "weaviate.search_products",
+            SpanKind.CLIENT,
+            search_type=search_params.get("search_type", "semantic"),
+            limit=search_params.get("limit", 5),
+            filters=json.dumps(search_params.get("filters") or {}, default=str),
+        ) as span:
+            results = await self.single_flight.do(
+                key, lambda: self._search_products(search_params), copy_result=copy.deepcopy
+            )
+            span.set_attributes(results=len(results))
+        return results
+
+    async def search_with_relaxation(
+        self,
+        filters: Dict[str, Any],
+        limit: int,
+        semantic_query: Optional[str] = None,
+        warm_candidates: Optional[Callable[[], Awaitable[List[Dict[str, Any]]]]] = None,
+        normalize_scores: bool = False,
+        include_vector: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Collect up to limit unique products, relaxing the filters until enough are found.
+
+        Levels run in order: all filters, then every relaxation of them at once (the most important
+        filters kept together, then each filter on its own), then warm_candidates, then an unfiltered
+        semantic search for semantic_query. Within a level the queries run concurrently; their results
+        are merged in order and the rest are cancelled as soon as limit products are collected.
+
+        The collected products are ranked by fusing every result list that came back, with stricter
+        levels weighted higher (see fuse_results). With include_vector, the filtered and semantic searches
+        also return each product's vector.
+        """
+        unique_results: Dict[str, Dict[str, Any]] = {}
+        ranked_lists: List[Tuple[float, List[Dict[str, Any]]]] = []
+        errors: List[Exception] = []
+
+        for level, queries in enumerate(self._relaxation_levels(filters, limit, include_vector)):
+            weight = RELAXATION_LEVEL_WEIGHTS[level]
+            await self._run_relaxation_level(queries, weight, unique_results, ranked_lists, limit, errors)
+            if len(unique_results) >= limit:
+                logger.info(f"Relaxed search collected {limit} products at level {level}")
+                break
+        else:
+            if warm_candidates is not None:
+                candidates = await warm_candidates()
+                ranked_lists.append((RELAXATION_FALLBACK_WEIGHT, candidates))
+                self._merge_results(candidates, unique_results, limit)
+
+            if semantic_query and len(unique_results) < limit:
+                semantic_search: SearchParams = {
+                    "query": semantic_query,
+                    "limit": limit * 2 - len(unique_results),
+                    "search_type": "semantic",
+                    "include_vector": include_vector,
+                }
+                await self._run_relaxation_level(
+                    [semantic_search], RELAXATION_FALLBACK_WEIGHT, unique_results, ranked_lists, limit, errors
+                )
+
+        if not unique_results and errors:
+            raise errors[0]
+        fused = self.fuse_results(
+            [results for _, results in ranked_lists],
+            weights=[weight for weight, _ in ranked_lists],
+            normalize_scores=normalize_scores,
+        )
+        return [result for result in fused if result["product_id"] in unique_results][:limit]
+
+    @staticmethod
+    def _relaxation_levels(
+        filters: Dict[str, Any], limit: int, include_vector: bool = False
+    ) -> List[List[SearchParams]]:
+        if not filters:
+            return []
+
+        def hybrid_search(subset: Dict[str, Any], search_limit: int) -> SearchParams:
+            query = " ".join(f"{key}:{value}" for key, value in subset.items())
+            return {
+                "query": query,
+                "filters": subset,
+                "limit": search_limit,
+                "search_type": "hybrid",
+                "include_vector": include_vector,
+            }
+
+        ranked = sorted(
+            filters,
+            key=lambda key: FILTER_IMPORTANCE.index(key) if key in FILTER_IMPORTANCE else len(FILTER_IMPORTANCE),
+        )
+        relaxed = [{key: filters[key] for key in ranked[:size]} for size in range(len(ranked) - 1, 0, -1)]
+        relaxed += [{key: filters[key]} for key in ranked[1:]]
+        return [[hybrid_search(filters, limit * 2)], [hybrid_search(subset, limit) for subset in relaxed]]
+
+    async def _run_relaxation_level(
+        self,
+        queries: List[SearchParams],
+        weight: float,
+        unique_results: Dict[str, Dict[str, Any]],
+        ranked_lists: List[Tuple[float, List[Dict[str, Any]]]],
+        limit: int,
+        errors: List[Exception],
+    ) -> None:
+        tasks = [asyncio.ensure_future(self.search_products(query)) for query in queries]
+        try:
+            for query, task in zip(queries, tasks):
+                try:
+                    results = await task
+                except Exception as e:
+                    logger.warning(f"Relaxed search for filters {query.get('filters')} failed: {e}")
+                    errors.append(e)
+                    continue
+                ranked_lists.append((weight, results))
+                if self._merge_results(results, unique_results, limit):
+                    break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    def _merge_results(
+        results: List[Dict[str, Any]], unique_results: Dict[str, Dict[str, Any]], limit: int
+    ) -> bool:
+        """Add unseen products until limit is reached; returns whether it was."""
+        for result in results:
+            if len(unique_results) >= limit:
+                break
+            unique_results.setdefault(result["product_id"], result)
+        return len(unique_results) >= limit
+
+    @staticmethod
+    def fuse_results(
+        result_lists: List[List[Dict[str, Any]]],
+        weights: Optional[List[float]] = None,
+        k: int = RRF_K,
+        normalize_scores: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge ranked product lists (hybrid, semantic, keyword, ...) into one ranking.
+
+        By default this is weighted Reciprocal Rank Fusion: a product scores weight / (k + rank) in
+        every list it appears in. With normalize_scores, each list instead contributes its own
+        scores (certainty or score) min-max normalized to [0, 1], so a clear winner in one list is
+        not flattened to its rank. The fused score and the contributing ranks are added to each
+        product's _search_metadata. Ties keep the order in which products were first seen.
         """
+        fused_scores: Dict[str, float] = {}
+        products: Dict[str, Dict[str, Any]] = {}
+        sources: Dict[str, List[Dict[str, Any]]] = {}
+
+        for index, results in enumerate(result_lists):
+            weight = weights[index] if weights else 1.0
+            if normalize_scores:
+                contributions = WeaviateService._normalized_scores(results)
+            else:
+                contributions = [1 / (k + rank) for rank in range(1, len(results) + 1)]
+            for rank, (result, contribution) in enumerate(zip(results, contributions), start=1):
+                product_id = result["product_id"]
+                products.setdefault(product_id, result)
+                fused_scores[product_id] = fused_scores.get(product_id, 0.0) + weight * contribution
+                sources.setdefault(product_id, []).append(
+                    {
+                        "list": index,
+                        "rank": rank,
+                        "search_type": result.get("_search_metadata", {}).get("search_type"),
+                    }
+                )
+
+        fused = []
+        for product_id in sorted(products, key=lambda product_id: -fused_scores[product_id]):
+            product = products[product_id]
+            search_metadata = {
+                **product.get("_search_metadata", {}),
+                "fused_score": fused_scores[product_id],
+                "fusion_sources": sources[product_id],
+            }
+            fused.append({**product, "_search_metadata": search_metadata})
+        return fused
+
+    @staticmethod
+    def _normalized_scores(results: List[Dict[str, Any]]) -> List[float]:
+        scores = [
+            result.get("score") if result.get("score") is not None else result.get("certainty") for result in results
+        ]
+        if any(score is None for score in scores):
+            # No usable scores, so fall back to a linear decay by rank
+            return [1 - rank / len(results) for rank in range(len(results))]
+        low, high = min(scores), max(scores)
+        if high == low:
+            return [1.0] * len(scores)
+        return [(score - low) / (high - low) for score in scores]
+
+    async def _search_products(self, search_params: SearchParams) -> List[Dict[str, Any]]:
         try:
             # Build Weaviate filter from filter dictionary
             weaviate_filter = None
@@ -275,12 +585,13 @@ class WeaviateService:
             search_type = search_params.get("search_type", "semantic")
             limit = search_params.get("limit", 5)
             query = search_params.get("query")
+            include_vector = search_params.get("include_vector", False)
 
             # Get sort configuration
             sort_configs = self._normalize_sort_config(search_params.get("sort"))
 
             # If no query is provided for semantic/hybrid search, fall back to filtered
-            if not query and search_type in ("semantic", "hybrid"):
+            if not query and search_type in ("semantic", "hybrid", "keyword"):
                 logger.warning(f"No query provided for {search_type} search, falling back to filtered search")
                 search_type = "filtered"
 
@@ -290,11 +601,28 @@ class WeaviateService:
             # Execute search based on type
             if search_type == "semantic":
                 results = await self.wi.product_service.semantic_search(
-                    query_text=query, limit=limit, filters=weaviate_filter, return_properties=return_properties
+                    query_text=query,
+                    limit=limit,
+                    filters=weaviate_filter,
+                    return_properties=return_properties,
+                    include_vector=include_vector,
                 )
             elif search_type == "hybrid":
                 results = await self.wi.product_service.hybrid_search(
-                    query_text=query, limit=limit, filters=weaviate_filter, return_properties=return_properties
+                    query_text=query,
+                    limit=limit,
+                    filters=weaviate_filter,
+                    return_properties=return_properties,
+                    include_vector=include_vector,
+                )
+            elif search_type == "keyword":
+                results = await self.wi.product_service.keyword_search(
+                    query_text=query,
+                    filters=weaviate_filter,
+                    return_properties=return_properties,
+                    limit=limit,
+                    auto_limit=None,
+                    include_vector=include_vector,
                 )
             else:
                 # Direct filtered query with sorting
@@ -340,27 +668,11 @@ class WeaviateService:
                     limit=limit, filters=filters, return_properties=return_properties
                 )
 
-            # For single sort condition
-            if len(sort_configs) == 1:
-                sort_config = sort_configs[0]
-                return await self.wi.product_service.get_sorted(
-                    filters=filters,
-                    sort_by=sort_config.field,
-                    sort_order=sort_config.order.value,
-                    limit=limit,
-                    return_properties=return_properties,
-                )
-
-            # For multiple sort conditions, fetch extra results to ensure accurate sorting
-            fetch_limit = min(limit * 2, 100)
-            results = await self.wi.product_service.get_all(
-                limit=fetch_limit, filters=filters, return_properties=return_properties
+            # All sort keys go into one server-side sort, so the top-N is exact whatever the catalog size
+            return await self.wi.product_service.get_all(
+                limit=limit, filters=filters, sort=self._build_sort(sort_configs), return_properties=return_properties
             )
 
-            # Apply multiple sorts and return requested limit
-            sorted_results = self._apply_multiple_sorts(results, sort_configs)
-            return sorted_results[:limit]
-
         except Exception as e:
             logger.error(f"Error in _execute_sorted_query: {str(e)}", exc_info=True)
             raise
@@ -393,23 +705,18 @@ class WeaviateService:
 
         raise ValueError(f"Invalid sort configuration format: {sort_config}")
 
-    def _apply_multiple_sorts(
-        self, results: List[Dict[str, Any]], sort_configs: List[SortConfig]
-    ) -> List[Dict[str, Any]]:
-        """Applies multiple sort conditions with weights"""
-
-        def sort_key(item):
-            # Create a tuple of weighted values for sorting
-            return tuple(
-                (
-                    config.weight * float(item.get(config.field, 0))
-                    if config.order == SortOrder.ASC
-                    else -config.weight * float(item.get(config.field, 0))
-                )
-                for config in sort_configs
+    @staticmethod
+    def _build_sort(sort_configs: List[SortConfig]) -> Sort:
+        """
+        Chains the sort configs into one Weaviate sort, most significant key first. Unit-bearing text fields
+        ("8GB", "15W") sort by their numeric shadow property.
+        """
+        sort = Sort
+        for config in sort_configs:
+            sort = sort.by_property(
+                comparison_property(config.field) or config.field, ascending=config.order == SortOrder.ASC
             )
-
-        return sorted(results, key=sort_key)
+        return sort
 
     def _post_process_results(
         self, results: List[Dict[str, Any]], sort_configs: List[SortConfig]
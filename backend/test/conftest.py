@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from config import Config
+from services.anthropic_service import AnthropicService
+from services.openai_service import OpenAIService
+from services.utils.token_budget import TokenBudgetPlanner
+from services.weaviate_service import WeaviateService
+
+# Models the OpenAI service counts tokens for in tests, besides the configured embedding model
+ENCODED_MODELS = ("gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo")
+
+
+class WhitespaceEncoder:
+    """One token per whitespace-separated word keeps the arithmetic readable and needs no tiktoken download."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def token_planner():
+    return TokenBudgetPlanner(lambda model: WhitespaceEncoder(), "gpt-4o")
+
+
+@pytest.fixture
+def make_openai_service():
+    """Builds an OpenAIService that counts tokens by whitespace and, given a fake client, never calls the API."""
+
+    def make(client=None, config=None, **kwargs):
+        service = OpenAIService("test-key", config or Config(), **kwargs)
+        service.encoders.update({model: WhitespaceEncoder() for model in ENCODED_MODELS})
+        service.encoders[service.config.EMBEDDING_MODEL] = WhitespaceEncoder()
+        if client is not None:
+            service.client = client
+        return service
+
+    return make
+
+
+@pytest.fixture
+def make_anthropic_service():
+    """Builds an AnthropicService that counts tokens by whitespace and answers from the given fake messages API."""
+
+    def make(messages=None, config=None):
+        service = AnthropicService("test-key", config or Config())
+        service.encoder = WhitespaceEncoder()
+        if messages is not None:
+            service.client = SimpleNamespace(messages=messages)
+        return service
+
+    return make
+
+
+@pytest.fixture
+def with_weaviate_service():
+    """
+    Runs an async function against a WeaviateService and returns its result. The service reads products from
+    product_service, and search_products, when given, stands in for its Weaviate search.
+    """
+
+    def run(product_service, function, search_products=None):
+        async def main():
+            # The Weaviate async client binds to the running event loop when it is created
+            service = WeaviateService("test-key", "http://localhost:8080", None)
+            service.wi = SimpleNamespace(product_service=product_service)
+            if search_products is not None:
+                service._search_products = search_products
+            return await function(service)
+
+        return asyncio.run(main())
+
+    return run
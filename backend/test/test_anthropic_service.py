@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services.anthropic_service import AnthropicService
+
+
+class FakeMessages:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text='{"message": "Hi"}')],
+            usage=SimpleNamespace(
+                input_tokens=20, output_tokens=7, cache_creation_input_tokens=0, cache_read_input_tokens=1500
+            ),
+        )
+
+
+@pytest.fixture
+def anthropic_service(make_anthropic_service):
+    return make_anthropic_service(FakeMessages())
+
+
+def test_convert_messages_uses_top_level_system_and_alternating_roles():
+    system_blocks, messages = AnthropicService._convert_messages(
+        [
+            {"role": "system", "content": "You are BoardBot."},
+            {"role": "system", "content": "Summary of earlier conversation: ..."},
+            {"role": "assistant", "content": "Here are some boards."},
+            {"role": "user", "content": "Which has the most RAM?"},
+            {"role": "user", "content": "And the lowest TDP?"},
+        ],
+        cache_system_prompt=True,
+    )
+
+    assert system_blocks[0] == {"type": "text", "text": "You are BoardBot.", "cache_control": {"type": "ephemeral"}}
+    assert "cache_control" not in system_blocks[1]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    assert messages[-1]["content"] == "Which has the most RAM?\n\nAnd the lowest TDP?"
+
+
+def test_create_chat_completion_reports_real_usage(anthropic_service):
+    content, input_tokens, output_tokens = asyncio.run(
+        anthropic_service.generate_response(
+            "Find ARM boards", system_message="You are BoardBot.", cache_system_prompt=True
+        )
+    )
+
+    call = anthropic_service.client.messages.calls[0]
+    assert content == '{"message": "Hi"}'
+    assert input_tokens == 1520  # uncached remainder plus tokens read from the prompt cache
+    assert output_tokens == 7
+    assert call["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert call["messages"] == [{"role": "user", "content": "Find ARM boards"}]
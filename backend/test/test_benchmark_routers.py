@@ -0,0 +1,104 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from scripts.benchmark_routers import (
+    PRODUCT_ROUTES,
+    ServiceTape,
+    TapedChatCompletions,
+    _escalated,
+    _fallback,
+    load_samples,
+    samples_for,
+    summarize,
+)
+
+
+def test_load_samples_labels_csv_and_json_prompts(tmp_path):
+    data_dir, test_dir = tmp_path / "data", tmp_path / "test"
+    data_dir.mkdir()
+    test_dir.mkdir()
+    (data_dir / "politics.csv").write_text('prompt,route\n"Who will win?","politics"\n')
+    (data_dir / "products.csv").write_text("prompt,name\nA board,RPi\n")
+    filter_cases = [{"prompt": "Boards with wifi", "variations": ["Wifi boards"]}]
+    (test_dir / "filter_test.json").write_text(json.dumps(filter_cases))
+    (test_dir / "defensibility_test.json").write_text(
+        json.dumps([{"category": "security_sensitive", "conversation": [{"turn": 1, "query": "Hack a router"}]}])
+    )
+
+    samples = load_samples(str(data_dir), str(test_dir))
+
+    assert [(s.prompt, s.expected) for s in samples] == [
+        ("Who will win?", "politics"),
+        ("Hack a router", "do_not_respond"),
+        ("Boards with wifi", "product"),
+        ("Wifi boards", "product"),
+    ]
+    assert samples[2].accepted == PRODUCT_ROUTES
+    # politics.csv is intent classifier training data
+    held_out = samples_for("trained-router", samples)
+    assert [s.prompt for s in held_out] == ["Hack a router", "Boards with wifi", "Wifi boards"]
+    assert samples_for("hybrid-router", samples) == samples
+
+
+class RecordedCompletions:
+    async def create(self, **kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"category": "chitchat"}'))],
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+        )
+
+
+def test_tape_replays_recorded_completions(tmp_path):
+    path = str(tmp_path / "tape.jsonl")
+    request = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+    asyncio.run(TapedChatCompletions(ServiceTape(path), RecordedCompletions()).create(**request))
+
+    replay = TapedChatCompletions(ServiceTape(path))
+    response = asyncio.run(replay.create(**request))
+
+    assert response.choices[0].message.content == '{"category": "chitchat"}'
+    assert response.usage.prompt_tokens == 12
+    with pytest.raises(LookupError):
+        asyncio.run(replay.create(model="gpt-4o", messages=[]))
+
+
+def make_row(predicted, confidence, latency_ms, input_tokens, fallback, escalated=False):
+    return {
+        "expected": "chitchat",
+        "predicted": predicted,
+        "correct": predicted == "chitchat",
+        "confidence": confidence,
+        "latency_ms": latency_ms,
+        "input_tokens": input_tokens,
+        "output_tokens": input_tokens // 10,
+        "fallback": fallback,
+        "escalated": escalated,
+        "error": "",
+    }
+
+
+def test_summarize_reports_accuracy_latency_and_confusion():
+    rows = [make_row("chitchat", 90, 10.0, 100, False), make_row("politics", 40, 30.0, 300, True, escalated=True)]
+
+    summary = summarize(rows)
+
+    assert summary["accuracy"] == 0.5
+    assert summary["latency_ms"]["p50"] == 20.0
+    assert summary["tokens_per_query"] == {"input": 200.0, "output": 20.0}
+    assert summary["fallback_rate"] == summary["low_confidence_rate"] == summary["escalation_rate"] == 0.5
+    assert summary["confusion_matrix"] == {"chitchat": {"chitchat": 1, "politics": 1}}
+
+
+def test_hybrid_fallback_is_the_llm_winning_and_escalation_is_reported_apart():
+    cascade = {"model": "gpt-4o-mini", "escalated": False}
+    llm_won = {"category": "chitchat", "cascade": cascade, "speculation": {"winner": "llm"}}
+    semantic_won = {"category": "chitchat", "speculation": {"winner": "semantic"}}
+    trained_fell_back = {"category": "chitchat", "cascade": cascade, "intent_classifier": {"fallback": "small_margin"}}
+
+    assert _fallback(llm_won, 40, "hybrid-router") and not _escalated(llm_won)
+    assert not _fallback(semantic_won, 0, "hybrid-router")
+    assert _fallback({"category": "chitchat", "cascade": cascade}, 40, "hybrid-router")
+    assert _fallback(trained_fell_back, 40, "trained-router")
+    assert not _fallback({"category": "chitchat", "cascade": {**cascade, "escalated": True}}, 80, "llm-router")
+    assert _escalated({"category": "chitchat", "cascade": {**cascade, "escalated": True}})
@@ -0,0 +1,76 @@
+from scripts.benchmark_sorting import full_scan_sort, run_case
+from services.weaviate_service import SortConfig, SortOrder
+from weaviate_interface.utils.unit_parser import numeric_properties
+
+PRODUCTS = [
+    {"product_id": "a", "memory": "8GB", "processor_core_count": "4", "manufacturer": "Zeta"},
+    {"product_id": "b", "memory": "16GB", "processor_core_count": "2", "manufacturer": "Acme"},
+    {"product_id": "c", "memory": "8GB", "processor_core_count": "8", "manufacturer": "Acme"},
+    {"product_id": "d", "memory": "DDR4", "processor_core_count": "6", "manufacturer": "Beta"},
+    {"product_id": "e", "memory": "4GB", "processor_core_count": "8", "manufacturer": "Beta"},
+]
+SORT = [{"field": "memory", "order": "desc"}, {"field": "processor_core_count", "order": "desc"}]
+
+
+class FakeProductService:
+    """
+    Answers get_all from memory like Weaviate: sorts on the stored numeric shadows and returns only the
+    requested properties.
+    """
+
+    def __init__(self, products):
+        self.products = [{**product, **numeric_properties(product)} for product in products]
+        self.calls = []
+
+    def get_properties(self):
+        return ["product_id", "memory", "processor_core_count", "manufacturer"]
+
+    async def get_all(self, limit=20, offset=0, filters=None, sort=None, return_properties=None, include_vector=False):
+        self.calls.append({"limit": limit, "offset": offset, "sort": sort})
+        products = self.products
+        if sort is not None:
+            for key in reversed(sort.sorts):
+                products = sorted(
+                    products,
+                    key=lambda p: (0,) if p.get(key.prop) is None else (1, p[key.prop]),
+                    reverse=not key.ascending,
+                )
+        return_properties = return_properties or self.get_properties()
+        return [
+            {name: product.get(name) for name in return_properties + ["id"]}
+            for product in products[offset : offset + limit]
+        ]
+
+
+def test_multi_key_sorts_run_as_one_server_side_query(with_weaviate_service):
+    search_params = {"search_type": "filtered", "sort": SORT, "limit": 3}
+    product_service = FakeProductService(PRODUCTS)
+    results = with_weaviate_service(product_service, lambda service: service.search_products(search_params))
+
+    (call,) = product_service.calls
+    assert call["limit"] == 3
+    assert [(key.prop, key.ascending) for key in call["sort"].sorts] == [("memory_gb", False), ("core_count", False)]
+    assert [product["product_id"] for product in results] == ["b", "c", "a"]
+    assert results[0]["_sort_values"] == {"memory": "16GB", "processor_core_count": "2"}
+    # Only the text fields come back, as from Weaviate
+    assert "memory_gb" not in results[0]
+
+
+def test_full_scan_sort_orders_by_each_key_with_nulls_smallest():
+    sort_configs = [SortConfig("memory", SortOrder.DESC), SortConfig("manufacturer", SortOrder.ASC)]
+
+    assert [product["product_id"] for product in full_scan_sort(PRODUCTS, sort_configs)] == ["b", "c", "a", "e", "d"]
+
+
+def test_benchmark_case_matches_the_ground_truth_beyond_the_old_fetch_window(with_weaviate_service):
+    # The old path sorted the first min(limit * 2, 100) products; the best ones here come last
+    products = [
+        {"product_id": f"p{i}", "memory": f"{i}GB", "processor_core_count": str(i % 3)}
+        for i in range(1, 31)
+    ]
+    product_service = FakeProductService(products)
+    row = with_weaviate_service(product_service, lambda service: run_case(service, {}, SORT, 5, 1, 7))
+
+    assert row["exact"] and row["overlap"] == 1.0
+    assert row["matching_products"] == 30
+    assert [keys[0] for keys in row["top_keys"]] == [30.0, 29.0, 28.0, 27.0, 26.0]
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from services.utils.completion_cache import CompletionCache, MemoryCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture
+def messages():
+    return [
+        {"role": "system", "content": "Classify the query."},
+        {"role": "user", "content": "Show me ARM boards with 4GB RAM"},
+    ]
+
+
+def test_make_key_is_stable(messages):
+    params = {"temperature": 0.0, "max_tokens": 100, "top_p": 1.0}
+    key1 = CompletionCache.make_key("openai", "gpt-4o", messages, params)
+    key2 = CompletionCache.make_key("openai", "gpt-4o", list(messages), dict(reversed(params.items())))
+    assert key1 == key2
+
+    # Any change in model, messages or params produces a different key
+    assert key1 != CompletionCache.make_key("openai", "gpt-4o-mini", messages, params)
+    assert key1 != CompletionCache.make_key("openai", "gpt-4o", messages[:1], params)
+    assert key1 != CompletionCache.make_key("openai", "gpt-4o", messages, {**params, "temperature": 0.1})
+
+
+def test_memory_backend_lru_eviction():
+    backend = MemoryCacheBackend(max_entries=2, ttl_seconds=60)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"  # "a" becomes most recently used
+    backend.set("c", "3")
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.get("c") == "3"
+
+
+def test_memory_backend_ttl_expiry():
+    backend = MemoryCacheBackend(max_entries=10, ttl_seconds=0)
+    backend.set("a", "1")
+    assert backend.get("a") is None
+    assert len(backend) == 0
+
+
+def test_cache_counts_hits_and_misses():
+    cache = CompletionCache(memory_backend=MemoryCacheBackend(max_entries=10, ttl_seconds=60))
+
+    async def run():
+        assert await cache.get("key") is None
+        await cache.set("key", "value")
+        assert await cache.get("key") == "value"
+
+    asyncio.run(run())
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_promotes_into_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    disk = SQLiteCacheBackend(path, ttl_seconds=60)
+    asyncio.run(CompletionCache(disk_backend=disk).set("key", "value"))
+
+    # A fresh cache (e.g. after a restart) still finds the entry on disk
+    cache = CompletionCache(disk_backend=SQLiteCacheBackend(path, ttl_seconds=60))
+    assert asyncio.run(cache.get("key")) == "value"
+    assert cache.memory_backend.get("key") == "value"
+
+
+def test_is_cacheable_respects_temperature():
+    cache = CompletionCache(max_temperature=0.1)
+    assert cache.is_cacheable(0)
+    assert cache.is_cacheable(0.1)
+    assert not cache.is_cacheable(0.7)
+    assert not CompletionCache(enabled=False).is_cacheable(0)
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from config import Config
+from services.utils.embedding_cache import EmbeddingCache, MemmapEmbeddingStore
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, input, model):
+        self.calls.append(list(input))
+        # Returned out of order, as the API does not guarantee ordering
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)), usage=SimpleNamespace(total_tokens=len(input)))
+
+
+@pytest.fixture
+def openai_service(make_openai_service, tmp_path):
+    config = Config(EMBEDDING_BATCH_MAX_TOKENS=4, EMBEDDING_CACHE_DIR=str(tmp_path))
+    client = SimpleNamespace(embeddings=FakeEmbeddings())
+    return make_openai_service(client, config, embedding_cache=EmbeddingCache.from_config(config))
+
+
+def test_create_embeddings_batches_by_tokens_and_preserves_order(openai_service):
+    texts = ["one two", "three four", "five", "one two"]
+
+    vectors = asyncio.run(openai_service.create_embeddings(texts))
+
+    assert vectors.shape == (4, 2)
+    assert vectors.dtype == np.float32
+    # Duplicates are embedded once, and batches stay under 4 tokens
+    assert openai_service.client.embeddings.calls == [["one two", "three four"], ["five"]]
+    np.testing.assert_array_equal(vectors[0], vectors[3])
+    assert vectors[2][0] == len("five")
+
+
+def test_cached_embeddings_are_not_requested_again(openai_service):
+    asyncio.run(openai_service.create_embeddings(["board with wifi"]))
+    vector = asyncio.run(openai_service.create_embedding("board with wifi"))
+
+    assert len(openai_service.client.embeddings.calls) == 1
+    assert vector == [15.0, 0.0]
+    assert openai_service.embedding_cache.stats()["hits"] == 1
+
+
+def test_memmap_store_persists_and_grows(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path), "text-embedding-3-small", initial_capacity=2)
+    store.set_many({f"key-{i}": np.full(3, i, dtype=np.float32) for i in range(5)})
+
+    reopened = MemmapEmbeddingStore(str(tmp_path), "text-embedding-3-small")
+    found = reopened.get_many(["key-0", "key-4", "missing"])
+
+    assert len(reopened) == 5
+    assert set(found) == {"key-0", "key-4"}
+    np.testing.assert_array_equal(found["key-4"], np.full(3, 4, dtype=np.float32))
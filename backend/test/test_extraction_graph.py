@@ -0,0 +1,39 @@
+import asyncio
+from feature_extraction import AgenticFeatureExtractor, ConfigSchema
+
+EXTRACTED_FEATURES = {"name": {"value": "Board", "confidence": 0.9}, "memory": {"value": "8GB", "confidence": 0.6}}
+
+
+class RecordingWorkflow:
+    def __init__(self):
+        self.configs = []
+
+    async def ainvoke(self, state, config):
+        self.configs.append(config)
+        return {"extracted_features": EXTRACTED_FEATURES, "usage_data": {}}
+
+
+def test_extractors_share_one_compiled_workflow():
+    first = AgenticFeatureExtractor({}, None, config=ConfigSchema())
+    second = AgenticFeatureExtractor({}, None, config=ConfigSchema(model_name="gpt-4o-mini"))
+
+    assert first.workflow is second.workflow
+
+
+def test_per_request_settings_travel_through_the_runnable_config():
+    services = {"openai_service": object()}
+    extractor = AgenticFeatureExtractor(services, "prompt-manager", config=ConfigSchema(confidence_threshold=0.7))
+    extractor.workflow = RecordingWorkflow()
+
+    default = asyncio.run(extractor.extract_data("raw", "p1"))
+    relaxed = asyncio.run(extractor.extract_data("raw", "p2", config=ConfigSchema(confidence_threshold=0.5)))
+
+    first_config, second_config = extractor.workflow.configs
+    assert first_config["configurable"]["confidence_threshold"] == 0.7
+    assert second_config["configurable"]["confidence_threshold"] == 0.5
+    assert second_config["configurable"]["model_name"] == "gpt-4o"
+    assert second_config["services"] is services
+    assert default["extracted_data"]["memory"] == "Not Available"
+    assert relaxed["extracted_data"]["memory"] == "8GB"
+    # The extractor's own settings are unchanged
+    assert extractor.config["confidence_threshold"] == 0.7
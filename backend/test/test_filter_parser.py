@@ -0,0 +1,53 @@
+import pytest
+from services.utils.filter_parser import FeatureValues, QueryBuilder
+
+
+def scan_valid_values(feature_name, value):
+    # The lookup as a linear scan over the value set
+    valid_set = FeatureValues.VALUE_SETS[FeatureValues.FEATURE_TYPE_MAP[feature_name]]
+    number = float(value[2:])
+    matches = sorted(v for v in valid_set if (v >= number if value.startswith(">=") else v <= number))
+    return FeatureValues._format_numeric_values(matches)
+
+
+@pytest.mark.parametrize(
+    "feature_name, value",
+    [
+        ("onboard_storage", ">=32"),
+        ("onboard_storage", "<=0.5"),
+        ("memory", ">=0.3"),
+        ("memory", ">=2048"),
+        ("operating_temperature_min", "<=-20"),
+        ("processor_tdp", "<=19.5"),
+        ("input_voltage", ">=0"),
+    ],
+)
+def test_bisect_lookups_match_a_scan(feature_name, value):
+    assert FeatureValues.get_valid_values(feature_name, value) == scan_valid_values(feature_name, value)
+
+
+def test_built_filters_are_cached_by_canonical_filter_dict():
+    query_builder = QueryBuilder(cache_size=2)
+
+    first = query_builder.build_weaviate_filter({"form_factor": "SBC", "wireless": ["wi-fi", "bluetooth"]})
+    reordered = query_builder.build_weaviate_filter({"wireless": ["bluetooth", "wi-fi"], "form_factor": "SBC"})
+    storage = query_builder.build_weaviate_filter({"onboard_storage": ">=64GB"})
+
+    assert reordered is first
+    assert (query_builder.cache_hits, query_builder.cache_misses) == (1, 2)
+    assert storage.value[:2] == ["64GB", "64.0GB"]
+
+
+def test_filter_cache_evicts_least_recently_used():
+    query_builder = QueryBuilder(cache_size=2)
+
+    sbc = query_builder.build_weaviate_filter({"form_factor": "SBC"})
+    query_builder.build_weaviate_filter({"form_factor": "COM EXPRESS"})
+    assert query_builder.build_weaviate_filter({"form_factor": "SBC"}) is sbc
+    query_builder.build_weaviate_filter({"form_factor": "SMARC"})
+
+    # COM EXPRESS was least recently used, so SMARC evicted it
+    assert query_builder.build_weaviate_filter({"form_factor": "SBC"}) is sbc
+    assert query_builder.cache_misses == 3
+    query_builder.build_weaviate_filter({"form_factor": "COM EXPRESS"})
+    assert query_builder.cache_misses == 4
@@ -0,0 +1,153 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+import pytest
+from config import Config
+from core.models.message import Message
+from generators.hybrid_router import HybridRouter
+from prompts.prompt_manager import PromptManager
+
+
+class SlowCompletions:
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+
+    async def create(self, **kwargs):
+        self.started += 1
+        await asyncio.sleep(0.1)
+        self.finished += 1
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(
+                        content='{"category": "vague_intent_product", "justification": "test", "confidence": 90}'
+                    )
+                )
+            ],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+        )
+
+
+class SlowRouteIndex:
+    def __init__(self, certainty, delay=0.05):
+        self.certainty = certainty
+        self.delay = delay
+
+    async def search_routes(self, query):
+        await asyncio.sleep(self.delay)
+        return [("chitchat", self.certainty)]
+
+
+@pytest.fixture
+def make_router(make_openai_service):
+    def make(certainty, search_delay=0.05):
+        config = Config(CLASSIFICATION_CASCADE_ENABLED=False, HYBRID_ROUTER_SPECULATIVE=True)
+        service = make_openai_service(SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions())), config)
+        route_index = SlowRouteIndex(certainty, search_delay)
+        return HybridRouter(None, service, None, None, None, PromptManager(), route_index=route_index)
+
+    return make
+
+
+@pytest.fixture
+def message():
+    return Message(
+        id="1",
+        message="Tell me about single board computers",
+        timestamp=datetime.datetime.now(),
+        session_id="s",
+        model="gpt-4o",
+        architecture_choice="hybrid-router",
+        history_management_choice="keep-none",
+    )
+
+
+def test_confident_semantic_route_cancels_llm(make_router, message):
+    router = make_router(certainty=0.9)
+
+    classification, input_tokens, _, time_taken = asyncio.run(router.determine_route(message, []))
+
+    assert classification["category"] == "chitchat"
+    assert classification["speculation"]["winner"] == "semantic"
+    assert router.openai_service.client.chat.completions.started == 1
+    assert router.openai_service.client.chat.completions.finished == 0
+    assert classification["speculation"]["cancelled_llm_calls"] == 1
+    assert input_tokens == 0
+    assert time_taken < 0.1
+
+
+def test_llm_runs_concurrently_with_semantic_search(make_router, message):
+    router = make_router(certainty=0.5)
+
+    classification, input_tokens, _, time_taken = asyncio.run(router.determine_route(message, []))
+
+    assert classification["category"] == "vague_intent_product"
+    assert classification["speculation"]["winner"] == "llm"
+    assert classification["speculation"]["llm_win_rate"] == 1
+    assert classification["speculation"]["latency_saved"] > 0.03
+    assert input_tokens == 100
+    # Sequential routing would take at least 0.15s
+    assert time_taken < 0.14
+
+
+def test_llm_answer_discarded_for_a_slower_semantic_route_is_counted(make_router, message):
+    router = make_router(certainty=0.9, search_delay=0.15)
+
+    classification, input_tokens, _, _ = asyncio.run(router.determine_route(message, []))
+
+    assert classification["speculation"]["winner"] == "semantic"
+    assert classification["speculation"]["cancelled_llm_calls"] == 0
+    assert router.speculation_stats["discarded_input_tokens"] == 100
+    assert router.speculation_stats["discarded_output_tokens"] == 20
+    assert input_tokens == 0
+
+
+def test_semantic_search_runs_before_the_llm_by_default(make_router, message):
+    router = make_router(certainty=0.9)
+    router.openai_service.config = Config(CLASSIFICATION_CASCADE_ENABLED=False)
+
+    classification, _, _, _ = asyncio.run(router.determine_route(message, []))
+
+    assert classification["category"] == "chitchat"
+    assert "speculation" not in classification
+    assert router.openai_service.client.chat.completions.started == 0
+
+
+def test_cancelling_the_caller_during_the_route_search_cancels_the_llm_call(make_router, message):
+    router = make_router(certainty=0.9, search_delay=0.05)
+
+    async def disconnect_during_search():
+        routing = asyncio.ensure_future(router.determine_route(message, []))
+        await asyncio.sleep(0.02)
+        routing.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await routing
+        await asyncio.sleep(0.15)
+
+    asyncio.run(disconnect_during_search())
+
+    assert router.openai_service.client.chat.completions.started == 1
+    assert router.openai_service.client.chat.completions.finished == 0
+
+
+def test_the_callers_cancellation_is_not_swallowed_with_the_speculative_calls(make_router, message):
+    router = make_router(certainty=0.9, search_delay=0.05)
+
+    async def classify_with_slow_cleanup(message, chat_history):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.05)
+            raise
+
+    router.classify_with_llm = classify_with_slow_cleanup
+
+    async def disconnect_while_the_llm_call_winds_down():
+        routing = asyncio.ensure_future(router.determine_route(message, []))
+        await asyncio.sleep(0.07)
+        routing.cancel()
+        await asyncio.wait([routing])
+        return routing
+
+    assert asyncio.run(disconnect_while_the_llm_call_winds_down()).cancelled()
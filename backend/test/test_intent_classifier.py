@@ -0,0 +1,146 @@
+import asyncio
+import datetime
+import os
+from types import SimpleNamespace
+import pytest
+from config import Config
+from core.models.message import Message
+from generators.trained_router import TrainedRouter
+from services.intent_classifier import IntentClassifier
+
+TEXTS = [
+    "Hello there",
+    "How are you today",
+    "Tell me a joke",
+    "Who should I vote for",
+    "What do you think of the election",
+    "Is the government doing a good job",
+    "Find boards with 8GB RAM and wifi",
+    "List 5 boards with an ARM processor",
+    "Which boards support 4GB RAM",
+]
+LABELS = ["chitchat"] * 3 + ["politics"] * 3 + ["clear_intent_product"] * 3
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "intent_classifier.npz")
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier.fit(TEXTS, LABELS, folds=3)
+
+
+def test_classifier_predicts_calibrated_routes(classifier):
+    route, probability = classifier.predict("Which boards have 8GB RAM?")
+    probabilities = classifier.predict_proba("Which boards have 8GB RAM?")
+
+    assert route == "clear_intent_product"
+    assert probabilities[route] == probability
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert classifier.predict("Hello, how are you?")[0] == "chitchat"
+
+
+def test_unknown_words_fall_back_to_the_prior(classifier):
+    probabilities = classifier.predict_proba("zzz qqq")
+
+    assert max(probabilities.values()) < 0.5
+
+
+def test_save_and_load_round_trip(classifier, tmp_path):
+    path = str(tmp_path / "intent_classifier.npz")
+    classifier.save(path)
+    loaded = IntentClassifier.load(path)
+
+    assert loaded.labels == classifier.labels
+    assert loaded.temperature == classifier.temperature
+    for text in TEXTS:
+        assert loaded.predict_proba(text) == pytest.approx(classifier.predict_proba(text), abs=1e-6)
+
+
+class FakeLLMRouter(TrainedRouter):
+    """A trained router whose LLM fallback answers chitchat without a network call."""
+
+    def __init__(self, intent_classifier, **config):
+        super().__init__(
+            None, SimpleNamespace(config=Config(**config)), None, None, None, None, intent_classifier=intent_classifier
+        )
+        self.llm_messages = []
+
+    async def classify_with_llm(self, message, chat_history):
+        self.llm_messages.append(message.message)
+        return {"category": "chitchat", "confidence": 90, "justification": "LLM"}, 40, 8
+
+
+def route(router, text):
+    message = Message(
+        id="1",
+        message=text,
+        timestamp=datetime.datetime.now(),
+        session_id="s",
+        model="gpt-4o",
+        architecture_choice="trained-router",
+        history_management_choice="keep-none",
+    )
+    return asyncio.run(router.determine_route(message, []))
+
+
+@pytest.fixture(scope="module")
+def committed_classifier():
+    return IntentClassifier.load(MODEL_PATH)
+
+
+def test_trained_router_classifies_without_tokens(committed_classifier):
+    router = FakeLLMRouter(committed_classifier)
+
+    classification, input_tokens, output_tokens, _ = route(router, "Who should I vote for in the election?")
+
+    assert classification["category"] == "politics"
+    assert 0 < classification["confidence"] <= 100
+    assert input_tokens == output_tokens == 0
+    assert router.llm_messages == []
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("hi!", "chitchat"),
+        ("thanks so much", "chitchat"),
+        ("good evening everyone", "chitchat"),
+        ("I need a board for a robot arm", "vague_intent_product"),
+    ],
+)
+def test_committed_model_routes_short_greetings_and_needs(committed_classifier, text, expected):
+    # Messages like these went to politics with over 50% probability before the training data covered them
+    router = FakeLLMRouter(committed_classifier)
+
+    classification, input_tokens, _, _ = route(router, text)
+
+    assert classification["category"] == expected and input_tokens == 0
+
+
+def test_low_evidence_messages_stay_local_with_their_calibrated_confidence(committed_classifier):
+    router = FakeLLMRouter(committed_classifier)
+
+    classification, input_tokens, _, _ = route(router, "qwerty asdf")
+
+    assert classification["confidence"] < 50  # handle_route asks for clarification
+    assert classification["intent_classifier"]["low_evidence"] == "unknown_words"
+    assert classification["intent_classifier"]["fallback"] is None
+    assert input_tokens == 0 and router.llm_messages == []
+
+
+def test_llm_fallback_for_low_evidence_messages_is_opt_in(committed_classifier):
+    router = FakeLLMRouter(committed_classifier, INTENT_CLASSIFIER_LLM_FALLBACK=True)
+
+    classification, input_tokens, _, _ = route(router, "qwerty asdf")
+
+    assert router.llm_messages == ["qwerty asdf"] and input_tokens == 40
+    assert classification["intent_classifier"]["fallback"] == "unknown_words"
+    assert classification["intent_classifier"]["fallback_rate"] == 1.0
+
+
+def test_committed_model_keeps_clear_messages_local(committed_classifier):
+    router = FakeLLMRouter(committed_classifier)
+
+    for text, expected in (("Who will win the election?", "politics"), ("hello", "chitchat")):
+        classification, input_tokens, _, _ = route(router, text)
+        assert classification["category"] == expected and input_tokens == 0
+    assert router.llm_messages == []
@@ -0,0 +1,82 @@
+import asyncio
+
+
+class FakeProductService:
+    def __init__(self, total=10, sbc=4, delay=0.0):
+        self.counts = {None: total, "SBC": sbc}
+        self.delay = delay
+        self.count_calls = []
+
+    async def get_all(self, limit=20, offset=0, filters=None, sort=None, return_properties=None, include_vector=False):
+        return [{"product_id": f"p{offset + i}"} for i in range(limit)]
+
+    async def count(self, filters=None):
+        form_factor = filters.value if filters is not None else None
+        self.count_calls.append(form_factor)
+        count = self.counts[form_factor]
+        await asyncio.sleep(self.delay)
+        return count
+
+    async def create(self, data):
+        self.counts[None] += 1
+        self.counts[data["form_factor"]] += 1
+        return "new-id"
+
+    async def delete(self, uuid):
+        self.counts[None] -= 1
+
+
+def test_paging_reuses_the_count_and_filtered_listings_count_their_filter(with_weaviate_service):
+    product_service = FakeProductService()
+
+    async def page_through(service):
+        totals = [(await service.get_products(2, offset))[1] for offset in (0, 2, 4)]
+        totals.append((await service.get_products(2, 0, {"form_factor": "SBC"}))[1])
+        totals.append((await service.get_products(2, 2, {"form_factor": "SBC"}))[1])
+        return totals
+
+    assert with_weaviate_service(product_service, page_through) == [10, 10, 10, 4, 4]
+    assert product_service.count_calls == [None, "SBC"]
+
+
+def test_writes_invalidate_cached_counts(with_weaviate_service):
+    product_service = FakeProductService()
+
+    async def write_between_pages(service):
+        totals = [(await service.get_products(2, 0))[1]]
+        await service.add_product({"form_factor": "SBC"})
+        totals += [(await service.get_products(2, 0))[1], (await service.get_products(2, 0, {"form_factor": "SBC"}))[1]]
+        await service.delete_product("new-id")
+        totals.append((await service.get_products(2, 0))[1])
+        return totals, service.catalog_version
+
+    totals, catalog_version = with_weaviate_service(product_service, write_between_pages)
+
+    assert totals == [10, 11, 5, 10]
+    assert catalog_version == 2
+
+
+def test_a_count_started_before_a_write_is_not_cached(with_weaviate_service):
+    product_service = FakeProductService(delay=0.02)
+
+    async def write_during_count(service):
+        pending = asyncio.ensure_future(service.count_products())
+        await asyncio.sleep(0.01)
+        await service.add_product({"form_factor": "SBC"})
+        stale = await pending
+        return stale, await service.count_products(), await service.count_products()
+
+    assert with_weaviate_service(product_service, write_during_count) == (10, 11, 11)
+    assert product_service.count_calls == [None, None]
+
+
+def test_concurrent_count_misses_share_one_aggregate(with_weaviate_service):
+    product_service = FakeProductService(delay=0.02)
+
+    async def open_pages_at_once(service):
+        return await asyncio.gather(*(service.get_products(2, offset) for offset in (0, 2, 4)))
+
+    pages = with_weaviate_service(product_service, open_pages_at_once)
+
+    assert [total for _, total in pages] == [10, 10, 10]
+    assert product_service.count_calls == [None]
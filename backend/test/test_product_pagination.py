@@ -0,0 +1,62 @@
+import uuid
+import pytest
+from services.weaviate_service import decode_cursor, encode_cursor
+
+PRODUCT_IDS = sorted(str(uuid.uuid4()) for _ in range(7))
+
+
+class FakeProductService:
+    """Pages through products in uuid order the way Weaviate's cursor does, recording what each page scanned."""
+
+    def __init__(self, product_ids=PRODUCT_IDS):
+        self.product_ids = product_ids
+        self.pages = []
+
+    async def get_all(
+        self, limit=20, offset=0, filters=None, sort=None, return_properties=None, include_vector=False, after=None
+    ):
+        start = self.product_ids.index(after) + 1 if after else offset
+        self.pages.append({"after": after, "offset": offset})
+        return [{"id": product_id} for product_id in self.product_ids[start : start + limit]]
+
+    async def count(self, filters=None):
+        return len(self.product_ids)
+
+
+async def iterate(service, page_size=3):
+    pages, cursor, totals = [], None, set()
+    while True:
+        products, total, cursor = await service.get_products_after(page_size, cursor)
+        pages.append([product["id"] for product in products])
+        totals.add(total)
+        if cursor is None:
+            return pages, totals
+
+
+def test_cursors_are_opaque_and_round_trip():
+    product_id = PRODUCT_IDS[0]
+    cursor = encode_cursor(product_id)
+
+    assert product_id not in cursor and decode_cursor(cursor) == product_id
+    for invalid in ("not-a-cursor", "", encode_cursor(product_id)[:-2]):
+        with pytest.raises(ValueError):
+            decode_cursor(invalid)
+
+
+def test_cursor_pages_cover_the_catalog_once(with_weaviate_service):
+    product_service = FakeProductService()
+
+    pages, totals = with_weaviate_service(product_service, iterate)
+
+    assert pages == [PRODUCT_IDS[0:3], PRODUCT_IDS[3:6], PRODUCT_IDS[6:]] and totals == {7}
+    # Every page continues after the previous page's last product instead of skipping an offset
+    assert [page["after"] for page in product_service.pages] == [None, PRODUCT_IDS[2], PRODUCT_IDS[5]]
+    assert {page["offset"] for page in product_service.pages} == {0}
+
+
+def test_a_catalog_filling_its_last_page_gets_no_cursor_to_an_empty_page(with_weaviate_service):
+    product_service = FakeProductService(PRODUCT_IDS[:6])
+
+    pages, _ = with_weaviate_service(product_service, iterate)
+
+    assert pages == [PRODUCT_IDS[0:3], PRODUCT_IDS[3:6]]
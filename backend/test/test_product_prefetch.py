@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+import time
+from types import SimpleNamespace
+import pytest
+from config import Config
+from core.models.message import Message
+from generators.base_router import BaseRouter
+from generators.utils.product_prefetch import ProductPrefetch
+from generators.vague_intent_agent import VagueIntentAgent
+
+PRODUCTS = [{"product_id": f"p{i}", "name": f"Board {i}", "certainty": 0.9} for i in range(3)]
+
+
+class SlowWeaviateService:
+    def __init__(self):
+        self.searches = []
+        self.completed = 0
+
+    async def search_products(self, search_params):
+        self.searches.append(search_params)
+        await asyncio.sleep(0.05)
+        self.completed += 1
+        return [dict(product) for product in PRODUCTS]
+
+
+class FixedRouteRouter(BaseRouter):
+    def __init__(self, route, weaviate_service, vague_intent_agent=None, prefetch=True):
+        session_manager = SimpleNamespace(get_formatted_chat_history=lambda *args: [])
+        openai_service = SimpleNamespace(config=Config(PRODUCT_SEARCH_PREFETCH=prefetch, PRODUCT_RERANKER="vector"))
+        super().__init__(session_manager, openai_service, weaviate_service, None, vague_intent_agent, None)
+        self.route = route
+
+    async def determine_route(self, message, chat_history):
+        await asyncio.sleep(0.05)
+        return {"category": self.route, "confidence": 90, "justification": "test"}, 0, 0, 0.05
+
+
+class PrefetchOnlyAgent:
+    async def run(self, message, chat_history, stream_callback=None, prefetch=None):
+        search_results = (await prefetch.results())[:2]
+        return {
+            "output": {"message": "Here you go", "products": [{"product_id": "p0"}]},
+            "filters": {},
+            "search_results": search_results,
+            "input_tokens": {},
+            "output_tokens": {},
+            "time_taken": {},
+        }
+
+
+@pytest.fixture
+def message():
+    return Message(
+        id="1",
+        message="I need a board for robotics",
+        timestamp=datetime.datetime.now(),
+        session_id="s",
+        model="gpt-4o",
+        architecture_choice="llm-router",
+        history_management_choice="keep-none",
+    )
+
+
+def test_prefetch_overlaps_classification_for_product_routes(message):
+    weaviate_service = SlowWeaviateService()
+    router = FixedRouteRouter("vague_intent_product", weaviate_service, PrefetchOnlyAgent())
+
+    start_time = time.time()
+    response = asyncio.run(router.run(message))
+
+    # Classification and search each take 0.05s
+    assert time.time() - start_time < 0.09
+    assert weaviate_service.searches == [
+        {"query": message.message, "limit": 10, "search_type": "semantic", "include_vector": True}
+    ]
+    assert response["metadata"]["prefetch"]["hits"] == 2
+    assert response["products"] == [PRODUCTS[0]]
+
+
+def test_prefetch_is_cancelled_for_other_routes(message):
+    weaviate_service = SlowWeaviateService()
+    router = FixedRouteRouter("do_not_respond", weaviate_service)
+
+    response = asyncio.run(router.run(message))
+
+    assert response["type"] == "do_not_respond"
+    assert len(weaviate_service.searches) == 1
+    assert weaviate_service.completed == 0
+
+
+def test_prefetch_is_opt_in(message):
+    weaviate_service = SlowWeaviateService()
+    router = FixedRouteRouter("do_not_respond", weaviate_service, prefetch=Config().PRODUCT_SEARCH_PREFETCH)
+
+    asyncio.run(router.run(message))
+
+    assert weaviate_service.searches == []
+
+
+def test_vague_intent_search_uses_prefetched_candidates(with_weaviate_service):
+    async def search(weaviate_service):
+        agent = VagueIntentAgent(weaviate_service, None, None, None)
+        prefetch = ProductPrefetch(SlowWeaviateService(), "robotics board", 10)
+        state = {"product_count": 3, "filters": {}, "semantic_search_query": "robotics board"}
+        result = await agent.product_search_node(state, {"configurable": {"prefetch": prefetch}})
+        return result, weaviate_service.single_flight.stats()
+
+    result, search_stats = with_weaviate_service(None, search, SlowWeaviateService().search_products)
+
+    assert [product["product_id"] for product in result["search_results"]] == ["p0", "p1", "p2"]
+    assert search_stats["calls"] == 0
@@ -0,0 +1,61 @@
+import json
+import pytest
+from services.utils.product_serializer import ProductSerializer
+
+
+@pytest.fixture
+def serializer(token_planner):
+    return ProductSerializer(token_planner, summary_tokens=64)
+
+
+def make_products(count, summary_words=200):
+    return [
+        {
+            "product_id": str(i),
+            "name": f"Board {i}",
+            "memory": "8 GB",
+            "wireless": None,
+            "certainty": 0.9,
+            "full_product_description": " ".join(["word"] * summary_words),
+        }
+        for i in range(count)
+    ]
+
+
+def test_render_profiles_are_compact_and_drop_null_fields(serializer):
+    product = make_products(1, summary_words=100)
+
+    summary = serializer.render(product, "summary", attributes=["memory", "wireless"])
+    filtered = serializer.render(product, "filtered", attributes=["memory", "wireless"])
+    minimal = serializer.render(product, "minimal", attributes=["memory", "wireless"])
+
+    assert summary[0]["summary"] == " ".join(["word"] * 64) + "..."
+    assert "wireless" not in summary[0]
+    assert filtered == [{"product_id": "0", "name": "Board 0", "memory": "8 GB"}]
+    assert minimal == [{"product_id": "0", "name": "Board 0"}]
+
+
+def test_fit_returns_the_richest_rendering_within_budget(serializer):
+    products = make_products(3)
+
+    full = serializer.fit(products, 1000, attributes=["memory"])
+    shorter = serializer.fit(products, 150, attributes=["memory"])
+    filtered = serializer.fit(products, 10, attributes=["memory"])
+
+    assert (full.profile, full.summary_tokens) == ("summary", 64)
+    assert (shorter.profile, shorter.summary_tokens) == ("summary", 32)
+    assert shorter.tokens <= 150
+    assert filtered.profile == "filtered"
+    assert json.loads(filtered.payload)[0] == {"product_id": "0", "name": "Board 0", "memory": "8 GB"}
+    assert "\n" not in full.payload
+
+
+def test_fit_drops_lowest_ranked_products_as_a_last_resort(serializer):
+    products = make_products(5)
+
+    context = serializer.fit(products, 3)
+
+    assert context.profile == "minimal"
+    assert context.tokens <= 3
+    assert context.dropped == 5 - context.products
+    assert [item["product_id"] for item in json.loads(context.payload)] == [str(i) for i in range(context.products)]
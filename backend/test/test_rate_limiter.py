@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services.utils.rate_limiter import AdaptiveRateLimiter, RateLimitPriority, call_with_rate_limit, get_retry_after
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+def test_acquire_consumes_request_and_token_buckets():
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+
+    waited = asyncio.run(limiter.acquire(400))
+
+    assert waited < 0.1
+    assert limiter._available_tokens == pytest.approx(600, abs=5)
+    assert limiter.stats()["lanes"]["interactive"]["acquired"] == 1
+
+
+def test_interactive_requests_are_served_before_batch():
+    # One request per second, so every queued caller has to wait its turn
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=100000)
+    limiter._available_requests = 0
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire(10, priority)
+        order.append(name)
+
+    async def run():
+        batch = [asyncio.create_task(call(f"batch-{i}", RateLimitPriority.BATCH)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", RateLimitPriority.INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(run())
+    assert order[0] == "interactive"
+
+
+def test_rate_limit_error_backs_off_and_retries():
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=100000)
+    attempts = []
+
+    async def flaky_call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FakeRateLimitError(retry_after=0.1)
+        return "ok"
+
+    result = asyncio.run(
+        call_with_rate_limit(limiter, flaky_call, 10, "interactive", rate_limit_errors=(FakeRateLimitError,))
+    )
+
+    assert result == "ok"
+    assert len(attempts) == 2
+    assert limiter.rate_limited_count == 1
+    # Halved on the 429, then partially recovered by the successful retry
+    assert limiter.rate_factor == pytest.approx(0.55)
+
+
+def test_get_retry_after_reads_headers():
+    assert get_retry_after(FakeRateLimitError(retry_after=3)) == 3.0
+    error = Exception()
+    error.response = SimpleNamespace(headers={"retry-after-ms": "250"})
+    assert get_retry_after(error) == 0.25
+    assert get_retry_after(Exception()) is None
@@ -0,0 +1,76 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+import pytest
+from core.models.message import Message
+from generators.llm_router import LLMRouter
+from prompts.prompt_manager import PromptManager
+
+
+class ModelCompletions:
+    """Replies per model, so the cascade and escalation calls can disagree."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.models = []
+
+    async def create(self, **kwargs):
+        self.models.append(kwargs["model"])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.replies[kwargs["model"]]))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+        )
+
+
+@pytest.fixture
+def make_router(make_openai_service):
+    def make(replies):
+        service = make_openai_service(SimpleNamespace(chat=SimpleNamespace(completions=ModelCompletions(replies))))
+        return LLMRouter(None, service, None, None, None, PromptManager())
+
+    return make
+
+
+def classification_json(category, confidence):
+    return f'{{"category": "{category}", "justification": "test", "confidence": {confidence}}}'
+
+
+@pytest.fixture
+def message():
+    return Message(
+        id="1",
+        message="Find a board with an Intel processor and 8GB RAM",
+        timestamp=datetime.datetime.now(),
+        session_id="s",
+        model="gpt-4o",
+        architecture_choice="llm-router",
+        history_management_choice="keep-none",
+    )
+
+
+def test_confident_small_model_is_not_escalated(make_router, message):
+    router = make_router({"gpt-4o-mini": classification_json("clear_intent_product", 92)})
+
+    classification, input_tokens, _, _ = asyncio.run(router.determine_route(message, []))
+
+    assert router.openai_service.client.chat.completions.models == ["gpt-4o-mini"]
+    assert classification["category"] == "clear_intent_product"
+    assert classification["cascade"]["escalated"] is False
+    assert classification["cascade"]["escalation_rate"] == 0
+    assert input_tokens == 100
+
+
+@pytest.mark.parametrize(
+    "small_reply, reason",
+    [(classification_json("vague_intent_product", 55), "low_confidence"), ("not json", "invalid_output")],
+)
+def test_low_confidence_or_invalid_output_escalates(make_router, message, small_reply, reason):
+    router = make_router({"gpt-4o-mini": small_reply, "gpt-4o": classification_json("clear_intent_product", 90)})
+
+    classification, input_tokens, _, _ = asyncio.run(router.determine_route(message, []))
+
+    assert router.openai_service.client.chat.completions.models == ["gpt-4o-mini", "gpt-4o"]
+    assert classification["category"] == "clear_intent_product"
+    assert classification["cascade"]["escalation_reason"] == reason
+    assert classification["cascade"]["escalation_rate"] == 1
+    assert input_tokens == (200 if reason == "low_confidence" else 100)
@@ -0,0 +1,142 @@
+import asyncio
+import time
+import pytest
+from services.weaviate_service import WeaviateService
+
+FILTERS = {"wireless": "WI-FI 6", "form_factor": "SBC", "memory": "8GB"}
+
+
+class FakeSearch:
+    """Returns products named after the filters searched, after a delay."""
+
+    def __init__(self, delay=0.05, single_filter_delay=None, products_per_search=2, fail_on=None):
+        self.delay = delay
+        self.single_filter_delay = single_filter_delay
+        self.products_per_search = products_per_search
+        self.fail_on = fail_on
+        self.searches = []
+        self.completed = 0
+
+    async def __call__(self, search_params):
+        self.searches.append(search_params)
+        filters = search_params.get("filters") or {}
+        if len(filters) == 1 and self.single_filter_delay is not None:
+            await asyncio.sleep(self.single_filter_delay)
+        else:
+            await asyncio.sleep(self.delay)
+        if self.fail_on is not None and set(filters) == self.fail_on:
+            raise RuntimeError("weaviate unavailable")
+        self.completed += 1
+        name = "+".join(sorted(filters)) or search_params["query"]
+        return [{"product_id": f"{name}-{i}"} for i in range(self.products_per_search)]
+
+
+@pytest.fixture
+def search_with_relaxation(with_weaviate_service):
+    def run(search, *args, **kwargs):
+        return with_weaviate_service(None, lambda service: service.search_with_relaxation(*args, **kwargs), search)
+
+    return run
+
+
+def test_relaxation_levels_keep_the_most_important_filters_longest():
+    levels = WeaviateService._relaxation_levels(FILTERS, limit=5)
+
+    assert [query["filters"] for query in levels[0]] == [FILTERS]
+    assert levels[0][0]["limit"] == 10
+    assert [query["filters"] for query in levels[1]] == [
+        {"form_factor": "SBC", "memory": "8GB"},
+        {"form_factor": "SBC"},
+        {"memory": "8GB"},
+        {"wireless": "WI-FI 6"},
+    ]
+
+
+def test_relaxed_searches_run_concurrently_and_merge_in_order(search_with_relaxation):
+    search = FakeSearch(products_per_search=1)
+
+    start_time = time.time()
+    results = search_with_relaxation(search, FILTERS, limit=6, semantic_query="fast wifi board")
+
+    # Three round trips (all filters, relaxed filters, semantic) rather than one per query
+    assert time.time() - start_time < 0.25
+    assert [result["product_id"] for result in results] == [
+        "form_factor+memory+wireless-0",
+        "form_factor+memory-0",
+        "form_factor-0",
+        "memory-0",
+        "wireless-0",
+        "fast wifi board-0",
+    ]
+    assert search.searches[-1]["search_type"] == "semantic"
+
+
+def test_outstanding_searches_are_cancelled_once_limit_is_reached(search_with_relaxation):
+    search = FakeSearch(products_per_search=2, single_filter_delay=1.0)
+
+    start_time = time.time()
+    results = search_with_relaxation(search, FILTERS, limit=3)
+
+    assert len(results) == 3
+    assert time.time() - start_time < 0.5
+    assert len(search.searches) == 5
+    # The first relaxed search completes the set; the single-filter searches are cancelled
+    assert search.completed == 2
+
+
+def test_failed_searches_are_skipped(search_with_relaxation):
+    search = FakeSearch(products_per_search=1, fail_on=set(FILTERS))
+
+    results = search_with_relaxation(search, FILTERS, limit=2)
+
+    assert [result["product_id"] for result in results] == ["form_factor+memory-0", "form_factor-0"]
+
+
+def test_raises_when_every_search_fails(search_with_relaxation):
+    async def failing_search(search_params):
+        raise RuntimeError("weaviate unavailable")
+
+    with pytest.raises(RuntimeError):
+        search_with_relaxation(failing_search, {"memory": "8GB"}, limit=2)
+
+
+def test_fusion_ranks_products_found_by_several_searches_first():
+    hybrid = [{"product_id": "a"}, {"product_id": "b"}, {"product_id": "c"}]
+    semantic = [{"product_id": "c"}, {"product_id": "d"}]
+    keyword = [{"product_id": "c"}, {"product_id": "b"}]
+
+    fused = WeaviateService.fuse_results([hybrid, semantic, keyword])
+
+    assert [product["product_id"] for product in fused] == ["c", "b", "a", "d"]
+    assert fused[0]["_search_metadata"]["fused_score"] == pytest.approx(1 / 63 + 1 / 61 + 1 / 61)
+    assert [source["rank"] for source in fused[0]["_search_metadata"]["fusion_sources"]] == [3, 1, 1]
+    assert "_search_metadata" not in hybrid[0]
+
+
+def test_fusion_weights_and_normalized_scores():
+    hybrid = [{"product_id": "a", "score": 0.9}, {"product_id": "b", "score": 0.85}, {"product_id": "c", "score": 0.1}]
+    semantic = [{"product_id": "b", "certainty": 0.8}, {"product_id": "a", "certainty": 0.1}]
+
+    # By rank alone a and b tie, and ties keep the order products were first seen in
+    assert [p["product_id"] for p in WeaviateService.fuse_results([hybrid, semantic])] == ["a", "b", "c"]
+    fused = WeaviateService.fuse_results([hybrid, semantic], weights=[1.0, 0.5], normalize_scores=True)
+    # b is a close second in the hybrid list but a clear winner in the semantic one
+    assert [product["product_id"] for product in fused] == ["b", "a", "c"]
+    assert fused[0]["_search_metadata"]["fused_score"] == pytest.approx(0.75 / 0.8 + 0.5)
+
+
+def test_relaxed_results_are_ordered_by_fused_rank(search_with_relaxation):
+    async def search(search_params):
+        filters = search_params.get("filters") or {}
+        if len(filters) == 3:
+            return [{"product_id": "strict"}]
+        if len(filters) == 2:
+            return [{"product_id": "only-once"}, {"product_id": "common"}]
+        if filters == {"form_factor": "SBC"}:
+            return [{"product_id": "common"}]
+        return []
+
+    results = search_with_relaxation(search, FILTERS, limit=5)
+
+    assert [result["product_id"] for result in results] == ["strict", "common", "only-once"]
+    assert all("fused_score" in result["_search_metadata"] for result in results)
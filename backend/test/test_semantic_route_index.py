@@ -0,0 +1,59 @@
+import asyncio
+import numpy as np
+import pytest
+from services.semantic_route_index import SemanticRouteIndex
+
+VOCABULARY = ["election", "hello", "board", "ram"]
+
+
+class BagOfWordsEmbeddings:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def create_embeddings(self, texts):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("embedding API unavailable")
+        return np.array(
+            [[float(word in text.lower()) for word in VOCABULARY] for text in texts], dtype=np.float32
+        )
+
+
+class FakeWeaviateService:
+    def __init__(self):
+        self.queries = []
+
+    async def search_routes(self, query):
+        self.queries.append(query)
+        return [("chitchat", 0.9)]
+
+
+ROUTES = {
+    "politics": ["Questions about an election"],
+    "chitchat": ["Hello and greetings"],
+    "clear_intent_product": ["A board with 8GB RAM", "Board with specific RAM"],
+}
+
+
+def test_search_routes_ranks_locally_with_weaviate_certainty():
+    weaviate_service = FakeWeaviateService()
+    index = SemanticRouteIndex(BagOfWordsEmbeddings(), weaviate_service, routes=ROUTES)
+    asyncio.run(index.initialize())
+
+    routes = asyncio.run(index.search_routes("Which board has the most RAM?", limit=2))
+
+    assert routes[0] == ("clear_intent_product", pytest.approx(1.0))
+    # Orthogonal vectors map to certainty 0.5, as in Weaviate
+    assert routes[1][1] == pytest.approx(0.5)
+    assert weaviate_service.queries == []
+
+
+def test_falls_back_to_weaviate_when_index_unavailable():
+    weaviate_service = FakeWeaviateService()
+    index = SemanticRouteIndex(BagOfWordsEmbeddings(fail=True), weaviate_service, routes=ROUTES)
+    asyncio.run(index.initialize())
+
+    assert not index.is_ready
+    assert asyncio.run(index.search_routes("hi there")) == [("chitchat", 0.9)]
+    assert weaviate_service.queries == ["hi there"]
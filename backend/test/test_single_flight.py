@@ -0,0 +1,123 @@
+import asyncio
+import copy
+from types import SimpleNamespace
+import pytest
+from services.utils.single_flight import SingleFlight
+
+
+class SlowCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2),
+        )
+
+
+@pytest.fixture
+def openai_service(make_openai_service):
+    return make_openai_service(SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions())))
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    executions = []
+
+    async def fetch():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return {"products": [1, 2]}
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", fetch, copy_result=dict) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert len(executions) == 1
+    assert all(result == {"products": [1, 2]} for result in results)
+    assert results[0] is not results[1]
+    assert single_flight.stats() == {"calls": 3, "collapsed": 2, "collapse_rate": pytest.approx(2 / 3), "in_flight": 0}
+
+
+def test_the_leader_mutating_its_result_does_not_leak_into_collapsed_callers():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return [{"product_id": "a"}]
+
+    async def leader():
+        result = await single_flight.do("key", fetch, copy_result=copy.deepcopy)
+        result[0]["product_id"] = "mutated"
+        result.append({"product_id": "b"})
+        return result
+
+    async def follower():
+        await asyncio.sleep(0)
+        return await single_flight.do("key", fetch, copy_result=copy.deepcopy)
+
+    async def run():
+        # The leader is scheduled first, so it resumes and mutates before the followers copy anything
+        return await asyncio.gather(leader(), follower(), follower())
+
+    leader_result, *follower_results = asyncio.run(run())
+
+    assert leader_result == [{"product_id": "mutated"}, {"product_id": "b"}]
+    assert follower_results == [[{"product_id": "a"}]] * 2
+    assert follower_results[0] is not follower_results[1]
+
+
+def test_errors_propagate_to_every_caller_and_are_not_remembered():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", fail) for _ in range(2)), return_exceptions=True)
+
+    async def succeed():
+        return "recovered"
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert single_flight.stats()["in_flight"] == 0
+    assert asyncio.run(single_flight.do("key", succeed)) == "recovered"
+
+
+def test_cancelling_one_caller_does_not_cancel_the_shared_call():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(single_flight.do("key", fetch))
+        second = asyncio.create_task(single_flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_identical_generate_response_calls_are_collapsed(openai_service):
+    # Temperature above the cache threshold, so only coalescing can dedupe the requests
+    async def run():
+        return await asyncio.gather(
+            *(openai_service.generate_response(user_message="hello", temperature=0.7) for _ in range(3))
+        )
+
+    results = asyncio.run(run())
+
+    assert len(openai_service.client.chat.completions.calls) == 1
+    assert results[0] == ("ok", 10, 2)
+    # Only the caller that made the request reports its token usage
+    assert sorted(results) == [("ok", 0, 0), ("ok", 0, 0), ("ok", 10, 2)]
+    assert openai_service.single_flight.stats()["collapsed"] == 2
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from services.utils.completion_cache import CompletionCache
+from services.utils.streaming import JsonFieldStream, collect_stream, generate_with_stream_callback
+
+
+class FakeCompletions:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+
+        async def chunks():
+            for delta in self.deltas:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3))
+
+        return chunks()
+
+
+@pytest.fixture
+def openai_service(make_openai_service):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(['{"message": ', '"Hi"', "}"])))
+    return make_openai_service(client, completion_cache=CompletionCache())
+
+
+def test_collect_stream_forwards_deltas():
+    async def stream():
+        yield "Hel", 0, 0
+        yield "lo", 0, 0
+        yield "", 5, 2
+
+    received = []
+
+    async def on_delta(delta):
+        received.append(delta)
+
+    result = asyncio.run(collect_stream(stream(), on_delta))
+    assert result == ("Hello", 5, 2)
+    assert received == ["Hel", "lo"]
+
+
+def test_generate_response_stream_yields_deltas_and_usage(openai_service):
+    received = []
+
+    async def on_delta(delta):
+        received.append(delta)
+
+    content, input_tokens, output_tokens = asyncio.run(
+        generate_with_stream_callback(openai_service, on_delta, user_message="hello", temperature=0)
+    )
+    assert content == '{"message": "Hi"}'
+    assert (input_tokens, output_tokens) == (12, 3)
+    # The client gets the message text, not the JSON around it
+    assert received == ["Hi"]
+    assert openai_service.client.chat.completions.calls[0]["stream"] is True
+
+
+def test_streamed_response_is_cached(openai_service):
+    asyncio.run(collect_stream(openai_service.generate_response_stream(user_message="hello", temperature=0)))
+    result = asyncio.run(openai_service.generate_response(user_message="hello", temperature=0))
+    assert result == ('{"message": "Hi"}', 0, 0)
+    assert len(openai_service.client.chat.completions.calls) == 1
+
+
+def test_create_chat_completion_with_stream_returns_full_content(openai_service):
+    result = asyncio.run(
+        openai_service.create_chat_completion([{"role": "user", "content": "hello"}], stream=True)
+    )
+    assert result == ('{"message": "Hi"}', 12, 3)
+
+
+def test_json_field_stream_decodes_the_message_across_deltas():
+    reply = '{"message": "Caf\\u00e9 \\"boards\\"\\n\\ud83d\\ude00 ok", "products": [{"message": "no"}]}'
+    field_stream = JsonFieldStream("message")
+
+    # One character at a time splits every escape
+    text = "".join(field_stream.feed(char) for char in reply)
+
+    assert text == json.loads(reply)["message"] == 'Café "boards"\n\U0001f600 ok'
+    assert field_stream.done
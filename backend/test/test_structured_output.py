@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from prompts.output_schemas import DynamicAnalysis, RouteClassification, feature_extraction_model
+from services.utils.completion_cache import CompletionCache
+from services.utils.structured_output import (
+    StructuredOutputError,
+    extract_json,
+    generate_structured_response,
+    parse_structured_output,
+)
+
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))],
+            usage=SimpleNamespace(prompt_tokens=30, completion_tokens=12),
+        )
+
+
+class FakeMessages:
+    def __init__(self, tool_input):
+        self.tool_input = tool_input
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="tool_use", name="RouteClassification", input=self.tool_input)],
+            usage=SimpleNamespace(input_tokens=40, output_tokens=9),
+        )
+
+
+@pytest.fixture
+def structured_openai_service(make_openai_service):
+    """An OpenAIService whose completions all reply with a chitchat route classification."""
+    completions = FakeCompletions('{"category": "chitchat", "justification": "Greeting", "confidence": 95}')
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return make_openai_service(client, completion_cache=CompletionCache())
+
+
+def test_extract_json_handles_fences_and_surrounding_text():
+    assert extract_json('```json\n{"message": "Use json output"}\n```') == {"message": "Use json output"}
+    assert extract_json('Here you go: {"a": [1, 2]} Hope it helps') == {"a": [1, 2]}
+    # Content is left intact, unlike stripping every "json" and newline from the reply
+    assert extract_json('{"message": "line one\\nline two about json"}')["message"] == "line one\nline two about json"
+    with pytest.raises(StructuredOutputError):
+        extract_json("no json here")
+
+
+def test_parse_structured_output_validates_into_model():
+    analysis = parse_structured_output(
+        '{"query_context": {"filters": {"form_factor": "SBC"}, "sort": {}, "num_products_requested": 3}}',
+        DynamicAnalysis,
+    )
+    assert analysis.query_context.filters == {"form_factor": "SBC"}
+    assert analysis.query_context.sort is None
+    assert analysis.model_dump(exclude_none=True)["query_context"]["num_products_requested"] == 3
+
+    tie_broken = parse_structured_output(
+        '{"query_context": {"sort": [{"field": "memory", "order": "desc"}, {"field": "name", "order": "asc"}]}}',
+        DynamicAnalysis,
+    )
+    assert [key.field for key in tie_broken.query_context.sort] == ["memory", "name"]
+
+    with pytest.raises(StructuredOutputError):
+        parse_structured_output('{"category": "weather"}', RouteClassification)
+
+
+def test_feature_extraction_model_follows_nested_structure():
+    model = feature_extraction_model(
+        {"name": {"value": "Not available", "confidence": 0}, "processor": {"core_count": "Number of cores"}}
+    )
+    assert model is feature_extraction_model(
+        {"processor": {"core_count": "Number of cores"}, "name": {"value": "Not available", "confidence": 0}}
+    )
+
+    parsed = model.model_validate(
+        {"processor": {"core_count": {"value": "4", "confidence": 0.8}}, "unrequested": {"value": "x", "confidence": 1}}
+    )
+    assert parsed.model_dump(exclude_none=True) == {"processor": {"core_count": {"value": "4", "confidence": 0.8}}}
+
+
+def test_openai_requests_json_schema_and_keys_cache_on_schema(structured_openai_service):
+    service = structured_openai_service
+
+    classification, input_tokens, output_tokens = asyncio.run(
+        generate_structured_response(service, RouteClassification, user_message="hi", temperature=0)
+    )
+
+    call = service.client.chat.completions.calls[0]
+    assert classification.category == "chitchat"
+    assert (input_tokens, output_tokens) == (30, 12)
+    assert call["response_format"]["type"] == "json_schema"
+    assert call["response_format"]["json_schema"]["name"] == "RouteClassification"
+
+    # The same prompt without a schema is a different request and must not hit the cached structured reply
+    asyncio.run(service.generate_response(user_message="hi", temperature=0))
+    assert len(service.client.chat.completions.calls) == 2
+
+
+def test_openai_models_without_structured_outputs_fall_back_to_json_mode(structured_openai_service):
+    service = structured_openai_service
+
+    for model, user_message in (("gpt-4-turbo", "hi, reply in JSON"), ("gpt-3.5-turbo", "hi")):
+        classification, _, _ = asyncio.run(
+            generate_structured_response(
+                service, RouteClassification, user_message=user_message, model=model, temperature=0
+            )
+        )
+        assert classification.category == "chitchat"
+
+    json_mode, prompt_only = service.client.chat.completions.calls
+    assert json_mode["response_format"] == {"type": "json_object"}
+    # JSON mode is rejected unless the messages mention JSON
+    assert "response_format" not in prompt_only
+
+
+def test_anthropic_forces_tool_use_for_structured_output(make_anthropic_service):
+    service = make_anthropic_service(
+        FakeMessages({"category": "politics", "justification": "Elections", "confidence": 88})
+    )
+
+    classification, _, _ = asyncio.run(
+        generate_structured_response(service, RouteClassification, user_message="Who will win?", system_message="x")
+    )
+
+    call = service.client.messages.calls[0]
+    assert classification.category == "politics"
+    assert call["tools"][0]["name"] == "RouteClassification"
+    assert call["tool_choice"] == {"type": "tool", "name": "RouteClassification"}
@@ -0,0 +1,39 @@
+from services.utils.token_budget import MESSAGE_OVERHEAD_TOKENS
+
+
+def make_history(turns, words_per_message=20):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": " ".join([f"question{i}"] * words_per_message)})
+        history.append({"role": "assistant", "content": " ".join([f"answer{i}"] * words_per_message)})
+    return history
+
+
+def test_history_within_budget_is_untouched(token_planner):
+    history = make_history(2)
+    fitted, dropped, summarized = token_planner.fit_history(history, 1000)
+    assert fitted == history
+    assert dropped == 0
+    assert not summarized
+
+
+def test_history_keeps_most_recent_messages_and_summarizes_older(token_planner):
+    history = make_history(10, words_per_message=60)
+    max_tokens = 3 * (60 + MESSAGE_OVERHEAD_TOKENS) + 50
+    fitted, dropped, summarized = token_planner.fit_history(history, max_tokens)
+
+    assert fitted[-1] == history[-1]
+    assert fitted[-3:] == history[-3:]
+    assert summarized
+    assert fitted[0]["role"] == "system"
+    assert dropped == len(history) - 3
+    assert token_planner.count_messages(fitted) <= max_tokens
+
+
+def test_plan_reports_planned_and_actual_tokens(token_planner):
+    plan = token_planner.plan("route_classification", "system prompt", "user prompt here", make_history(1), "gpt-4o")
+    report = plan.report(actual_input_tokens=57)
+
+    assert report["planned_input_tokens"] == sum(plan.segments.values())
+    assert report["actual_input_tokens"] == 57
+    assert report["segments"]["user"] == 3 + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+import core  # noqa: F401  imported before the agents to avoid a circular import
+from generators.clear_intent_agent import ClearIntentAgent
+from services.utils.tracing import SpanKind, Tracer, tracer
+
+
+def test_spans_nest_per_request_even_when_requests_interleave():
+    local_tracer = Tracer()
+
+    async def handle(name):
+        with local_tracer.span("process_message", SpanKind.SERVER, request=name) as root:
+            with local_tracer.span("router.classify"):
+                await asyncio.sleep(0.01)
+            with local_tracer.span("openai.chat", SpanKind.CLIENT) as call:
+                await asyncio.sleep(0.01)
+                call.set_attributes(input_tokens=10, output_tokens=2)
+        return root.trace_id
+
+    async def main():
+        return await asyncio.gather(handle("a"), handle("b"))
+
+    trace_ids = asyncio.run(main())
+
+    assert len(set(trace_ids)) == 2
+    for trace_id in trace_ids:
+        root, classify, call = local_tracer.get_trace(trace_id)
+        assert root.parent_id is None
+        assert classify.parent_id == root.span_id and call.parent_id == root.span_id
+        assert call.attributes["input_tokens"] == 10
+        assert root.duration >= classify.duration + call.duration
+    assert local_tracer.current_span() is None
+
+
+def test_errors_are_recorded_and_reraised():
+    local_tracer = Tracer()
+
+    with pytest.raises(ValueError):
+        with local_tracer.span("weaviate.search_products") as span:
+            raise ValueError("bad filter")
+
+    assert span.error == "ValueError: bad filter"
+    assert local_tracer.summaries()[0]["error"]
+
+
+def test_ring_buffer_keeps_the_most_recent_traces():
+    local_tracer = Tracer(max_traces=2)
+    for name in ("first", "second", "third"):
+        with local_tracer.span(name):
+            pass
+
+    assert [summary["name"] for summary in local_tracer.summaries()] == ["third", "second"]
+
+
+def test_otel_export():
+    local_tracer = Tracer()
+    with local_tracer.span("process_message", SpanKind.SERVER, model="gpt-4o") as root:
+        with local_tracer.span("openai.chat", SpanKind.CLIENT, input_tokens=12, cached=False):
+            pass
+
+    export = local_tracer.export([root.trace_id])
+
+    resource_spans = export["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"][0] == {
+        "key": "service.name",
+        "value": {"stringValue": "boardbot-backend"},
+    }
+    parent, child = resource_spans["scopeSpans"][0]["spans"]
+    assert len(parent["traceId"]) == 32 and len(parent["spanId"]) == 16
+    assert "parentSpanId" not in parent and child["parentSpanId"] == parent["spanId"]
+    assert child["kind"] == SpanKind.CLIENT
+    assert child["attributes"] == [
+        {"key": "input_tokens", "value": {"intValue": "12"}},
+        {"key": "cached", "value": {"boolValue": False}},
+    ]
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+    assert child["status"] == {"code": 1}
+
+
+def test_graph_nodes_and_weaviate_queries_are_traced(with_weaviate_service):
+    async def search_products(search_params):
+        return [{"product_id": "p1", "name": "Board"}]
+
+    async def run(weaviate_service):
+        agent = ClearIntentAgent(weaviate_service, None, None, None)
+        state = {
+            "current_message": "a board",
+            "filters": {"memory": "8GB"},
+            "query_context": {"num_products_requested": 1},
+        }
+        with tracer.span("test") as root:
+            await agent.product_search_node(state, {"configurable": {}})
+        return root.trace_id
+
+    trace_id = with_weaviate_service(None, run, search_products)
+
+    timeline = tracer.breakdown(trace_id)
+    assert [(span["name"], span["depth"]) for span in timeline] == [
+        ("test", 0),
+        ("clear_intent.product_search", 1),
+        ("weaviate.search_products", 2),
+    ]
+    assert timeline[2]["attributes"]["results"] == 1
@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from scripts.backfill_numeric_properties import backfill
+from services.utils.filter_parser import QueryBuilder
+from weaviate_interface.services.product_service import ProductService
+from weaviate_interface.utils.unit_parser import numeric_properties, parse_values, standardize
+
+
+@pytest.mark.parametrize(
+    "text, kind, expected",
+    [
+        ("0-32.0GB DDR4", "memory", [0.0, 32.0]),
+        ("512 MB DDR3 SDRAM", "memory", [0.5]),
+        ("DDR4 SODIMM, 3200 MT/s, up to 64 GByte", "memory", [64.0]),
+        ("1 x 2 GB DDR3L SODIMM 1066 MHz (up to 4 GB)", "memory", [2.0, 4.0]),
+        ("DDR4", "memory", []),
+        # A unitless number only borrows the unit of a quantity it is joined to
+        ("1x 260-pin DDR4 SO-DIMM up to 32GB", "memory", [32.0]),
+        ("-40~+85℃", "temperature", [-40.0, 85.0]),
+        ("15 to 45 watts", "power", [15.0, 45.0]),
+        ("9-36 VDC", "voltage", [9.0, 36.0]),
+        ("+12V/+5V/-12V", "voltage", [12.0, 5.0, 12.0]),
+        ("-40℃", "temperature", [-40.0]),
+        ("32°F (0°C)", "temperature", [0.0, 0.0]),
+        ("85 degrees Celsius", "temperature", [85.0]),
+        ("Single, Dual, Quad", "count", [1.0, 2.0, 4.0]),
+        ("24 cores/32 threads", "count", [24.0]),
+        (float("nan"), "memory", []),
+    ],
+)
+def test_parse_values(text, kind, expected):
+    assert parse_values(text, kind) == pytest.approx(expected)
+
+
+def test_standardize_rewrites_only_recognised_quantities():
+    assert standardize("Up to 4 GByte LPDDR4, 2400 MHz", "memory") == "Up to 4.0GB LPDDR4, 2400 MHz"
+    assert standardize("15 to 45W", "power") == "15.0W to 45.0W"
+    assert standardize("12-24 VDC", "voltage") == "12.0V-24.0V DC"
+    assert standardize("1x 260-pin DDR4 SO-DIMM up to 32GB", "memory") == "1x 260-pin DDR4 SO-DIMM up to 32.0GB"
+    assert standardize("+5V/-12V", "voltage") == "+5.0V/-12.0V"
+    assert standardize("+80℃", "temperature") == "80°C"
+    assert standardize("ATX", "voltage") == "ATX"
+
+
+def test_numeric_properties_only_cover_fields_present():
+    shadows = numeric_properties({"memory": "0-64.0GB DDR4", "input_voltage": "9-36 VDC", "processor_tdp": "LOW POWER"})
+
+    assert shadows == {"memory_gb": 64.0, "tdp_w": None, "voltage_min_v": 9.0, "voltage_max_v": 36.0}
+
+
+def test_comparisons_become_range_filters_on_the_shadows():
+    query_builder = QueryBuilder()
+
+    memory = query_builder.build_weaviate_filter({"memory": ">=512MB"})
+    voltage_low = query_builder.build_weaviate_filter({"input_voltage": "<=12V"})
+    voltage_high = query_builder.build_weaviate_filter({"input_voltage": ">=24"})
+    storage = query_builder.build_weaviate_filter({"onboard_storage": ">=512GB"})
+
+    assert (memory.target, memory.operator.value, memory.value) == ("memory_gb", "GreaterThanEqual", 0.5)
+    assert (voltage_low.target, voltage_low.operator.value, voltage_low.value) == ("voltage_min_v", "LessThanEqual", 12)
+    assert (voltage_high.target, voltage_high.value) == ("voltage_max_v", 24)
+    # Fields without a numeric shadow keep matching their text spellings
+    assert storage.operator.value == "ContainsAny" and "1024.0GB" in storage.value
+
+
+class FakeWeaviateClient:
+    def __init__(self, products):
+        self.products = products
+        self.inserted = []
+        self.updates = []
+
+    async def insert_object(self, collection_name, data, unique_properties):
+        self.inserted.append(data)
+        return "new-id"
+
+    async def update_object(self, collection_name, uuid, data):
+        self.updates.append((uuid, data))
+
+    async def get_objects(
+        self, collection_name, filters, limit, offset, sort, return_properties, include_vector, after=None
+    ):
+        # Cursor order is uuid order
+        products = sorted(self.products, key=lambda product: product["id"])
+        products = [product for product in products if after is None or product["id"] > after]
+        return [{key: product.get(key) for key in return_properties + ["id"]} for product in products][
+            offset : offset + limit
+        ]
+
+
+def test_products_are_stored_with_their_shadows():
+    client = FakeWeaviateClient([])
+    product_service = ProductService(client)
+
+    product = {"product_id": "p1", "memory": "8GB DDR4", "operating_temperature_min": "-40°C"}
+    asyncio.run(product_service.create(product))
+    asyncio.run(product_service.update("p1", {"memory": "16 GB"}))
+
+    assert client.inserted[0]["memory_gb"] == 8.0 and client.inserted[0]["temp_min_c"] == -40.0
+    assert client.updates == [("p1", {"memory": "16 GB", "memory_gb": 16.0})]
+
+
+def test_backfill_updates_only_missing_or_stale_shadows():
+    products = [
+        {"id": "a", "memory": "8GB", "memory_gb": 8.0, "processor_tdp": "15W", "tdp_w": 15.0},
+        {"id": "b", "memory": "0-32.0GB DDR4", "processor_tdp": "6.0W-45.0W"},
+        {"id": "c", "memory": "16GB", "memory_gb": 8.0},
+    ]
+    client = FakeWeaviateClient(products)
+
+    dry_run = asyncio.run(backfill(ProductService(client), page_size=2, dry_run=True))
+    stats = asyncio.run(backfill(ProductService(client), page_size=2))
+
+    assert dry_run["updated"] == 2 and client.updates[0][0] == "b"
+    assert stats["products"] == 3 and stats["unchanged"] == 1
+    assert client.updates[0][1]["memory_gb"] == 32.0 and client.updates[0][1]["tdp_w"] == 45.0
+    assert client.updates[1][1]["memory_gb"] == 16.0
@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import core  # noqa: F401  imported before the agents to avoid a circular import
+from config import Config
+from generators.clear_intent_agent import ClearIntentAgent
+from services.vector_reranker import VectorReranker
+
+QUERY_VECTOR = [1.0, 0.0, 0.0]
+
+
+def fake_openai_service(fail=False):
+    async def create_embeddings(texts, model=None):
+        if fail:
+            raise RuntimeError("openai unavailable")
+        return np.array([QUERY_VECTOR for _ in texts], dtype=np.float32)
+
+    return SimpleNamespace(create_embeddings=create_embeddings)
+
+
+def product(product_id, vector=None, **attributes):
+    result = {"product_id": product_id, "_search_metadata": {"search_type": "hybrid"}, **attributes}
+    if vector is not None:
+        result["vector"] = vector
+    return result
+
+
+def test_rerank_orders_by_cosine_similarity_and_strips_vectors():
+    reranker = VectorReranker(fake_openai_service())
+    products = [product("far", [0.0, 1.0, 0.0]), product("near", [3.0, 0.1, 0.0]), product("mid", [1.0, 1.0, 0.0])]
+
+    reranked = asyncio.run(reranker.rerank("robotics board", products, {}, top_k=2))
+
+    assert [p["product_id"] for p in reranked] == ["near", "mid"]
+    assert all("vector" not in p for p in reranked)
+    assert reranked[0]["_search_metadata"]["search_type"] == "hybrid"
+    assert reranked[1]["_search_metadata"]["rerank_score"] == np.float32(1 / np.sqrt(2))
+    assert "vector" in products[0]
+
+
+def test_attribute_matches_outweigh_small_similarity_differences():
+    reranker = VectorReranker(fake_openai_service(), vector_weight=0.7)
+    products = [
+        product("similar", [1.0, 0.1, 0.0], memory="4 GB LPDDR4", wireless="Wi-Fi 5"),
+        product("matching", [1.0, 0.3, 0.0], memory="8 GB LPDDR4", wireless="WI-FI 6, Bluetooth 5.2"),
+    ]
+    filters = {"memory": "8GB", "wireless": "wi-fi 6"}
+
+    matches = VectorReranker._attribute_matches(products, filters)
+    reranked = asyncio.run(reranker.rerank("board", products, filters, top_k=2))
+
+    assert matches.tolist() == [[0.0, 0.0], [1.0, 1.0]]
+    assert [p["product_id"] for p in reranked] == ["matching", "similar"]
+
+
+def test_products_without_vectors_use_their_certainty():
+    scores = VectorReranker(fake_openai_service()).score(
+        np.array(QUERY_VECTOR), [product("a", certainty=0.75), product("b", [0.0, 1.0, 0.0]), product("c")], {}
+    )
+
+    assert scores.tolist() == [0.5, 0.0, 0.0]
+
+
+def test_search_order_is_kept_when_the_query_cannot_be_embedded():
+    reranker = VectorReranker(fake_openai_service(fail=True))
+    products = [product("a", [0.0, 1.0, 0.0]), product("b", [1.0, 0.0, 0.0])]
+
+    reranked = asyncio.run(reranker.rerank("board", products, {}, top_k=5))
+
+    assert [p["product_id"] for p in reranked] == ["a", "b"]
+    assert "vector" not in reranked[0]
+
+
+def test_clear_intent_agent_searches_extra_candidates_with_vectors():
+    searches = []
+
+    async def search_with_relaxation(filters, limit, **kwargs):
+        searches.append((limit, kwargs["include_vector"]))
+        return [product(f"p{i}", [float(i), 1.0, 0.0]) for i in range(limit)]
+
+    weaviate_service = SimpleNamespace(search_with_relaxation=search_with_relaxation)
+    agent = ClearIntentAgent(weaviate_service, None, None, None, reranker=VectorReranker(fake_openai_service()))
+    state = {"current_message": "a fast board", "filters": {}, "query_context": {"num_products_requested": 3}}
+
+    result = asyncio.run(agent.product_search_node(state, {"configurable": {}}))
+
+    assert searches == [(6, True)]
+    assert [p["product_id"] for p in result["search_results"]] == ["p5", "p4", "p3"]
+    assert "rerank" in result["time_taken"]
+
+
+def test_reranking_is_opt_in():
+    assert VectorReranker.from_config(Config(), fake_openai_service()) is None
+    reranker = VectorReranker.from_config(Config(PRODUCT_RERANKER="vector"), fake_openai_service())
+    assert isinstance(reranker, VectorReranker)
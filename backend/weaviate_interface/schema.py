@@ -284,6 +284,67 @@ SCHEMA = {
                     index_filterable=True,
                     index_searchable=True,
                 ),
+                # Numeric shadows of the text fields above, filled by weaviate_interface.utils.unit_parser
+                Property(
+                    name="memory_gb",
+                    description="RAM capacity in GB, parsed from memory (the maximum when a range is given).",
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="tdp_w",
+                    description=(
+                        "Processor TDP in watts, parsed from processor_tdp (the maximum when a range is given)."
+                    ),
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="core_count",
+                    description=(
+                        "Processor core count, parsed from processor_core_count (the maximum when several are given)."
+                    ),
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="temp_min_c",
+                    description="Minimum operating temperature in °C, parsed from operating_temperature_min.",
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="temp_max_c",
+                    description="Maximum operating temperature in °C, parsed from operating_temperature_max.",
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="voltage_min_v",
+                    description="Lowest supported input voltage in volts, parsed from input_voltage.",
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
+                Property(
+                    name="voltage_max_v",
+                    description="Highest supported input voltage in volts, parsed from input_voltage.",
+                    data_type=DataType.NUMBER,
+                    index_filterable=True,
+                    index_range_filters=True,
+                    index_sortable=True,
+                ),
             ],
             "vectorizer_config": Configure.Vectorizer.text2vec_openai(
                 model="text-embedding-3-small",  # Consider using a more recent and powerful model
@@ -76,6 +76,28 @@ class SchemaManager:
             logger.error(f"Error resetting schema: {e}")
             raise
 
+    async def add_missing_properties(self, class_name: str) -> List[str]:
+        """
+        Adds the properties the schema defines for a class but the existing collection lacks, keeping its data.
+        Objects stored before have no value for them until they are backfilled.
+        """
+        try:
+            existing_collections = await self.client.get_schema()
+            existing = {prop.name for prop in existing_collections[class_name].properties}
+            class_config = next(cls for cls in self.schema.get("classes", []) if cls["class"] == class_name)
+
+            added = []
+            for prop in class_config["properties"]:
+                if prop.name not in existing:
+                    await self.client.add_property(class_name, prop)
+                    added.append(prop.name)
+            if added:
+                logger.info(f"Added properties {added} to {class_name}")
+            return added
+        except Exception as e:
+            logger.error(f"Error adding missing properties to {class_name}: {e}")
+            raise
+
     async def info(self) -> str:
         try:
             schema = await self.client.get_schema()
@@ -45,12 +45,17 @@ class BaseService(ABC):
         sort: Optional[Sort] = None,
         return_properties: Optional[List[str]] = None,
         include_vector: bool = False,
+        after: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        A page of objects, by offset or, with after, the objects following that uuid in Weaviate's cursor order.
+        Cursor pages cost the same at any depth but cannot be filtered or sorted.
+        """
         try:
             if return_properties is None:
                 return_properties = self.get_properties()
             return await self.client.get_objects(
-                self.class_name, filters, limit, offset, sort, return_properties, include_vector
+                self.class_name, filters, limit, offset, sort, return_properties, include_vector, after=after
             )
         except Exception as e:
             logger.error(f"Error retrieving all objects from {self.class_name}: {e}")
@@ -154,14 +159,15 @@ class BaseService(ABC):
             logger.error(f"Error performing hybrid search in {self.class_name}: {e}")
             return []
 
-    async def count(self) -> int:
+    async def count(self, filters: Optional[Filter] = None) -> Optional[int]:
+        """Objects matching filters (all objects without them), or None when the aggregate fails."""
         try:
-            result = await self.client.aggregate(self.class_name)
+            result = await self.client.aggregate(self.class_name, filters=filters)
             logger.info(f"Count result: {result}")
             return result.total_count
         except Exception as e:
             logger.error(f"Error counting objects in {self.class_name}: {e}")
-            return 0
+            return None
 
     async def batch_create_objects(
         self, objects: List[Dict[str, Any]], unique_properties: Optional[List[str]] = None, batch_size: int = 100
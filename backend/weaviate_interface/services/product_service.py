@@ -1,5 +1,6 @@
 from typing import Any, Dict, List, Optional
 from weaviate_interface.services.base_service import BaseService
+from weaviate_interface.utils.unit_parser import comparison_property, numeric_properties
 from weaviate_interface.weaviate_client import WeaviateClient
 from weaviate.classes.query import Filter
 import logging
@@ -45,6 +46,23 @@ class ProductService(BaseService):
             "duplicate_ids",
         ]
 
+    async def create(self, data: Dict[str, Any], unique_properties: Optional[List[str]] = None) -> str:
+        return await super().create(self._with_numeric_properties(data), unique_properties)
+
+    async def update(self, uuid: str, data: Dict[str, Any]) -> None:
+        await super().update(uuid, self._with_numeric_properties(data))
+
+    async def batch_create_objects(
+        self, objects: List[Dict[str, Any]], unique_properties: Optional[List[str]] = None, batch_size: int = 100
+    ) -> List[str]:
+        objects = [self._with_numeric_properties(obj) for obj in objects]
+        return await super().batch_create_objects(objects, unique_properties, batch_size)
+
+    @staticmethod
+    def _with_numeric_properties(data: Dict[str, Any]) -> Dict[str, Any]:
+        """The object plus the numeric shadows (memory_gb, tdp_w, ...) of the unit-bearing fields it sets."""
+        return {**data, **numeric_properties(data)}
+
     async def query_products(
         self,
         filters: Optional[Dict[str, Any]] = None,
@@ -75,11 +93,11 @@ class ProductService(BaseService):
                     Filter.all_of(filter_conditions) if len(filter_conditions) > 1 else filter_conditions[0]
                 )
 
-            # Get sorted results
+            # Get sorted results, ordering unit-bearing text fields by their numeric shadow
             results = await self.get_sorted(
                 limit=limit,
                 filters=weaviate_filter,
-                sort_by=sort_field,
+                sort_by=(comparison_property(sort_field) or sort_field) if sort_field else None,
                 sort_order=sort_order,
                 return_properties=self.get_properties(),
             )
@@ -96,6 +114,7 @@ class ProductService(BaseService):
         limit: int = 5,
         filters: Optional[Filter] = None,
         return_properties: Optional[List[str]] = None,
+        include_vector: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Perform semantic search on products using near_text.
@@ -105,6 +124,7 @@ class ProductService(BaseService):
             limit: Maximum number of results to return
             filters: Optional Weaviate filter
             return_properties: List of properties to return in results
+            include_vector: Whether to return each product's vector under "vector"
 
         Returns:
             List of matching products with metadata
@@ -119,7 +139,7 @@ class ProductService(BaseService):
                 limit=limit,
                 filters=filters,
                 return_properties=return_properties,
-                include_vector=False,
+                include_vector=include_vector,
             )
 
             return results
@@ -134,6 +154,7 @@ class ProductService(BaseService):
         limit: int = 5,
         filters: Optional[Filter] = None,
         return_properties: Optional[List[str]] = None,
+        include_vector: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Perform hybrid search combining semantic and filtered search.
@@ -143,6 +164,7 @@ class ProductService(BaseService):
             limit: Maximum number of results to return
             filters: Optional Weaviate filter
             return_properties: List of properties to return in results
+            include_vector: Whether to return each product's vector under "vector"
 
         Returns:
             List of matching products with metadata
@@ -158,6 +180,7 @@ class ProductService(BaseService):
                 filters=filters,
                 return_properties=return_properties,
                 alpha=0.5,  # Balance between keywords and vectors
+                include_vector=include_vector,
             )
 
             return results
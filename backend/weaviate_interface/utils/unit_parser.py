@@ -0,0 +1,207 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class UnitKind:
+    canonical_unit: str
+    # unit spelling -> (scale, offset) converting a value into the canonical unit
+    units: Dict[str, Tuple[float, float]]
+    # Whether a leading "-" is a sign ("-40°C") rather than a separator or a negative rail ("+5V/-12V")
+    signed: bool = False
+    # Unit assumed when the text has no recognised unit at all
+    default_unit: Optional[str] = None
+    # How standardize writes units that say more than the canonical unit ("12 VDC" -> "12.0V DC")
+    labels: Optional[Dict[str, str]] = None
+
+
+UNIT_KINDS = {
+    "memory": UnitKind(
+        "GB",
+        {
+            **dict.fromkeys(("gb", "gbyte", "gbytes", "gigabyte", "gigabytes"), (1.0, 0.0)),
+            **dict.fromkeys(("mb", "mbyte", "mbytes", "megabyte", "megabytes"), (1 / 1024, 0.0)),
+            **dict.fromkeys(("tb", "tbyte", "tbytes", "terabyte", "terabytes"), (1024.0, 0.0)),
+            "kb": (1 / 1024**2, 0.0),
+        },
+    ),
+    "power": UnitKind("W", {**dict.fromkeys(("w", "watt", "watts"), (1.0, 0.0)), "mw": (0.001, 0.0)}),
+    "voltage": UnitKind(
+        "V",
+        {**dict.fromkeys(("v", "vdc", "vac", "vsb", "volt", "volts"), (1.0, 0.0)), "mv": (0.001, 0.0)},
+        labels={"vdc": "V DC", "vac": "V AC", "vsb": "VSB"},
+    ),
+    "temperature": UnitKind(
+        "°C",
+        {
+            **dict.fromkeys(("°c", "c", "oc", "°"), (1.0, 0.0)),
+            **dict.fromkeys(("°f", "f"), (5 / 9, -32 * 5 / 9)),
+        },
+        signed=True,
+        default_unit="°c",
+    ),
+    "count": UnitKind("", dict.fromkeys(("", "core", "cores", "c"), (1.0, 0.0)), default_unit=""),
+}
+
+# Numeric shadow properties of the Product collection: property -> (text field, unit kind, how multiple values reduce)
+NUMERIC_PROPERTIES = {
+    "memory_gb": ("memory", "memory", max),
+    "tdp_w": ("processor_tdp", "power", max),
+    "core_count": ("processor_core_count", "count", max),
+    "temp_min_c": ("operating_temperature_min", "temperature", min),
+    "temp_max_c": ("operating_temperature_max", "temperature", max),
+    "voltage_min_v": ("input_voltage", "voltage", min),
+    "voltage_max_v": ("input_voltage", "voltage", max),
+}
+
+FIELD_KINDS = {field: kind for field, kind, _ in NUMERIC_PROPERTIES.values()}
+
+# Property compared for ">=" and for "<=" filters on a text field. A board accepting 9-36V satisfies both
+# ">=24V" and "<=12V", so voltage compares the top of its range for the first and the bottom for the second.
+# Sorting uses the ">=" property.
+COMPARISON_PROPERTIES = {
+    "memory": ("memory_gb", "memory_gb"),
+    "processor_tdp": ("tdp_w", "tdp_w"),
+    "processor_core_count": ("core_count", "core_count"),
+    "operating_temperature_min": ("temp_min_c", "temp_min_c"),
+    "operating_temperature_max": ("temp_max_c", "temp_max_c"),
+    "input_voltage": ("voltage_max_v", "voltage_min_v"),
+}
+
+COUNT_WORDS = {"single": "1", "dual": "2", "quad": "4", "hexa": "6", "octa": "8"}
+# Words after a number that leave it unitless, so it takes the unit of the next quantity ("15 to 45W")
+CONNECTORS = {"to", "and", "or"}
+
+_NORMALIZATIONS = (
+    (re.compile(r"[℃]"), "°C"),
+    (re.compile(r"[º\uf0b0]"), "°"),
+    (re.compile(r"[–—~]"), "-"),
+    (re.compile(r"\s*deg(?:rees?)?\s*c(?:elsius)?\b", re.IGNORECASE), "°C"),
+    (re.compile(r"\s*deg(?:rees?)?\s*f(?:ahrenheit)?\b", re.IGNORECASE), "°F"),
+)
+_COUNT_WORDS = re.compile(r"\b(" + "|".join(COUNT_WORDS) + r")", re.IGNORECASE)
+# A number not glued to a preceding word ("DDR4", "x86"), and the unit or word following it
+_QUANTITY = re.compile(r"(?<![\w.])([-+]?)(\d+(?:\.\d+)?)(?:\s*(°\s*[a-z]?|[a-z%]+))?", re.IGNORECASE)
+
+
+def _normalize(text: str, kind: str) -> str:
+    for pattern, replacement in _NORMALIZATIONS:
+        text = pattern.sub(replacement, text)
+    if kind == "count":
+        text = _COUNT_WORDS.sub(lambda match: COUNT_WORDS[match.group(1).lower()], text)
+    return text
+
+
+def _scan(text: str, kind: str, default_unit: Optional[str] = None) -> List[Tuple[int, int, float, str]]:
+    """
+    The quantities of a kind in normalized text as (start, end, value in the canonical unit, unit spelling).
+    A unitless number borrows the unit of the next quantity only when a range separator or connector joins
+    them ("9-36 VDC", "15 to 45W"), and then gets an empty spelling. The span of a quantity of an unsigned kind
+    leaves out its sign, so standardize keeps "+5V/-12V" rails as written.
+    """
+    unit_kind = UNIT_KINDS[kind]
+    default_unit = unit_kind.default_unit if default_unit is None else default_unit
+    quantities: List[Tuple[int, int, float, str]] = []
+    unitless: List[Tuple[int, int, float]] = []
+    # The unitless numbers leading up to the current position, and where the last one (or its connector) ends
+    pending: List[Tuple[int, int, float]] = []
+    pending_end, pending_connector = 0, False
+
+    def convert(start: int, end: int, value: float, unit: str, spelling: str) -> Tuple[int, int, float, str]:
+        scale, offset = unit_kind.units[unit]
+        return start, end, value * scale + offset, spelling
+
+    for match in _QUANTITY.finditer(text):
+        sign, number, unit = match.groups()
+        value = float(number)
+        if sign == "-" and unit_kind.signed:
+            value = -value
+        start = match.start() if unit_kind.signed else match.start(2)
+        unit = re.sub(r"\s+", "", unit or "").lower()
+        connector = unit in CONNECTORS
+        if connector:
+            unit = ""
+
+        # A range separator, or nothing after a connector, then the number's own sign
+        between = text[pending_end : match.start(2)]
+        if pending and not re.fullmatch(r"\s*(?:-\s*)?[-+]?" if pending_connector else r"\s*-\s*[-+]?", between):
+            pending = []
+
+        if unit == "" and "" not in unit_kind.units:
+            pending.append((start, match.end(2), value))
+            unitless.append((start, match.end(2), value))
+            pending_end, pending_connector = match.end(), connector
+        elif unit in unit_kind.units:
+            quantities += [convert(*quantity, unit, "") for quantity in pending]
+            quantities.append(convert(start, match.end() if unit else match.end(2), value, unit, unit))
+            pending = []
+        else:
+            # Anything else ("2400 MHz", "2 x", "64-bit") is not a quantity of this kind
+            pending = []
+
+    if unitless and not quantities and default_unit in unit_kind.units:
+        quantities = [convert(*quantity, default_unit, "") for quantity in unitless]
+    return sorted(quantities)
+
+
+def parse_values(text: Any, kind: str, default_unit: Optional[str] = None) -> List[float]:
+    """
+    Every quantity of a kind in a spec string, in the kind's canonical unit.
+
+    parse_values("0-32.0GB DDR4", "memory") == [0.0, 32.0]
+    parse_values("9-36 VDC", "voltage") == [9.0, 36.0]
+    parse_values("32°F (0°C)", "temperature") == [0.0, 0.0]
+    """
+    if isinstance(text, bool) or text is None:
+        return []
+    if isinstance(text, (int, float)):
+        return [] if math.isnan(text) else [float(text)]
+    if not isinstance(text, str):
+        return []
+    return [value for _, _, value, _ in _scan(_normalize(text, kind), kind, default_unit)]
+
+
+def _format_value(value: float) -> str:
+    value = round(value, 3)
+    return f"{value:.1f}" if value.is_integer() else f"{value:g}"
+
+
+def standardize(text: str, kind: str) -> str:
+    """
+    Rewrites the recognised quantities in a spec string in the canonical unit and leaves the rest alone:
+    "4 GByte LPDDR4" -> "4.0GB LPDDR4", "9-36 VDC" -> "9.0V-36.0V", "+80℃" -> "80°C".
+    """
+    normalized = _normalize(text, kind)
+    unit_kind = UNIT_KINDS[kind]
+    parts = []
+    position = 0
+    for start, end, value, unit in _scan(normalized, kind):
+        label = (unit_kind.labels or {}).get(unit, unit_kind.canonical_unit)
+        number = str(int(round(value))) if kind == "temperature" and round(value, 3).is_integer() else None
+        parts += [normalized[position:start], f"{number or _format_value(value)}{label}"]
+        position = end
+    parts.append(normalized[position:])
+    return "".join(parts)
+
+
+def numeric_properties(product: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    The numeric shadow properties derived from the text fields present in a product (all or part of one, as in
+    an update). A shadow is None when its field has no parsable quantity.
+    """
+    properties = {}
+    for name, (field, kind, reduce) in NUMERIC_PROPERTIES.items():
+        if field in product:
+            values = parse_values(product[field], kind)
+            properties[name] = reduce(values) if values else None
+    return properties
+
+
+def comparison_property(field: str, operator: str = ">=") -> Optional[str]:
+    """The numeric property answering a ">=" or "<=" comparison (or a sort) on a text field, if it has one."""
+    properties = COMPARISON_PROPERTIES.get(field)
+    if properties is None:
+        return None
+    return properties[0] if operator == ">=" else properties[1]
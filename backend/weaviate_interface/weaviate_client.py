@@ -91,6 +91,14 @@ class WeaviateClient:
             logger.error(f"Error deleting collection {name}: {e}", exc_info=True)
             raise
 
+    async def add_property(self, collection_name: str, prop: Property) -> None:
+        try:
+            collection = self.get_collection(collection_name)
+            await collection.config.add_property(prop)
+        except Exception as e:
+            logger.error(f"Error adding property {prop.name} to collection {collection_name}: {e}", exc_info=True)
+            raise
+
     async def delete_all_collections(self) -> None:
         try:
             collections = await self.client.collections.list_all()
@@ -181,13 +189,16 @@ class WeaviateClient:
         sort: Optional[Sort] = None,
         return_properties: Optional[List[str]] = None,
         include_vector: bool = False,
+        after: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         try:
             collection = self.get_collection(collection_name)
             results = await collection.query.fetch_objects(
                 filters=filters,
                 limit=limit,
-                offset=offset,
+                # Weaviate's cursor (after) takes no offset, filters or sort
+                offset=None if after else offset,
+                after=after,
                 sort=sort,
                 return_properties=return_properties,
                 include_vector=include_vector,
@@ -282,6 +293,7 @@ class WeaviateClient:
         collection_name: str,
         group_by: Optional[List[str]] = None,
         properties: Optional[List[str]] = None,
+        filters: Optional[Filter] = None,
     ) -> Dict[str, Any]:
         try:
             collection = self.get_collection(collection_name)
@@ -293,7 +305,7 @@ class WeaviateClient:
                 for prop in properties:
                     query = query.with_fields(prop)
 
-            results = await query.over_all(total_count=True)
+            results = await query.over_all(total_count=True, filters=filters)
             logger.info(f"Aggregation results: {results}")
             return results
         except Exception as e:
@@ -335,6 +347,7 @@ class WeaviateClient:
                     **obj.properties,
                     "distance": obj.metadata.distance,
                     "certainty": obj.metadata.certainty,
+                    **({"vector": obj.vector.get("default")} if include_vector else {}),
                 }
                 for obj in results.objects
             ]
@@ -363,13 +376,15 @@ class WeaviateClient:
                 return_properties=return_properties,
                 return_references=return_references,
                 include_vector=include_vector,
-                return_metadata=MetadataQuery(distance=True, certainty=True),
+                return_metadata=MetadataQuery(distance=True, certainty=True, score=True),
             )
             return [
                 {
                     **obj.properties,
                     "distance": obj.metadata.distance,
                     "certainty": obj.metadata.certainty,
+                    "score": obj.metadata.score,
+                    **({"vector": obj.vector.get("default")} if include_vector else {}),
                 }
                 for obj in results.objects
             ]
@@ -404,7 +419,14 @@ class WeaviateClient:
                 return_properties=return_properties,
                 return_references=return_references,
             )
-            return [obj.properties for obj in response.objects]
+            return [
+                {
+                    **obj.properties,
+                    "score": obj.metadata.score,
+                    **({"vector": obj.vector.get("default")} if include_vector else {}),
+                }
+                for obj in response.objects
+            ]
         except Exception as e:
             logger.error(f"Error performing keyword search: {e}", exc_info=True)
             return []